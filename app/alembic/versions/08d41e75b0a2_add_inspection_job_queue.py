@@ -0,0 +1,45 @@
+"""Add inspection job queue
+
+Revision ID: 08d41e75b0a2
+Revises:
+Create Date: 2026-10-19 09:12:40.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '08d41e75b0a2'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'inspectionjob',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('inspection_id', sa.Uuid(), nullable=False),
+        sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'DONE', 'FAILED', name='jobstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_inspectionjob_inspection_id'), 'inspectionjob', ['inspection_id'], unique=False)
+    op.create_index(op.f('ix_inspectionjob_run_at'), 'inspectionjob', ['run_at'], unique=False)
+    op.create_index('ix_inspectionjob_status_run_at', 'inspectionjob', ['status', 'run_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_inspectionjob_status_run_at', table_name='inspectionjob')
+    op.drop_index(op.f('ix_inspectionjob_run_at'), table_name='inspectionjob')
+    op.drop_index(op.f('ix_inspectionjob_inspection_id'), table_name='inspectionjob')
+    op.drop_table('inspectionjob')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,31 @@
+"""Add row versions to inspections
+
+Revision ID: 5c1e9b7f2a43
+Revises: b3f0d2a7c619
+Create Date: 2026-10-19 10:02:17.540211
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e9b7f2a43'
+down_revision = 'b3f0d2a7c619'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('inspectionresult', 'inspectiontagcreate'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE inspectionresult SET updated_at = created_at")
+    op.execute("UPDATE inspectiontagcreate SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    for table in ('inspectionresult', 'inspectiontagcreate'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
@@ -0,0 +1,97 @@
+"""Partition inspection tables by month
+
+Revision ID: 9a3d6c0e4b17
+Revises: 5c1e9b7f2a43
+Create Date: 2026-10-19 11:40:52.803114
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3d6c0e4b17'
+down_revision = '5c1e9b7f2a43'
+branch_labels = None
+depends_on = None
+
+# (table, partition key); the key has to be part of the primary key. Both
+# are keyed by the server-set creation time: a client-supplied date could
+# point anywhere and pile rows up in DEFAULT
+TABLES = (('inspectionresult', 'created_at'), ('inspectiontagcreate', 'created_at'))
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    # tag inspections had no creation time of their own yet
+    op.add_column('inspectiontagcreate', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE inspectiontagcreate SET created_at = COALESCE(updated_at, date)')
+    with op.batch_alter_table('inspectiontagcreate') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # declarative partitioning is PostgreSQL only, other databases keep
+        # the plain tables
+        return
+
+    now = datetime.now(timezone.utc)
+    for table, column in TABLES:
+        legacy = f'{table}_unpartitioned'
+        op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        op.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey')
+        op.execute(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({column})'
+        )
+        op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {column})')
+
+        oldest = bind.execute(sa.text(f'SELECT min({column}) FROM {legacy}')).scalar()
+        month = date((oldest or now).year, (oldest or now).month, 1)
+        last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            op.execute(
+                f'CREATE TABLE {table}_p{month.year:04d}_{month.month:02d} '
+                f'PARTITION OF {table} FOR VALUES '
+                f"FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+        # catches rows past the last partition if maintenance stops running
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+        op.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+        op.execute(f'DROP TABLE {legacy}')
+        op.create_index(f'ix_{table}_{column}', table, [column])
+
+    op.create_index(
+        'ix_inspectionresult_station_id_created_at',
+        'inspectionresult',
+        ['station_id', 'created_at'],
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('inspectiontagcreate') as batch_op:
+            batch_op.drop_column('created_at')
+        return
+
+    op.drop_index('ix_inspectionresult_station_id_created_at', table_name='inspectionresult')
+    for table, column in TABLES:
+        partitioned = f'{table}_partitioned'
+        op.execute(f'ALTER TABLE {table} RENAME TO {partitioned}')
+        op.execute(f'CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS)')
+        op.execute(f'INSERT INTO {table} SELECT * FROM {partitioned}')
+        # drops every attached partition along with the parent
+        op.execute(f'DROP TABLE {partitioned}')
+        op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    op.drop_column('inspectiontagcreate', 'created_at')
@@ -0,0 +1,56 @@
+"""Add owner_id to inspection results
+
+Revision ID: c4e8a1f3d925
+Revises: 9a3d6c0e4b17
+Create Date: 2026-10-19 12:26:04.671930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f3d925'
+down_revision = '9a3d6c0e4b17'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade():
+    op.add_column('inspectionresult', sa.Column('owner_id', sa.Uuid(), nullable=True))
+
+    # backfill in batches so no single statement rewrites the whole table;
+    # results whose station is gone keep a NULL owner and match nobody
+    bind = op.get_bind()
+    backfill = sa.text(
+        'UPDATE inspectionresult SET owner_id = ('
+        ' SELECT inspectionstation.owner_id FROM inspectionstation'
+        ' WHERE inspectionstation.id = inspectionresult.station_id'
+        ') WHERE id IN ('
+        ' SELECT id FROM inspectionresult WHERE owner_id IS NULL'
+        ' AND station_id IN (SELECT id FROM inspectionstation)'
+        ' LIMIT :batch_size'
+        ')'
+    )
+    while bind.execute(backfill, {'batch_size': BATCH_SIZE}).rowcount:
+        pass
+
+    op.create_index(
+        'ix_inspectionresult_owner_id_created_at',
+        'inspectionresult',
+        ['owner_id', 'created_at'],
+    )
+    op.create_index(
+        'ix_inspectionresult_owner_id_station_id',
+        'inspectionresult',
+        ['owner_id', 'station_id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_inspectionresult_owner_id_station_id', table_name='inspectionresult')
+    op.drop_index('ix_inspectionresult_owner_id_created_at', table_name='inspectionresult')
+    op.drop_column('inspectionresult', 'owner_id')
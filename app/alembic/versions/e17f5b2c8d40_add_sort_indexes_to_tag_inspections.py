@@ -0,0 +1,35 @@
+"""Add sort indexes to tag inspections
+
+Revision ID: e17f5b2c8d40
+Revises: c4e8a1f3d925
+Create Date: 2026-10-19 13:05:48.220615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e17f5b2c8d40'
+down_revision = 'c4e8a1f3d925'
+branch_labels = None
+depends_on = None
+
+# one index per whitelisted sort key of InspectionTAGCRUD.get_inspections;
+# the owner filter leads, the id tie-breaker makes keyset seeks exact
+SORT_KEYS = ('date', 'inspection_type', 'created_at')
+
+
+def upgrade():
+    for key in SORT_KEYS:
+        op.create_index(
+            f'ix_inspectiontagcreate_user_id_{key}_id',
+            'inspectiontagcreate',
+            ['user_id', key, 'id'],
+        )
+
+
+def downgrade():
+    for key in SORT_KEYS:
+        op.drop_index(f'ix_inspectiontagcreate_user_id_{key}_id', table_name='inspectiontagcreate')
@@ -1,16 +1,21 @@
+import uuid
 from collections.abc import Generator
 from typing import Annotated
 
-import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy import event, select
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import engine, read_router
+from app.core.replicas import STICKY_STATE
+from app.core.tables import users
+from app.core.tracing import span
 from app.models import TokenPayload, User
 
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -18,27 +23,64 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 
-def get_db() -> Generator[Session, None, None]:
+def get_db(request: Request) -> Generator[Session, None, None]:
     with Session(engine) as session:
+        if read_router.sticky_until() is not None:
+            # send this caller's next reads to the primary, see get_read_db
+            def pin(_: Session) -> None:
+                setattr(request.state, STICKY_STATE, read_router.sticky_until())
+
+            event.listen(session, "after_commit", pin)
+        yield session
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Session for safe reads, on a healthy replica when any are configured.
+
+    Replicas that can't be connected to are marked failed and the next one,
+    or finally the primary, is tried instead. Sessions on a replica carry
+    `info["replica"]`, their rows may be behind the primary's.
+    """
+    for bind in read_router.read_engines(read_router.is_pinned(request.cookies)):
+        session = Session(bind, info={"replica": bind is not read_router.primary})
+        try:
+            session.connection()
+        except DBAPIError:
+            session.close()
+            if bind is read_router.primary:
+                raise
+            read_router.mark_failed(bind)
+            continue
+        break
+    with session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = session.get(User, token_data.sub)
+def _load_user(session: Session, user_id: uuid.UUID) -> User | None:
+    row = session.execute(select(users).where(users.c.id == user_id)).mappings().first()
+    return User.model_validate(dict(row)) if row else None
+
+
+def get_current_user(session: ReadSessionDep, token: TokenDep) -> User:
+    with span("auth"):
+        try:
+            payload = security.decode_access_token(token)
+            user_id = uuid.UUID(TokenPayload(**payload).sub)
+        except (InvalidTokenError, ValidationError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        user = _load_user(session, user_id)
+        if user is None and session.info.get("replica"):
+            # signed up moments ago, not replicated yet
+            with Session(engine) as primary:
+                user = _load_user(primary, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -54,4 +96,4 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
-    return current_user
\ No newline at end of file
+    return current_user
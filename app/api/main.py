@@ -1,10 +1,13 @@
 from fastapi import APIRouter
 
-from app.api.routes import items
+from app.api.routes import feed, items, storage, utils
 
 
 api_router = APIRouter()
 
 api_router.include_router(items.router)
+api_router.include_router(utils.router)
+api_router.include_router(feed.router)
+api_router.include_router(storage.router)
 
 
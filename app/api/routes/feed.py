@@ -0,0 +1,100 @@
+from collections.abc import AsyncIterator
+from uuid import UUID
+
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.api.deps import CurrentUser, get_current_user
+from app.core.config import settings
+from app.core.db import engine
+from app.core.events import Subscription, broker, inspection_filter
+from app.models import InspectionOutcome
+
+router = APIRouter(prefix="/feed", tags=["feed"])
+
+
+async def _sse_stream(
+    request: Request, subscription: Subscription
+) -> AsyncIterator[str]:
+    dropped = 0
+    try:
+        while not await request.is_disconnected():
+            event = await subscription.get(settings.EVENT_HEARTBEAT_SECONDS)
+            if subscription.dropped != dropped:
+                # tell the client it fell behind and should re-fetch the list
+                yield f"event: lagged\ndata: {subscription.dropped - dropped}\n\n"
+                dropped = subscription.dropped
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield (
+                f"id: {event.inspection_id}\n"
+                f"event: {event.type.value}\n"
+                f"data: {event.model_dump_json()}\n\n"
+            )
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get("/inspections", response_class=StreamingResponse)
+async def stream_inspection_events(
+    request: Request,
+    current_user: CurrentUser,
+    station_id: UUID | None = None,
+    outcome: InspectionOutcome | None = None,
+) -> StreamingResponse:
+    subscription = await broker.subscribe(
+        inspection_filter(current_user.id, station_id, outcome)
+    )
+    return StreamingResponse(
+        _sse_stream(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/inspections/ws")
+async def inspection_events_ws(
+    websocket: WebSocket,
+    token: str = Query(...),
+    station_id: UUID | None = None,
+    outcome: InspectionOutcome | None = None,
+) -> None:
+    # browsers can't set an Authorization header on a websocket handshake
+    try:
+        with Session(engine) as session:
+            user = get_current_user(session, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = await broker.subscribe(
+        inspection_filter(user.id, station_id, outcome)
+    )
+    dropped = 0
+    try:
+        while True:
+            event = await subscription.get(settings.EVENT_HEARTBEAT_SECONDS)
+            if subscription.dropped != dropped:
+                await websocket.send_json(
+                    {"type": "lagged", "dropped": subscription.dropped - dropped}
+                )
+                dropped = subscription.dropped
+            if event is None:
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_text(event.model_dump_json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broker.unsubscribe(subscription)
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, status,Request,Response
-from sqlmodel import Session,select
+from fastapi import APIRouter, HTTPException, Query, status,Request,Response
+from sqlmodel import select
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
-from crud import InspectionService, ImageUploadService,InspectionTAGCRUD
+from app.crud import InspectionService, ImageUploadService,InspectionTAGCRUD
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
-from app.api.deps import  CurrentUser, SessionDep
+from app.api.deps import  CurrentUser, ReadSessionDep, SessionDep
 from app.models import (
    InspectionResult, 
    Tag,
@@ -16,20 +16,75 @@ from app.models import (
    InspectionResultUpdate,
    ImageUploadResponse,
    PaginatedResponse,
-   InspectionOutcome,
     InspectionResult,
     InspectionTagCreate,
    InspectionTagBase,
-   InspectionTagUpdate
+   InspectionTagPage,
+   BatchTagRequest,
+   BatchTagResult,
+   InspectionTagUpdate,
+   DuplicateCapture,
+   GradingSummary,
+   InspectionResultBatch,
+   InspectionResultLookup
 
 )
+from app.core.config import settings
+from app.core.criteria import CriteriaError
+from app.core.etag import etag_matches, weak_etag
+from app.core.fieldsets import FieldsetError, columns, dump_json, list_serializer, page_serializer, parse_fields
+from app.core.tables import inspection_stations
 
-router = APIRouter()
-inspection_service = InspectionService()
+router = APIRouter(tags=["inspections"])
 image_service = ImageUploadService()
 
 templates = Jinja2Templates(directory="templates")
 
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+   if etag_matches(request.headers.get("if-none-match"), etag):
+       return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+   return None
+
+def _set_etag(response: Response, etag: str) -> None:
+   response.headers["ETag"] = etag
+   response.headers["Cache-Control"] = "private, no-cache"
+
+# uploads are parsed by ImageUploadService.save_upload_stream, not by FastAPI,
+# so the multipart body has to be documented by hand
+_IMAGE_UPLOAD_BODY = {
+   "requestBody": {
+       "required": True,
+       "content": {
+           "multipart/form-data": {
+               "schema": {
+                   "type": "object",
+                   "properties": {"file": {"type": "string", "format": "binary"}},
+                   "required": ["file"]
+               }
+           }
+       }
+   }
+}
+
+def _fields(fields: Optional[str], model, required=("id",)) -> Optional[tuple]:
+   try:
+       return parse_fields(fields, model, required)
+   except FieldsetError as e:
+       raise HTTPException(status_code=400, detail=str(e))
+
+def _fieldset_response(serializer, content, etag: Optional[str] = None) -> Response:
+   # narrowed rows skip the response_model and go through the cached
+   # serializer of their field set
+   response = Response(dump_json(serializer, content), media_type="application/json")
+   if etag:
+       _set_etag(response, etag)
+   return response
+
+def _list_etag(request: Request, user_id: UUID, version: tuple) -> str:
+   # a page changes when rows are added, removed or rewritten in its filter set
+   count, last_updated = version
+   return weak_etag(user_id, sorted(request.query_params.multi_items()), count, last_updated)
+
 # Create inspection
 @router.post("/inspections/", 
    response_model=InspectionResult,
@@ -38,27 +93,65 @@ templates = Jinja2Templates(directory="templates")
        201: {"description": "Inspection created successfully"},
        400: {"description": "Invalid input"},
        401: {"description": "Unauthorized"},
-       404: {"description": "Station not found"}
-   }
+       404: {"description": "Station not found"},
+       413: {"description": "Image too large"}
+   },
+   openapi_extra=_IMAGE_UPLOAD_BODY
 )
 async def create_inspection(
+   request: Request,
+   station_id: UUID,
    name: str,
    description: str,
-   file: UploadFile = File(...),
-   current_user =  Depends(CurrentUser),
-   session: Session = SessionDep):
+   current_user: CurrentUser,
+   session: SessionDep):
+
+   service = InspectionService(session)
+   # checked before the body is read, so a bad station stores nothing
+   if not service.owns_station(station_id, current_user):
+       raise HTTPException(status_code=404, detail="Station not found")
 
+   upload_result = await image_service.save_upload_stream(request)
    try:
-       upload_result = await image_service.save_upload_file(file)
        inspection = InspectionResultCreate(
            name=name,
            description=description,
-           captured_image_url=upload_result.file_url
+           captured_image_url=upload_result.file_url,
+           phash=upload_result.phash
        )
-       result = inspection_service.create_inspection_result(inspection, current_user)
-       return result
-   except ValueError as e:
-       raise HTTPException(status_code=400, detail=str(e))
+       return service.create_inspection_result(station_id, inspection, current_user)
+   except Exception as e:
+       # the stored image would be referenced by nothing
+       await image_service.discard(upload_result)
+       if isinstance(e, ValueError):
+           raise HTTPException(status_code=400, detail=str(e))
+       raise
+
+# Resolve many inspections at once
+#Route for 1st problem
+@router.get("/inspections/batch",
+   response_model=InspectionResultBatch,
+   responses={
+       200: {"description": "Success, not found ids are marked found=false"},
+       400: {"description": "Too many ids"},
+       401: {"description": "Unauthorized"}
+   }
+)
+def get_inspections_batch(
+   current_user: CurrentUser,
+   session: ReadSessionDep,
+   ids: List[UUID] = Query(..., description="Repeat for each id, results come back in this order")
+):
+   if len(ids) > settings.MULTI_GET_MAX_IDS:
+       raise HTTPException(
+           status_code=400,
+           detail=f"At most {settings.MULTI_GET_MAX_IDS} ids per request"
+       )
+   results = InspectionService(session).get_inspection_results_by_ids(ids, current_user)
+   return InspectionResultBatch(data=[
+       InspectionResultLookup(id=inspection_id, found=result is not None, result=result)
+       for inspection_id, result in zip(ids, results, strict=True)
+   ])
 
 # Get single inspection
 @router.get("/inspections/{inspection_id}",
@@ -69,20 +162,101 @@ async def create_inspection(
        401: {"description": "Unauthorized"}
    }
 )
-async def get_inspection(
+def get_inspection(
    inspection_id: UUID,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep):
+   request: Request,
+   response: Response,
+   current_user: CurrentUser,
+   session: ReadSessionDep):
 
+   service = InspectionService(session)
+   # answer revalidations from the version column alone
+   version = service.get_inspection_result_version(inspection_id, current_user)
+   if version is not None:
+       not_modified = _not_modified(request, weak_etag(inspection_id, version))
+       if not_modified:
+           return not_modified
 
-   result = inspection_service.get_inspection_result(inspection_id, current_user)
+   result = service.get_inspection_result(inspection_id, current_user)
    if not result:
        raise HTTPException(
            status_code=404,
            detail=f"Inspection with ID {inspection_id} not found"
        )
+   _set_etag(response, weak_etag(result.id, result.version))
    return result
 
+# Near-duplicate captures of the same station
+#Route for 1st problem
+@router.get("/inspections/{inspection_id}/duplicates",
+   response_model=List[DuplicateCapture],
+   responses={
+       200: {"description": "Success"},
+       404: {"description": "Inspection not found"},
+       401: {"description": "Unauthorized"}
+   }
+)
+def get_inspection_duplicates(
+   inspection_id: UUID,
+   current_user: CurrentUser,
+   session: ReadSessionDep,
+   max_distance: int = Query(settings.DUPLICATE_MAX_DISTANCE, ge=0, le=32),
+):
+   service = InspectionService(session)
+   try:
+       return service.find_near_duplicates(inspection_id, current_user, max_distance)
+   except ValueError as e:
+       raise HTTPException(status_code=404, detail=str(e))
+
+# Grade pending inspections of a station against its reference image
+#Route for 1st problem
+@router.post("/stations/{station_id}/grade",
+   response_model=GradingSummary,
+   responses={
+       200: {"description": "Pending inspections graded"},
+       400: {"description": "Invalid station criteria"},
+       404: {"description": "Station not found"},
+       401: {"description": "Unauthorized"}
+   }
+)
+def grade_station_inspections(
+   station_id: UUID,
+   current_user: CurrentUser,
+   session: SessionDep,
+   limit: int = Query(1000, gt=0, le=10000),
+):
+   service = InspectionService(session)
+   try:
+       return service.grade_pending(station_id, current_user, limit)
+   except CriteriaError as e:
+       raise HTTPException(status_code=400, detail=str(e))
+   except ValueError as e:
+       raise HTTPException(status_code=404, detail=str(e))
+
+# Re-apply changed station criteria to its whole history
+#Route for 1st problem
+@router.post("/stations/{station_id}/regrade",
+   response_model=GradingSummary,
+   responses={
+       200: {"description": "Inspections regraded"},
+       400: {"description": "Invalid station criteria"},
+       404: {"description": "Station not found"},
+       401: {"description": "Unauthorized"}
+   }
+)
+def regrade_station_inspections(
+   station_id: UUID,
+   current_user: CurrentUser,
+   session: SessionDep,
+):
+   service = InspectionService(session)
+   try:
+       return service.regrade_station(station_id, current_user)
+   except CriteriaError as e:
+       raise HTTPException(status_code=400, detail=str(e))
+   except ValueError as e:
+       raise HTTPException(status_code=404, detail=str(e))
+
 # Get paginated inspections
 @router.get("/inspections/",
    response_model=PaginatedResponse,
@@ -91,21 +265,51 @@ async def get_inspection(
        401: {"description": "Unauthorized"}
    }
 )
-async def get_inspections(
-   name: Optional[str] = None,
-   description: Optional[str] = None,
+def get_inspections(
+   request: Request,
+   response: Response,
+   current_user: CurrentUser,
+   session: ReadSessionDep,
+   station_id: Optional[UUID] = None,
+   name: Optional[str] = Query(None, description="Part of the station name, case-insensitive"),
+   description: Optional[str] = Query(None, description="Part of the station description, case-insensitive"),
+   created_from: Optional[datetime] = None,
+   created_to: Optional[datetime] = None,
    page: int = Query(1, gt=0), 
    items_per_page: int = Query(10, gt=0, le=100),
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep):
+   fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. id,inspection_outcome,created_at")):
+
+   fieldset = _fields(fields, InspectionResult)
+   service = InspectionService(session)
+   etag = _list_etag(
+       request,
+       current_user.id,
+       service.get_inspection_results_version(
+           current_user, station_id, created_from, created_to, name, description
+       )
+   )
+   not_modified = _not_modified(request, etag)
+   if not_modified:
+       return not_modified
 
-   results, total = inspection_service.get_inspection_results(
+   results, total = service.get_inspection_results(
        user=current_user,
-       name=name,
-       description=description,
+       station_id=station_id,
        page=page, 
-       page_size=items_per_page
+       page_size=items_per_page,
+       created_from=created_from,
+       created_to=created_to,
+       fields=fieldset,
+       name=name,
+       description=description
    )
+   if fieldset:
+       return _fieldset_response(
+           page_serializer(PaginatedResponse, InspectionResult, fieldset),
+           {"data": results, "total": total, "page": page, "page_size": items_per_page},
+           etag
+       )
+   _set_etag(response, etag)
    
    return PaginatedResponse(
        data=results,
@@ -127,11 +331,11 @@ async def get_inspections(
 async def update_inspection(
    inspection_id: UUID,
    update_data: InspectionResultUpdate,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep):
+   current_user: CurrentUser,
+   session: SessionDep):
 
    try:
-       result = inspection_service.update_inspection_result(
+       result = InspectionService(session).update_inspection_result(
            inspection_id, update_data, current_user
        )
        return result
@@ -150,10 +354,10 @@ async def update_inspection(
 )
 async def delete_inspection(
    inspection_id: UUID,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep):
+   current_user: CurrentUser,
+   session: SessionDep):
 
-   if not inspection_service.delete_inspection_result(inspection_id, current_user):
+   if not InspectionService(session).delete_inspection_result(inspection_id, current_user):
        raise HTTPException(
            status_code=404,
            detail=f"Inspection with ID {inspection_id} not found"
@@ -163,66 +367,59 @@ async def delete_inspection(
    }
 
 #Route for 1nd problem
-@router.get("/inspections", response_model=List[InspectionResult])
+@router.get("/inspections", response_model=List[InspectionStation])
 async def list_inspections(
     *,
-    session: Session = SessionDep,
+    session: ReadSessionDep,
     name: Optional[str] = Query(None, description="Filter by inspection name"),
-    description: Optional[str] = Query(None, description="Filter by inspection description")
+    description: Optional[str] = Query(None, description="Filter by inspection description"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. id,name,created_at")
 ):
-    query = select(InspectionStation)
-    
-   
+    fieldset = _fields(fields, InspectionStation)
+    query = select(*columns(inspection_stations, fieldset or InspectionStation.model_fields))
+
     if name:
-        query = query.where(InspectionStation.name.ilike(f"%{name}%"))
-    
-    
+        query = query.where(inspection_stations.c.name.ilike(f"%{name}%"))
+
     if description:
-        query = query.where(InspectionStation.description.ilike(f"%{description}%"))
+        query = query.where(inspection_stations.c.description.ilike(f"%{description}%"))
+
+    rows = session.execute(query).mappings().all()
+    if fieldset:
+        return _fieldset_response(
+            list_serializer(InspectionStation, fieldset),
+            [dict(row) for row in rows]
+        )
 
-    inspections = session.exec(query).all()
-    
-    return [InspectionResult.model_validate(inspection) for inspection in inspections]
+    return [InspectionStation.model_validate(dict(row)) for row in rows]
 
 
 #Add Tag to Inspection: #Route for 2nd problem
 @router.post("/inspections/{inspection_id}/tags", response_model=InspectionTagCreate)
 def add_tag_to_inspection(
-    tag:UUID,
-    tag_data: Tag,
-    session: Session = SessionDep
+   inspection_id: UUID,
+   tag_data: Tag,
+   current_user: CurrentUser,
+   session: SessionDep
 ):
-    inspection = session.get(Tag, tag)
-    if not inspection:
-        raise HTTPException(status_code=404, detail="Inspection not found")
-    
+   # the same set-based edit as the batch endpoint, stored as tag names
+   crud = InspectionTAGCRUD(session)
+   result = crud.batch_tags(current_user.id, BatchTagRequest(add=tag_data.names(), ids=[inspection_id]))
+   if not result.matched:
+      raise HTTPException(status_code=404, detail="Inspection not found")
+   return crud.get_inspection(inspection_id, current_user.id)
 
-    existing_tags = [tag.name for tag in inspection.tags]
-    
-   
-    if tag_data.tags not in existing_tags:
-        new_tag = Tag(name=tag_data.tag)
-        session.add(new_tag)
-        session.commit()
-        session.refresh(inspection)
-    
-    return InspectionTagCreate(
-        id=tag,
-        tags=[tag.name for tag in inspection.tags]
-    )
-    
 #Route for 1st problem
 
 
 
-@router.post("/upload/image/", response_class=HTMLResponse)
+@router.post("/upload/image/", response_class=HTMLResponse, openapi_extra=_IMAGE_UPLOAD_BODY)
 async def upload_image(
-    request: Request,
-    file: UploadFile = File(...)
+    request: Request
 ):
     try:
        
-        upload_result = await image_service.save_upload_file(file)
+        upload_result = await image_service.save_upload_stream(request)
    
         return templates.TemplateResponse(
             "upload.html",
@@ -243,97 +440,112 @@ async def upload_image(
                 "message": str(e)
             }
         )
-@router.post("/inspections/{inspection_id}/image")
+@router.post("/inspections/{inspection_id}/image", openapi_extra=_IMAGE_UPLOAD_BODY)
 async def upload_inspection_image(
     inspection_id: UUID,
-    file: UploadFile = File(...)
+    request: Request
 ):
-    uploaded = await image_service.save_upload_file(file)
+    uploaded = await image_service.save_upload_stream(request)
   
     return uploaded
 # for 2nd model
 @router.get("/inspections/", response_model=List[InspectionTagCreate])
-async def filter_inspections(
+def filter_inspections(
+    current_user: CurrentUser,
+    session: ReadSessionDep,
     inspection_type: Optional[str] = Query(None),
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
     tags: Optional[List[str]] = Query(None),
-    outcome: Optional[InspectionOutcome] = Query(None),
- 
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, gt=0, le=100),
 ):
-    #query = select(InspectionResult).join(InspectionStation)
-    
-    if inspection_type:
-        query = select(InspectionTagCreate).where(InspectionTagCreate.inspection_type == inspection_type)
-    
-    if date_from:
-        query = select(InspectionTagCreate).where(InspectionTagCreate.created_at >= date_from)
-    
-    if date_to:
-        query = select(InspectionTagCreate).where(InspectionResult.created_at <= date_to)
-        
-    if tags:
-        query = select(InspectionTagCreate).where(InspectionStation.inspection_tag.tags.contains(tags))
-        
-    if outcome:
-        query = select(InspectionTagCreate).where(InspectionResult.inspection_outcome == outcome)
-        
-
-   
-    inspections = Session.exec(query).all()
-    
-    return [InspectionTagCreate.model_validate(inspection) for inspection in inspections]
+    # same owner-scoped, cached filter path as the paginated listing
+    crud = InspectionTAGCRUD(session)
+    return crud.get_inspections(
+        user_id=current_user.id,
+        date_from=date_from,
+        date_to=date_to,
+        inspection_type=inspection_type,
+        tags=tags,
+        skip=skip,
+        limit=limit
+    )
 
 
  #Route for 2nd problem
 @router.post("/inspections", response_model=InspectionTagCreate)
 def create_inspection(
    inspection: InspectionTagBase,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep
+   current_user: CurrentUser,
+   session: SessionDep
 ):
    crud = InspectionTAGCRUD(session)
    return crud.create_inspection(inspection, current_user.id)
 
 #Route for 2nd problem
-@router.get("/inspections", response_model=List[InspectionTagCreate])
-def get_inspections(
+# its own path: GET /inspections is the station listing above
+@router.get("/tag-inspections", response_model=InspectionTagPage)
+def list_tag_inspections(
    date_from: Optional[datetime] = None,
    date_to: Optional[datetime] = None,
    inspection_type: Optional[str] = None,
    tags: Optional[List[str]] = Query(None),
    page: int = Query(1, gt=0),
    per_page: int = Query(10, gt=0, le=100),
-   sort_by: Optional[str] = None,
+   sort_by: Optional[str] = Query(None, description="date, inspection_type or created_at"),
    sort_desc: bool = False,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep
+   cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces page"),
+   fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. id,date,inspection_type"),
+   *,
+   request: Request,
+   response: Response,
+   current_user: CurrentUser,
+   session: ReadSessionDep
 ):
+   fieldset = _fields(fields, InspectionTagCreate)
    crud = InspectionTAGCRUD(session)
-   results, total = crud.get_inspections(
+   version = crud.get_inspections_version(
+       user_id=current_user.id,
+       date_from=date_from,
+       date_to=date_to,
+       inspection_type=inspection_type,
+       tags=tags
+   )
+   etag = _list_etag(request, current_user.id, version)
+   not_modified = _not_modified(request, etag)
+   if not_modified:
+       return not_modified
+   results = crud.get_inspections(
        user_id=current_user.id,
-       page=page,
-       page_size=per_page,
        date_from=date_from,
        date_to=date_to,
        inspection_type=inspection_type,
        tags=tags,
+       skip=(page - 1) * per_page,
+       limit=per_page,
        sort_by=sort_by,
-       sort_desc=sort_desc
+       sort_desc=sort_desc,
+       cursor=cursor,
+       fields=fieldset
    )
-   return {
+   page = {
        "data": results,
-       "total": total,
-       "page": page,
-       "per_page": per_page
+       "total": version[0],
+       "per_page": per_page,
+       "next_cursor": crud.next_cursor(results, per_page, sort_by, sort_desc, cursor)
    }
+   if fieldset:
+       return _fieldset_response(page_serializer(InspectionTagPage, InspectionTagCreate, fieldset), page, etag)
+   _set_etag(response, etag)
+   return InspectionTagPage(**page)
 #Route for 2nd problem
 @router.put("/inspections/{inspection_id}", response_model=InspectionTagUpdate)
 def update_inspection(
    inspection_id: UUID,
    update_data: InspectionTagUpdate,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep
+   current_user: CurrentUser,
+   session: SessionDep
 ):
    crud = InspectionTAGCRUD(session)
    try:
@@ -344,8 +556,8 @@ def update_inspection(
 @router.delete("/inspections/{inspection_id}")
 def delete_inspection(
    inspection_id: UUID,
-   current_user =   Depends(CurrentUser),
-   session: Session = SessionDep
+   current_user: CurrentUser,
+   session: SessionDep
 ):
    crud = InspectionTAGCRUD(session)
    if crud.delete_inspection(inspection_id, current_user.id):
@@ -354,13 +566,24 @@ def delete_inspection(
 
 
 
+#Route for 2nd problem
+@router.post("/inspections/tags/batch", response_model=BatchTagResult)
+def batch_tag_inspections(
+   batch: BatchTagRequest,
+   current_user: CurrentUser,
+   session: SessionDep
+):
+   """Add and/or remove tags on the listed ids or on every inspection
+   matching the filter, in one transaction."""
+   return InspectionTAGCRUD(session).batch_tags(current_user.id, batch)
+
  #Route for 2nd problem
 @router.delete("/inspections/{inspection_id}/tags/{tag}")
 def remove_tag(
    inspection_id: UUID,
    tag: str,
-   current_user =  Depends(CurrentUser),
-   session: Session = SessionDep
+   current_user: CurrentUser,
+   session: SessionDep
 ):
    crud = InspectionTAGCRUD(session)
    return crud.remove_tag(inspection_id, current_user.id, tag)
@@ -0,0 +1,65 @@
+import os
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app.api.deps import CurrentUser
+from app.core.storage import LocalStorage, storage
+from app.core.uploads import stream_multipart
+from app.crud import ImageUploadService
+from app.models import (
+    ImageUploadComplete,
+    ImageUploadRequest,
+    ImageUploadResponse,
+    PresignedImageUpload,
+)
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+image_service = ImageUploadService(storage)
+
+
+@router.post("/presign", response_model=PresignedImageUpload)
+def presign_image_upload(
+    current_user: CurrentUser, upload: ImageUploadRequest
+) -> PresignedImageUpload:
+    """Signed target for uploading an image directly to storage."""
+    return image_service.presign_upload(upload, current_user)
+
+
+@router.post("/complete", response_model=ImageUploadResponse)
+async def complete_image_upload(
+    current_user: CurrentUser, upload: ImageUploadComplete
+) -> ImageUploadResponse:
+    """Confirm a direct upload; the returned `file_url` goes on the inspection."""
+    return await image_service.complete_upload(upload.key, current_user)
+
+
+@router.post(
+    "/upload",
+    status_code=status.HTTP_204_NO_CONTENT,
+    include_in_schema=False,
+)
+async def local_presigned_upload(
+    request: Request,
+    key: str,
+    content_type: str,
+    max_size: int,
+    expires: int,
+    signature: str,
+) -> Response:
+    # stands in for the object store's POST endpoint when storage is local;
+    # the signature from presign_upload is the only authorization
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    if not storage.verify_upload(key, content_type, max_size, expires, signature):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Invalid or expired signature")
+
+    def destination(name: str, _filename: str, part_type: str | None) -> str:
+        if name != "file" or part_type != content_type:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Unexpected file part")
+        path = storage.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    await stream_multipart(request.headers, request.stream(), destination, max_size)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,64 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core import profiler
+from app.core.config import settings
+from app.core.queue import JobQueue
+from app.core.server import startup_timings
+from app.models import QueueMetrics
+
+router = APIRouter(prefix="/utils", tags=["utils"])
+
+
+@router.get(
+    "/queue-metrics",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=QueueMetrics,
+)
+def queue_metrics(session: SessionDep) -> QueueMetrics:
+    return JobQueue(session).metrics()
+
+
+@router.get(
+    "/startup-timings",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=dict[str, float],
+)
+def get_startup_timings() -> dict[str, float]:
+    """Seconds from server start to each startup stage of this worker."""
+    return startup_timings
+
+
+@router.get(
+    "/profile",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=PlainTextResponse,
+    responses={
+        200: {
+            "content": {"text/plain": {}, "application/json": {}},
+            "description": "Collapsed stacks, or a speedscope profile",
+        },
+        409: {"description": "A profile is already running"},
+    },
+)
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    hz: int = Query(100, ge=1, le=1000),
+    format: Literal["collapsed", "speedscope"] = "collapsed",
+    idle: bool = False,
+) -> Response:
+    """Sample the stacks of this worker's event loop and threadpool threads.
+
+    Collapsed output feeds flamegraph.pl or speedscope directly; in a
+    multi-worker server only the worker handling this request is profiled.
+    """
+    try:
+        stacks = await profiler.profile(seconds, hz, idle)
+    except profiler.ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    if format == "speedscope":
+        return JSONResponse(profiler.speedscope(stacks, hz, name=f"{seconds:g}s"))
+    return PlainTextResponse(profiler.collapsed(stacks))
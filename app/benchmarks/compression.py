@@ -0,0 +1,73 @@
+"""CPU cost against bytes saved for each response encoding and level.
+
+    python -m app.benchmarks.compression --items 100 --repeat 50
+
+Compresses a list page shaped like the inspection list endpoints (100
+results by default) with every available encoding at a few levels, and
+prints the compressed size, ratio and the compression time per response.
+The time column is what each response costs a worker's CPU; --link-kbps
+adds the transfer time on a link of that speed so the two can be weighed.
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.compression import available_encodings, compress
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 5, 11], "zstd": [1, 3, 19]}
+
+
+def sample_page(items: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    station_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    started = datetime(2026, 1, 1)
+    data = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "station_id": station_id,
+            "inspection_outcome": rng.choices(["passed", "failed"], [9, 1])[0],
+            "notes": rng.choice([None, "rechecked", "operator override"]),
+            "image_url": f"/static/uploads/{rng.getrandbits(32):08x}.jpg",
+            "created_at": (started + timedelta(seconds=i * 7)).isoformat(),
+            "version": 1,
+        }
+        for i in range(items)
+    ]
+    return json.dumps({"data": data, "total": items}).encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--link-kbps", type=float, default=1000.0, help="dashboard link speed"
+    )
+    args = parser.parse_args()
+
+    body = sample_page(args.items)
+    per_ms = args.link_kbps * 1000 / 8 / 1000  # bytes per millisecond
+    print(f"{args.items} items, {len(body)} bytes identity, {args.link_kbps} kbit/s")
+    print(f"{'encoding':<10} {'bytes':>8} {'ratio':>6} {'cpu ms':>8} {'link ms':>8}")
+    print(
+        f"{'identity':<10} {len(body):>8} {1:>6.2f} {0:>8.3f} {len(body) / per_ms:>8.1f}"
+    )
+    for encoding in available_encodings():
+        for level in LEVELS[encoding]:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                packed = compress(body, encoding, level)
+            cpu = (time.perf_counter() - started) * 1000 / args.repeat
+            print(
+                f"{encoding + '-' + str(level):<10} {len(packed):>8} "
+                f"{len(body) / len(packed):>6.2f} {cpu:>8.3f} "
+                f"{len(packed) / per_ms:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Round trips and latency of the result update path, before and after RETURNING.
+
+    python -m app.benchmarks.update_returning --rows 2000 --rtt-ms 0.5
+
+The legacy path is what InspectionService.update_inspection_result used to
+do: SELECT the owned row, UPDATE it, COMMIT and SELECT it again to refresh.
+The returning path is the single owner-scoped UPDATE ... RETURNING and a
+COMMIT. Both run against a scratch table shaped like inspectionresult, on
+a temporary SQLite file by default or on --database-url. --rtt-ms adds a
+simulated network round trip to every statement and commit, which is what
+dominates against a database on another host.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy import Connection, Engine, event
+
+metadata = sa.MetaData()
+results = sa.Table(
+    "bench_inspectionresult",
+    metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("owner_id", sa.Uuid, nullable=False, index=True),
+    sa.Column("station_id", sa.Uuid, nullable=False),
+    sa.Column("inspection_outcome", sa.String(16), nullable=False),
+    sa.Column("notes", sa.String(255)),
+    sa.Column("version", sa.Integer, nullable=False, default=1),
+    sa.Column("updated_at", sa.DateTime),
+)
+
+
+class RoundTrips:
+    """Counts statements and commits, optionally sleeping for each one."""
+
+    def __init__(self, engine: Engine, rtt: float):
+        self.count = 0
+        self.rtt = rtt
+        event.listen(engine, "before_cursor_execute", self._trip)
+        event.listen(engine, "commit", self._trip)
+
+    def _trip(self, *args: object) -> None:
+        self.count += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+
+def legacy_update(
+    connection: Connection, row_id: uuid.UUID, owner_id: uuid.UUID
+) -> None:
+    owned = sa.and_(results.c.id == row_id, results.c.owner_id == owner_id)
+    row = connection.execute(sa.select(results).where(owned)).first()
+    if row is None:
+        raise LookupError(row_id)
+    connection.execute(
+        sa.update(results)
+        .where(results.c.id == row_id)
+        .values(notes="rechecked", version=row.version + 1, updated_at=datetime.now())
+    )
+    connection.commit()
+    connection.execute(sa.select(results).where(results.c.id == row_id)).one()
+
+
+def returning_update(
+    connection: Connection, row_id: uuid.UUID, owner_id: uuid.UUID
+) -> None:
+    row = connection.execute(
+        sa.update(results)
+        .where(results.c.id == row_id, results.c.owner_id == owner_id)
+        .values(
+            notes="rechecked",
+            version=results.c.version + 1,
+            updated_at=datetime.now(),
+        )
+        .returning(*results.c)
+    ).first()
+    if row is None:
+        raise LookupError(row_id)
+    connection.commit()
+
+
+def run(
+    engine: Engine,
+    trips: RoundTrips,
+    path: Callable[[Connection, uuid.UUID, uuid.UUID], None],
+    rows: list[tuple[uuid.UUID, uuid.UUID]],
+) -> tuple[float, list[float]]:
+    timings = []
+    trips.count = 0
+    with engine.connect() as connection:
+        for row_id, owner_id in rows:
+            started = time.perf_counter()
+            path(connection, row_id, owner_id)
+            timings.append((time.perf_counter() - started) * 1000)
+    return trips.count / len(rows), timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument(
+        "--rtt-ms", type=float, default=0.0, help="simulated network round trip"
+    )
+    args = parser.parse_args()
+
+    scratch = None
+    url = args.database_url
+    if url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite:///{scratch.name}"
+    engine = sa.create_engine(url)
+    try:
+        metadata.drop_all(engine)
+        metadata.create_all(engine)
+        owner_id = uuid.uuid4()
+        rows = [(uuid.uuid4(), owner_id) for _ in range(args.rows)]
+        with engine.begin() as connection:
+            connection.execute(
+                results.insert(),
+                [
+                    {
+                        "id": row_id,
+                        "owner_id": owner,
+                        "station_id": uuid.uuid4(),
+                        "inspection_outcome": "passed",
+                        "version": 1,
+                    }
+                    for row_id, owner in rows
+                ],
+            )
+
+        trips = RoundTrips(engine, args.rtt_ms / 1000)
+        print(f"{args.rows} updates on {engine.dialect.name}, rtt {args.rtt_ms} ms")
+        print(
+            f"{'path':<10} {'trips/op':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for name, path in (("legacy", legacy_update), ("returning", returning_update)):
+            per_op, timings = run(engine, trips, path, rows)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(
+                f"{name:<10} {per_op:>8.1f} {statistics.fmean(timings):>8.3f} "
+                f"{statistics.median(timings):>8.3f} {p95:>8.3f}"
+            )
+    finally:
+        metadata.drop_all(engine)
+        engine.dispose()
+        if scratch is not None:
+            scratch.close()
+            os.unlink(scratch.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from app.core.config import settings
+
+
+class CacheBackend(ABC):
+    # whether every process sees the same entries; a process-local backend
+    # never hears about writes made by other workers
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return [self.get(key) for key in keys]
+
+    def get_many_with_counter(
+        self, counter_key: str, keys: list[str]
+    ) -> tuple[int, list[bytes | None]]:
+        return self.counter(counter_key), self.get_many(keys)
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None: ...
+
+    @abstractmethod
+    def delete(self, keys: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int: ...
+
+    @abstractmethod
+    def counter(self, key: str) -> int: ...
+
+
+class NullCache(CacheBackend):
+    def get(self, key: str) -> bytes | None:
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        pass
+
+    def delete(self, keys: Iterable[str]) -> None:
+        pass
+
+    def incr(self, key: str) -> int:
+        return 0
+
+    def counter(self, key: str) -> int:
+        return 0
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU bounded by entry count and total value size."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, expires)
+            self._size += len(value)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def incr(self, key: str) -> int:
+        # counters live outside the LRU so a generation is never evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+
+class RedisCache(CacheBackend):
+    shared = True
+
+    def __init__(self, client: Any, ttl: float | None = None):
+        self.client = client
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float | None = None) -> "RedisCache":
+        import redis  # optional dependency
+
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def get(self, key: str) -> bytes | None:
+        value: bytes | None = self.client.get(key)
+        return value
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]:
+        # one MGET instead of a round trip per key
+        return list(self.client.mget(keys)) if keys else []
+
+    def get_many_with_counter(
+        self, counter_key: str, keys: list[str]
+    ) -> tuple[int, list[bytes | None]]:
+        # counters are plain keys here, so the same MGET reads it
+        counter, *values = self.client.mget([counter_key, *keys])
+        return int(counter or 0), values
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        # keep each DEL to a bounded number of keys
+        for start in range(0, len(keys), 1000):
+            self.client.delete(*keys[start : start + 1000])
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def counter(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, datetime | date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, list | tuple | set | frozenset):
+        return sorted(_normalize(item) for item in value)
+    return value
+
+
+def filter_key(**filters: Any) -> str:
+    """Stable key for a filter combination.
+
+    Unset filters are dropped and list filters are sorted, so requests that
+    mean the same thing share one cache entry.
+    """
+    normalized = {
+        name: _normalize(value)
+        for name, value in filters.items()
+        if value is not None and value != [] and value != ()
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class InspectionCache:
+    """Key layout and invalidation for inspection reads.
+
+    Single results are cached per owner and id and deleted when that row is
+    written. They are only cached in a shared backend: rows are also written
+    by other API workers and the job worker, and a process-local copy would
+    outlive those writes. Filtered lists embed a per-owner generation number;
+    any write by an owner bumps it, which orphans exactly that owner's list
+    entries and leaves them to age out of the LRU or TTL.
+
+    Single results carry that generation too, as read before the database
+    query that produced them, and only count while it is current. Writers
+    invalidate after they commit, so a reader that loaded a row before a
+    write and stores it after the invalidation stores it under a generation
+    that is already gone, rather than serving the old row for a TTL.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def result_key(self, owner_id: UUID, result_id: UUID) -> str:
+        return f"inspection:{owner_id}:{result_id}"
+
+    def get_results(
+        self, owner_id: UUID, result_ids: list[UUID]
+    ) -> tuple[int, list[bytes | None]]:
+        """Cached rows in `result_ids` order, and the generation to pass to
+        set_result for rows loaded from the database after this call."""
+        if not self.backend.shared:
+            return 0, [None] * len(result_ids)
+        generation, values = self.backend.get_many_with_counter(
+            self._generation_key(owner_id),
+            [self.result_key(owner_id, key) for key in result_ids],
+        )
+        prefix = self._generation_prefix(generation)
+        return generation, [
+            value[len(prefix) :] if value and value.startswith(prefix) else None
+            for value in values
+        ]
+
+    def set_result(
+        self, owner_id: UUID, result_id: UUID, value: bytes, generation: int
+    ) -> None:
+        if self.backend.shared:
+            self.backend.set(
+                self.result_key(owner_id, result_id),
+                self._generation_prefix(generation) + value,
+            )
+
+    def list_key(self, namespace: str, owner_id: UUID, **filters: Any) -> str:
+        generation = self.backend.counter(self._generation_key(owner_id))
+        return f"{namespace}:{owner_id}:{generation}:{filter_key(**filters)}"
+
+    def invalidate_results(self, owner_id: UUID, result_ids: Iterable[UUID]) -> None:
+        self.backend.delete(self.result_key(owner_id, key) for key in result_ids)
+        self.invalidate_lists(owner_id)
+
+    def invalidate_lists(self, owner_id: UUID) -> None:
+        self.backend.incr(self._generation_key(owner_id))
+
+    def _generation_key(self, owner_id: UUID) -> str:
+        return f"inspections:generation:{owner_id}"
+
+    def _generation_prefix(self, generation: int) -> bytes:
+        return f"{generation}:".encode()
+
+
+def _create_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis" and settings.CACHE_REDIS_URL:
+        return RedisCache.from_url(settings.CACHE_REDIS_URL, settings.CACHE_TTL_SECONDS)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(
+            settings.CACHE_MAX_ENTRIES,
+            settings.CACHE_MAX_BYTES,
+            settings.CACHE_TTL_SECONDS,
+        )
+    return NullCache()
+
+
+inspection_cache = InspectionCache(_create_backend())
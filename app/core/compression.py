@@ -0,0 +1,355 @@
+import gzip
+import mimetypes
+import os
+import zlib
+from collections.abc import Iterator
+from typing import Any, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional, `pip install brotli`
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional, `pip install zstandard`
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+# content types that must reach the client as they are written; a
+# compressor would hold events back until it had a full block
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+# what each encoding's precompressed sibling file is called
+SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def sync(self) -> bytes:
+        """Everything compressed so far, decodable without the stream's end."""
+
+    def flush(self) -> bytes: ...
+
+
+class _Zlib:
+    def __init__(self, level: int):
+        # wbits 16 + 15 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def sync(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def sync(self) -> bytes:
+        return self._compressor.flush()
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def sync(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> list[str]:
+    """Encodings this process can produce, most preferred first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def compressor(encoding: str, level: int | None = None) -> Compressor:
+    """A streaming compressor; `level` None picks a speed-leaning default."""
+    if encoding == "gzip":
+        return _Zlib(6 if level is None else level)
+    if encoding == "br" and brotli is not None:
+        return _Brotli(5 if level is None else level)
+    if encoding == "zstd" and zstandard is not None:
+        return _Zstd(3 if level is None else level)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    c = compressor(encoding, level)
+    return c.compress(data) + c.flush()
+
+
+def negotiate(accept_encoding: str | None, available: list[str]) -> str | None:
+    """The encoding to answer an Accept-Encoding header with, if any.
+
+    Highest q-value wins; among equal q-values the order of `available`
+    (our preference) decides. `*` covers encodings not named explicitly.
+    """
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, wildcard)
+        if encoding == "gzip":
+            q = max(q, weights.get("x-gzip", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(
+        UNCOMPRESSED_TYPES
+    )
+
+
+class CompressionMiddleware:
+    """Compresses responses with the best encoding the client accepts.
+
+    Bodies smaller than `minimum_size` are sent as they are, since the
+    encoding headers and CPU would cost more than the bytes saved. Streamed
+    responses are compressed chunk by chunk without buffering the whole
+    body; only the first chunk is held back to decide whether it's worth it,
+    and each chunk is flushed so the client can decode it as it arrives.
+    Responses that are already encoded, or whose content type doesn't
+    compress (images, event streams), pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: list[str] | None = None,
+        levels: dict[str, int] | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [
+            e
+            for e in (encodings or available_encodings())
+            if e in available_encodings()
+        ]
+        self.levels = levels or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding"), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(
+            send, encoding, self.levels.get(encoding), self.minimum_size
+        )
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, level: int | None, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start: Message | None = None
+        self.compressor: Compressor | None = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            length = headers.get("content-length")
+            self.passthrough = (
+                message["status"] in (204, 206, 304)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+                or (length is not None and int(length) < self.minimum_size)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # sent together with the first body chunk, once we know
+                self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            if (etag := headers.get("etag")) and not etag.startswith("W/"):
+                # the bytes differ from the identity body the tag names
+                headers["ETag"] = f"W/{etag}"
+            self.compressor = compressor(self.encoding, self.level)
+            if not more_body:
+                body = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start)
+
+        assert self.compressor is not None
+        # a sync flush per chunk, so a slow stream isn't held in the
+        # compressor's window until enough bytes arrive to fill a block
+        body = self.compressor.compress(body) + (
+            self.compressor.sync() if more_body else self.compressor.flush()
+        )
+        await self.send(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
+
+
+def precompress(
+    directory: str,
+    encodings: list[str] | None = None,
+    minimum_size: int = 1024,
+) -> Iterator[tuple[str, str, int, int]]:
+    """Write `.gz`/`.br`/`.zst` siblings of compressible files, best level.
+
+    Static assets change only on deploy, so they can afford the slowest,
+    smallest settings once instead of a fast level on every request.
+    Siblings that are up to date, or wouldn't be smaller, are skipped.
+    Yields (path, encoding, original size, compressed size) per file written.
+    """
+    best = {"gzip": 9, "br": 11, "zstd": 19}
+    encodings = encodings or available_encodings()
+    suffixes = tuple(SUFFIXES.values())
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(suffixes) or not is_compressible(
+                mimetypes.guess_type(name)[0]
+            ):
+                continue
+            stat = os.stat(path)
+            if stat.st_size < minimum_size:
+                continue
+            data = None
+            for encoding in encodings:
+                target = path + SUFFIXES[encoding]
+                if os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                if encoding == "gzip":
+                    # mtime 0 keeps the output reproducible between builds
+                    packed = gzip.compress(data, best["gzip"], mtime=0)
+                else:
+                    packed = compress(data, encoding, best[encoding])
+                if len(packed) >= len(data):
+                    continue
+                with open(target + ".tmp", "wb") as f:
+                    f.write(packed)
+                os.replace(target + ".tmp", target)
+                yield path, encoding, len(data), len(packed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves `<file>.zst`/`.br`/`.gz` when the client accepts it.
+
+    The siblings come from `python -m app.precompress`; a file without a
+    fresh sibling is served as is. CompressionMiddleware leaves the
+    precompressed responses alone since they already carry an encoding.
+    """
+
+    def file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0]
+        encoding = None
+        if status_code == 200 and is_compressible(media_type):
+            encoding = negotiate(request_headers.get("accept-encoding"), list(SUFFIXES))
+        if encoding is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        sibling = f"{full_path}{SUFFIXES[encoding]}"
+        try:
+            sibling_stat = os.stat(sibling)
+        except OSError:
+            sibling_stat = None
+        if sibling_stat is None or sibling_stat.st_mtime < stat_result.st_mtime:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        else:
+            response = FileResponse(
+                sibling,
+                stat_result=sibling_stat,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                response = NotModifiedResponse(response.headers)
+        response.headers.add_vary_header("Accept-Encoding")
+        return response
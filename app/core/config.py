@@ -68,6 +68,47 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Connection pool of each process; `python -m app.serve` derives these
+    # from DB_POOL_BUDGET, the connections the database grants this service
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_BUDGET: int = 100
+
+    # Production server, see app/serve.py; workers default to 2 x CPU + 1
+    # capped by the pool budget
+    SERVER_BIND: str = "0.0.0.0:8000"
+    SERVER_WORKERS: int | None = None
+    SERVER_TIMEOUT: int = 60
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_KEEPALIVE: int = 5
+    # recycle each worker after this many requests, jittered so they don't
+    # all restart together
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+
+    # Response compression; zstd and br need the zstandard and brotli
+    # packages, gzip is always available
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = [
+        "zstd",
+        "br",
+        "gzip",
+    ]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Read replicas for GET traffic, comma separated SQLAlchemy URLs
+    DATABASE_REPLICA_URLS: Annotated[list[str] | str, BeforeValidator(parse_cors)] = []
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
+    # skip replicas further behind the primary than this (PostgreSQL only)
+    REPLICA_MAX_LAG_SECONDS: float | None = 10.0
+    # keep a client's reads on the primary for this long after its own
+    # writes (a cookie); 0 turns read-your-writes stickiness off
+    REPLICA_STICKY_SECONDS: float = 5.0
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -86,6 +127,110 @@ class Settings(BaseSettings):
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
 
+    # Hamming distance between perceptual hashes still treated as the same frame
+    DUPLICATE_MAX_DISTANCE: int = 6
+
+    # Reference image comparison, intensities are normalised to 0..1
+    GRADING_IMAGE_SIZE: int = 128
+    GRADING_PIXEL_THRESHOLD: float = 0.15
+    GRADING_MAX_MEAN_DIFF: float = 0.08
+    GRADING_MAX_DEFECT_RATIO: float = 0.02
+    GRADING_MAX_SHIFT: int = 16
+    # 0 uses one process per CPU
+    GRADING_WORKERS: int = 0
+    GRADING_BATCH_SIZE: int = 32
+    # hosts reference and captured images may be fetched from besides the
+    # storage backend; anything else is refused, and redirects aren't followed
+    GRADING_ALLOWED_HOSTS: list[str] = []
+
+    # Background job queue and `python -m app.worker`; turn off only for a
+    # single process that doesn't grade, e.g. local development
+    JOB_WORKER_ENABLED: bool = True
+    WORKER_CONCURRENCY: int = 4
+    WORKER_BATCH_SIZE: int = 32
+    WORKER_POLL_INTERVAL: float = 1.0
+    JOB_VISIBILITY_TIMEOUT: float = 300.0
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_BACKOFF_BASE: float = 2.0
+    JOB_BACKOFF_MAX: float = 600.0
+
+    # Live inspection feed; set a redis:// URL to fan out across workers
+    EVENT_BROKER_URL: str | None = None
+    EVENT_BUFFER_SIZE: int = 256
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+
+    # Most ids one GET /inspections/batch may resolve
+    MULTI_GET_MAX_IDS: int = 100
+
+    # Image uploads: write size for streamed parts and buffered copies, and
+    # how finished files are made durable (see FileSync in app/core/uploads.py)
+    UPLOAD_BUFFER_SIZE: int = 1024 * 1024
+    UPLOAD_FSYNC: Literal["none", "file", "batch"] = "batch"
+    UPLOAD_FSYNC_BATCH_INTERVAL: float = 0.005
+    UPLOAD_FSYNC_BATCH_SIZE: int = 64
+
+    # Built-in request tracing: spans for upload parsing, storage, SQL,
+    # commits, auth and serialization, written as one JSON line per sampled
+    # request; summarize with `python -m app.traces`. "{pid}" in the file
+    # name gives each worker its own file
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_MAX_QUEUE: int = 10_000
+
+    # Longest run of GET /utils/profile, the superuser sampling profiler
+    PROFILER_MAX_SECONDS: float = 60.0
+
+    # Read-through cache for inspection lookups and filtered lists. "memory"
+    # is per process: only for one API worker without the job worker, and it
+    # caches lists only; single rows are cached with "redis"
+    CACHE_BACKEND: Literal["memory", "redis", "none"] = "none"
+    CACHE_REDIS_URL: str | None = None
+    CACHE_MAX_ENTRIES: int = 10_000
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_TTL_SECONDS: float = 300.0
+
+    # Per-user token buckets (keyed by the JWT subject, else client address)
+    # and per-route-class concurrency caps; see app/core/ratelimit.py
+    ADMISSION_CONTROL_ENABLED: bool = True
+    RATE_LIMIT_UPLOADS_PER_SECOND: float = 2.0
+    RATE_LIMIT_UPLOADS_BURST: float = 20.0
+    RATE_LIMIT_READS_PER_SECOND: float = 20.0
+    RATE_LIMIT_READS_BURST: float = 100.0
+    RATE_LIMIT_WRITES_PER_SECOND: float = 10.0
+    RATE_LIMIT_WRITES_BURST: float = 50.0
+    ADMISSION_MAX_UPLOADS: int = 8
+    ADMISSION_MAX_READS: int = 64
+    ADMISSION_MAX_WRITES: int = 32
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0
+    # shed new requests of a class whose average latency is above this
+    ADMISSION_LATENCY_LIMIT: float = 10.0
+
+    # Where inspection images are stored; "s3" works with any S3-compatible
+    # endpoint (MinIO for local development) and needs boto3
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    STORAGE_LOCAL_ROOT: str = "static/uploads"
+    STORAGE_LOCAL_URL: str = "/static/uploads"
+    STORAGE_PRESIGN_EXPIRES: int = 900
+    # fan-out of new upload keys; move old flat files with
+    # `python -m app.migrate_uploads`
+    STORAGE_LAYOUT: Literal["flat", "hash", "date"] = "hash"
+    S3_BUCKET: str | None = None
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    S3_ACCESS_KEY_ID: str | None = None
+    S3_SECRET_ACCESS_KEY: str | None = None
+    # public or CDN base URL of the bucket, defaults to the endpoint
+    S3_PUBLIC_URL: str | None = None
+
+    # Monthly partitions of the inspection tables (PostgreSQL); the worker
+    # keeps PARTITION_MONTHS_AHEAD months created in advance and
+    # `python -m app.partitions` archives the old ones
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_ARCHIVE_AFTER_MONTHS: int = 24
+    PARTITION_ARCHIVE_SCHEMA: str = "archive"
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def emails_enabled(self) -> bool:
@@ -108,6 +253,18 @@ class Settings(BaseSettings):
             else:
                 raise ValueError(message)
 
+    @model_validator(mode="after")
+    def _check_cache_backend(self) -> Self:
+        if self.CACHE_BACKEND == "redis" and not self.CACHE_REDIS_URL:
+            raise ValueError('CACHE_BACKEND="redis" needs CACHE_REDIS_URL')
+        if self.CACHE_BACKEND == "memory" and self.JOB_WORKER_ENABLED:
+            # the job worker's writes would never evict the API's entries
+            raise ValueError(
+                'CACHE_BACKEND="memory" is per process and can\'t be used with the '
+                'job worker; use "redis", or "none"'
+            )
+        return self
+
     @model_validator(mode="after")
     def _enforce_non_default_secrets(self) -> Self:
         self._check_default_secret("SECRET_KEY", self.SECRET_KEY)
@@ -0,0 +1,138 @@
+import operator
+import re
+from collections.abc import Callable, Collection, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+# One criterion per string, every criterion of a station has to hold:
+#
+#   mean_diff < 0.05            threshold on a measured feature
+#   0.9 <= ncc <= 1             numeric range, inclusive or exclusive bounds
+#   shift between 0 and 4       numeric range, inclusive
+#   tag scratch / has tag dent  tag must be present
+#   no tag rework               tag must be absent
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_NAME = r"[A-Za-z_][A-Za-z0-9_]*"
+_OP = r"<=|>=|==|!=|<|>"
+
+_COMPARISON = re.compile(rf"^({_NAME})\s*({_OP})\s*({_NUMBER})$")
+_RANGE = re.compile(rf"^({_NUMBER})\s*(<=|<)\s*({_NAME})\s*(<=|<)\s*({_NUMBER})$")
+_BETWEEN = re.compile(
+    rf"^({_NAME})\s+between\s+({_NUMBER})\s+and\s+({_NUMBER})$", re.IGNORECASE
+)
+_TAG = re.compile(r"^(has\s+tag|tag|no\s+tag|not\s+tag)\s+(\S+)$", re.IGNORECASE)
+
+_OPERATORS: dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class CriteriaError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FeatureRule:
+    feature: str
+    op: str
+    value: float
+
+    def evaluate(self, column: np.ndarray) -> np.ndarray:
+        # a missing measurement is NaN, and NaN fails every comparison but !=
+        return _OPERATORS[self.op](column, self.value)
+
+
+@dataclass(frozen=True)
+class TagRule:
+    tag: str
+    present: bool
+
+
+@dataclass(frozen=True)
+class CompiledCriteria:
+    feature_rules: tuple[FeatureRule, ...]
+    tag_rules: tuple[TagRule, ...]
+
+    @property
+    def features(self) -> tuple[str, ...]:
+        return tuple(sorted({rule.feature for rule in self.feature_rules}))
+
+    def evaluate(
+        self,
+        columns: Mapping[str, np.ndarray],
+        tags: Sequence[Collection[str] | None] | None = None,
+        size: int | None = None,
+    ) -> np.ndarray:
+        """Boolean pass mask for a batch of rows given as feature columns."""
+        if size is None:
+            size = len(next(iter(columns.values()))) if columns else len(tags or ())
+        mask = np.ones(size, dtype=bool)
+        for rule in self.feature_rules:
+            column = columns.get(rule.feature)
+            if column is None:
+                column = np.full(size, np.nan)
+            mask &= rule.evaluate(column)
+        if self.tag_rules:
+            row_tags = [set(t) if t else set() for t in tags or [None] * size]
+            for tag_rule in self.tag_rules:
+                has_tag = np.fromiter(
+                    (tag_rule.tag in t for t in row_tags), dtype=bool, count=size
+                )
+                mask &= has_tag if tag_rule.present else ~has_tag
+        return mask
+
+
+def _parse(criterion: str) -> list[FeatureRule | TagRule]:
+    text = " ".join(criterion.split())
+    if match := _COMPARISON.match(text):
+        name, op, value = match.groups()
+        return [FeatureRule(name, op, float(value))]
+    if match := _RANGE.match(text):
+        low, low_op, name, high_op, high = match.groups()
+        return [
+            FeatureRule(name, ">=" if low_op == "<=" else ">", float(low)),
+            FeatureRule(name, high_op, float(high)),
+        ]
+    if match := _BETWEEN.match(text):
+        name, low, high = match.groups()
+        return [
+            FeatureRule(name, ">=", float(low)),
+            FeatureRule(name, "<=", float(high)),
+        ]
+    if match := _TAG.match(text):
+        kind, tag = match.groups()
+        return [TagRule(tag, present=not kind.lower().startswith("no"))]
+    raise CriteriaError(f"Cannot parse criterion {criterion!r}")
+
+
+@lru_cache(maxsize=256)
+def _compile(criteria: tuple[str, ...]) -> CompiledCriteria:
+    rules = [rule for criterion in criteria for rule in _parse(criterion)]
+    return CompiledCriteria(
+        feature_rules=tuple(r for r in rules if isinstance(r, FeatureRule)),
+        tag_rules=tuple(r for r in rules if isinstance(r, TagRule)),
+    )
+
+
+def compile_criteria(criteria: Iterable[str] | None) -> CompiledCriteria:
+    """Compile a station's criteria, cached on the exact list of strings."""
+    return _compile(tuple(c for c in criteria or () if c.strip()))
+
+
+def feature_columns(
+    rows: Sequence[Mapping[str, float] | None], features: Iterable[str]
+) -> dict[str, np.ndarray]:
+    return {
+        name: np.array(
+            [(row or {}).get(name, np.nan) for row in rows], dtype=np.float64
+        )
+        for name in features
+    }
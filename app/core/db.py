@@ -2,9 +2,25 @@ from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.replicas import ReplicaRouter
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": True,
+}
+
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **pool_options)
+
+read_router = ReplicaRouter(
+    engine,
+    [create_engine(url, **pool_options) for url in settings.DATABASE_REPLICA_URLS],
+    health_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
+)
 
 
 
@@ -21,4 +37,4 @@ def init_db(session: Session) -> None:
             password=settings.FIRST_SUPERUSER_PASSWORD,
             is_superuser=True,
         )
-        user = crud.create_user(session=session, user_create=user_in)
\ No newline at end of file
+        user = crud.create_user(session=session, user_create=user_in)
@@ -0,0 +1,27 @@
+import hashlib
+from typing import Any
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak validator built from whatever identifies the representation.
+
+    Weak because the JSON body for a given version is equivalent but not
+    guaranteed byte-identical across releases or compression settings.
+    """
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=12
+    )
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses the weak comparison function (RFC 9110, 13.1.2)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
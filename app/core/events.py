@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from uuid import UUID
+
+from app.core.config import settings
+from app.models import InspectionEvent, InspectionOutcome
+
+logger = logging.getLogger(__name__)
+
+EventFilter = Callable[[InspectionEvent], bool]
+
+
+def inspection_filter(
+    owner_id: UUID,
+    station_id: UUID | None = None,
+    outcome: InspectionOutcome | None = None,
+) -> EventFilter:
+    def matches(event: InspectionEvent) -> bool:
+        return (
+            event.owner_id == owner_id
+            and (station_id is None or event.station_id == station_id)
+            and (outcome is None or event.inspection_outcome == outcome)
+        )
+
+    return matches
+
+
+class Subscription:
+    """Bounded per-client buffer.
+
+    A slow consumer never blocks the publisher: when the buffer is full the
+    oldest event is dropped and counted, so the client can tell it lagged.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        matches: EventFilter,
+        maxsize: int,
+    ):
+        self.loop = loop
+        self.matches = matches
+        self.queue: asyncio.Queue[InspectionEvent] = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _offer(self, event: InspectionEvent) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def offer(self, event: InspectionEvent) -> None:
+        # publishers run in threadpool threads, hand over to the client's loop
+        if self.matches(event):
+            self.loop.call_soon_threadsafe(self._offer, event)
+
+    async def get(self, timeout: float | None = None) -> InspectionEvent | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class EventBroker(ABC):
+    def __init__(self) -> None:
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def publish(self, event: InspectionEvent) -> None:
+        """Send an event to every matching subscriber, never blocks."""
+
+    def deliver(self, event: InspectionEvent) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.offer(event)
+            except RuntimeError:
+                # the subscriber's event loop is gone
+                self._remove(subscription)
+
+    async def subscribe(
+        self, matches: EventFilter, maxsize: int | None = None
+    ) -> Subscription:
+        subscription = Subscription(
+            asyncio.get_running_loop(), matches, maxsize or settings.EVENT_BUFFER_SIZE
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+class InMemoryBroker(EventBroker):
+    """Fan-out inside one process, enough for a single worker and tests.
+
+    Only events published by this process reach its subscribers: writes
+    handled by other API workers and results graded by the job worker never
+    show up. Those setups need EVENT_BROKER_URL (RedisBroker).
+    """
+
+    def publish(self, event: InspectionEvent) -> None:
+        self.deliver(event)
+
+
+class RedisBroker(EventBroker):
+    """Fan-out across workers and the job worker through Redis pub/sub.
+
+    Events are only published to Redis; every process, including the
+    publishing one, receives them back from its listener and delivers them
+    to its local subscribers. Publishing happens on a thread of its own, in
+    order, so request handlers and the event loop never wait on Redis.
+    """
+
+    channel = "inspection-events"
+    reconnect_delay = 1.0
+    max_reconnect_delay = 30.0
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis  # optional dependency, only needed for multi-worker setups
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._publisher = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="event-publisher"
+        )
+        self._listener: asyncio.Task[None] | None = None
+
+    def publish(self, event: InspectionEvent) -> None:
+        self._publisher.submit(self._publish, event.model_dump_json())
+
+    def _publish(self, payload: str) -> None:
+        try:
+            self._client.publish(self.channel, payload)
+        except Exception as e:
+            logger.warning("Could not publish inspection event: %s", e)
+
+    async def subscribe(
+        self, matches: EventFilter, maxsize: int | None = None
+    ) -> Subscription:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return await super().subscribe(matches, maxsize)
+
+    async def _listen(self) -> None:
+        # runs for the life of the process: a dropped connection is logged
+        # and retried with backoff, subscribers just see a gap in events
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async for event in self._receive():
+                    delay = self.reconnect_delay
+                    self.deliver(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Inspection event listener failed, reconnecting in %.0fs", delay
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _receive(self) -> AsyncIterator[InspectionEvent]:
+        import redis.asyncio
+
+        client: Any = redis.asyncio.Redis.from_url(self.url)
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        yield InspectionEvent.model_validate_json(message["data"])
+        finally:
+            await client.aclose()
+
+
+def _create_broker() -> EventBroker:
+    if settings.EVENT_BROKER_URL:
+        return RedisBroker(settings.EVENT_BROKER_URL)
+    return InMemoryBroker()
+
+
+broker = _create_broker()
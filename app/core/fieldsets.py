@@ -0,0 +1,79 @@
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+from app.core.tracing import span
+
+
+class FieldsetError(ValueError):
+    pass
+
+
+def parse_fields(
+    fields: str | None, model: type[BaseModel], required: Iterable[str] = ("id",)
+) -> tuple[str, ...] | None:
+    """The field set a `fields=a,b,c` parameter asks for, None for all fields.
+
+    Unknown names are rejected rather than ignored so a typo doesn't
+    silently drop data. `required` fields (the id, a cursor's sort key) are
+    always included. The result is in model order, so `b,a` and `a,b` share
+    one cached serializer.
+    """
+    if not fields:
+        return None
+    wanted = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = wanted - model.model_fields.keys()
+    if unknown:
+        raise FieldsetError(
+            f"Unknown fields: {', '.join(sorted(unknown))}; "
+            f"choose from {', '.join(model.model_fields)}"
+        )
+    wanted.update(required)
+    return tuple(name for name in model.model_fields if name in wanted)
+
+
+def columns(table: Any, fields: Sequence[str]) -> list[Any]:
+    """The columns of `table` for a field set, for a narrowed SELECT.
+
+    `table` is a Core table (see app/core/tables.py) or a mapped class.
+    """
+    namespace = getattr(table, "c", table)
+    return [getattr(namespace, name) for name in fields]
+
+
+@lru_cache(maxsize=256)
+def item_type(model: type[BaseModel], fields: tuple[str, ...]) -> type:
+    """A TypedDict of just `fields`, with the model's own annotations.
+
+    Rows of a narrowed query are plain dicts; serializing them through a
+    TypedDict skips building model instances altogether.
+    """
+    return TypedDict(  # type: ignore[operator]
+        f"{model.__name__}Fields",
+        {name: model.model_fields[name].annotation for name in fields},
+    )
+
+
+@lru_cache(maxsize=256)
+def list_serializer(model: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(list[item_type(model, fields)])
+
+
+@lru_cache(maxsize=256)
+def page_serializer(
+    page: type[BaseModel], model: type[BaseModel], fields: tuple[str, ...]
+) -> TypeAdapter:
+    """Serializer for `page` (a data/total/... wrapper) with narrowed items."""
+    annotations = {name: info.annotation for name, info in page.model_fields.items()}
+    annotations["data"] = list[item_type(model, fields)]
+    return TypeAdapter(TypedDict(f"{page.__name__}Fields", annotations))  # type: ignore[operator]
+
+
+def dump_json(serializer: TypeAdapter, value: Any) -> bytes:
+    # columns hold the stored form (str for URLs, list for tags) rather than
+    # the model types; the JSON is the same, so skip the type warnings
+    with span("serialize", fieldset=True):
+        return serializer.dump_json(value, warnings=False)
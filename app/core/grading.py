@@ -0,0 +1,234 @@
+import io
+import os
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import IO
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.core.storage import LocalStorage, StorageError, storage
+
+FEATURES = ("mean_diff", "defect_ratio", "ncc", "shift")
+# served at /static, reference images may live there outside the uploads
+STATIC_DIR = "static"
+
+
+@dataclass(frozen=True)
+class GradingThresholds:
+    pixel_threshold: float
+    max_mean_diff: float
+    max_defect_ratio: float
+    max_shift: int
+
+    @classmethod
+    def from_settings(cls) -> "GradingThresholds":
+        return cls(
+            pixel_threshold=settings.GRADING_PIXEL_THRESHOLD,
+            max_mean_diff=settings.GRADING_MAX_MEAN_DIFF,
+            max_defect_ratio=settings.GRADING_MAX_DEFECT_RATIO,
+            max_shift=settings.GRADING_MAX_SHIFT,
+        )
+
+    def as_criteria(self) -> list[str]:
+        """The conditions `passes` checks, as station criteria."""
+        return [
+            f"mean_diff <= {self.max_mean_diff!r}",
+            f"defect_ratio <= {self.max_defect_ratio!r}",
+            f"shift <= {self.max_shift}",
+        ]
+
+
+class ImageSourceError(OSError):
+    """An image URL outside the storage backend and the allowed hosts."""
+
+
+def resolve_image_source(url: str) -> str | IO[bytes]:
+    """Open an image by the URL stored on a station or result.
+
+    URLs are user supplied, so only objects of the storage backend, files of
+    the static mount and hosts in GRADING_ALLOWED_HOSTS are read; anything
+    else would let the worker fetch internal addresses on a client's behalf.
+    """
+    key = storage.key_for_url(url)
+    if key is not None:
+        try:
+            if isinstance(storage, LocalStorage):
+                # flat URLs from before the layout migration still resolve
+                return storage.find(key) or storage.local_path(key)
+            return storage.open(key)
+        except StorageError as e:
+            raise ImageSourceError(str(e)) from e
+    if "://" not in url:
+        path = os.path.normpath(url.lstrip("/"))
+        if path.split(os.sep, 1)[0] != STATIC_DIR:
+            raise ImageSourceError(f"Not a static or storage URL: {url!r}")
+        return path
+    parsed = httpx.URL(url)
+    if (
+        parsed.scheme not in ("http", "https")
+        or parsed.host not in settings.GRADING_ALLOWED_HOSTS
+    ):
+        raise ImageSourceError(f"Image host not allowed: {url!r}")
+    response = httpx.get(parsed, timeout=10.0, follow_redirects=False)
+    response.raise_for_status()
+    return io.BytesIO(response.content)
+
+
+def load_grayscale(source: str | IO[bytes], size: int) -> np.ndarray:
+    with Image.open(source) as img:
+        gray = img.convert("L").resize((size, size), Image.BILINEAR)
+        return np.asarray(gray, dtype=np.float32) / 255.0
+
+
+@lru_cache(maxsize=64)
+def load_reference(url: str, size: int) -> np.ndarray:
+    """Golden image of a station, decoded once per process and URL."""
+    reference = load_grayscale(resolve_image_source(url), size)
+    reference.setflags(write=False)
+    return reference
+
+
+def compare_batch(
+    reference: np.ndarray, captured: np.ndarray, pixel_threshold: float
+) -> dict[str, np.ndarray]:
+    """Align a (N, H, W) stack to the reference and measure the differences.
+
+    Translation is estimated per image with phase correlation, computed for
+    the whole stack with one batched FFT; every metric is a reduction over
+    the image axes, so there is no Python loop over images.
+    """
+    n, height, width = captured.shape
+    ref_spectrum = np.conj(np.fft.rfft2(reference - reference.mean()))
+    centered = captured - captured.mean(axis=(1, 2), keepdims=True)
+    cross = np.fft.rfft2(centered, axes=(-2, -1)) * ref_spectrum
+    # partial whitening: a full phase-only correlation lets a bright defect
+    # patch outweigh the actual content of smooth reference images
+    cross /= np.sqrt(np.abs(cross)) + 1e-9
+    correlation = np.fft.irfft2(cross, s=(height, width), axes=(-2, -1))
+
+    peaks = correlation.reshape(n, -1).argmax(axis=1)
+    dy, dx = np.divmod(peaks, width)
+    dy = np.where(dy > height // 2, dy - height, dy)
+    dx = np.where(dx > width // 2, dx - width, dx)
+
+    rows = (np.arange(height)[None, :] + dy[:, None]) % height
+    cols = (np.arange(width)[None, :] + dx[:, None]) % width
+    aligned = captured[np.arange(n)[:, None, None], rows[:, :, None], cols[:, None, :]]
+
+    diff = np.abs(aligned - reference)
+    ref_centered = reference - reference.mean()
+    img_centered = aligned - aligned.mean(axis=(1, 2), keepdims=True)
+    denominator = np.sqrt((img_centered**2).sum(axis=(1, 2)) * (ref_centered**2).sum())
+    ncc = (img_centered * ref_centered).sum(axis=(1, 2)) / np.maximum(denominator, 1e-9)
+
+    return {
+        "mean_diff": diff.mean(axis=(1, 2)),
+        "defect_ratio": (diff > pixel_threshold).mean(axis=(1, 2)),
+        "ncc": ncc,
+        "shift": np.maximum(np.abs(dy), np.abs(dx)).astype(np.float32),
+    }
+
+
+def passes(
+    features: dict[str, np.ndarray], thresholds: GradingThresholds
+) -> np.ndarray:
+    return (
+        (features["mean_diff"] <= thresholds.max_mean_diff)
+        & (features["defect_ratio"] <= thresholds.max_defect_ratio)
+        & (features["shift"] <= thresholds.max_shift)
+    )
+
+
+def _grade_chunk(
+    reference: np.ndarray,
+    sources: Sequence[str],
+    thresholds: GradingThresholds,
+) -> list[tuple[bool, dict[str, float]] | None]:
+    # runs in a pool process: decoding dominates, so it happens here as well
+    size = reference.shape[0]
+    images: list[np.ndarray] = []
+    loaded: list[int] = []
+    for i, url in enumerate(sources):
+        try:
+            images.append(load_grayscale(resolve_image_source(url), size))
+        except (OSError, httpx.HTTPError):
+            continue
+        loaded.append(i)
+
+    graded: list[tuple[bool, dict[str, float]] | None] = [None] * len(sources)
+    if not images:
+        return graded
+
+    features = compare_batch(reference, np.stack(images), thresholds.pixel_threshold)
+    verdicts = passes(features, thresholds)
+    for row, i in enumerate(loaded):
+        graded[i] = (
+            bool(verdicts[row]),
+            {name: float(features[name][row]) for name in FEATURES},
+        )
+    return graded
+
+
+class ReferenceGrader:
+    """Grades captures against a station reference on a process pool."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        batch_size: int | None = None,
+        size: int | None = None,
+    ):
+        self.workers = workers or settings.GRADING_WORKERS or os.cpu_count() or 1
+        self.batch_size = batch_size or settings.GRADING_BATCH_SIZE
+        self.size = size or settings.GRADING_IMAGE_SIZE
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def grade(
+        self,
+        reference_url: str,
+        captured_urls: Sequence[str],
+        thresholds: GradingThresholds | None = None,
+    ) -> list[tuple[bool, dict[str, float]] | None]:
+        """(passed, features) per capture, None for unreadable images."""
+        if not captured_urls:
+            return []
+        thresholds = thresholds or GradingThresholds.from_settings()
+        reference = load_reference(reference_url, self.size)
+        chunks = [
+            list(captured_urls[i : i + self.batch_size])
+            for i in range(0, len(captured_urls), self.batch_size)
+        ]
+        if len(chunks) == 1 or self.workers == 1:
+            graded = [_grade_chunk(reference, chunk, thresholds) for chunk in chunks]
+        else:
+            graded = list(
+                self._pool().map(
+                    _grade_chunk,
+                    [reference] * len(chunks),
+                    chunks,
+                    [thresholds] * len(chunks),
+                )
+            )
+        return [item for chunk in graded for item in chunk]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+grader = ReferenceGrader()
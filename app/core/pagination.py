@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(sort_by: str, sort_desc: bool, value: Any, last_id: UUID) -> str:
+    """Opaque keyset position: the sort key of the last row and its id.
+
+    The sort order travels with the cursor so a page can't be continued
+    under a different order, which would skip or repeat rows.
+    """
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps(
+        [sort_by, sort_desc, value, str(last_id)], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, bool, Any, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_by, sort_desc, value, last_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        return sort_by, bool(sort_desc), value, UUID(last_id)
+    except (ValueError, TypeError, KeyError) as e:
+        raise CursorError("Invalid cursor") from e
@@ -0,0 +1,236 @@
+import os
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, Connection, Engine, Table, and_, text
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    column: str
+
+
+# monthly RANGE partitions, see the partition_inspections_by_month migration;
+# both are keyed by the server-set creation time, never by client input
+PARTITIONED_TABLES = (
+    PartitionedTable("inspectionresult", "created_at"),
+    PartitionedTable("inspectiontagcreate", "created_at"),
+)
+
+_PARTITION = re.compile(r"_p(\d{4})_(\d{2})$")
+
+# a time-ordered id is read back with the reader's local time zone, which
+# needn't be the writer's
+_ID_TIME_MARGIN = timedelta(days=1)
+
+
+def time_ordered_id(at: datetime, random: bytes | None = None) -> UUID:
+    """A version 7 UUID carrying `at` in its leading 48 bits (Unix ms).
+
+    Naive times are local, like the created_at columns. Rows get their
+    created_at from the id (`id_time`), so on the partitioned tables, whose
+    primary key is (id, created_at), the id alone is unique as well: a
+    repeated id would repeat its created_at. They can't collide with the
+    version 4 ids of older rows either.
+    """
+    random = random if random is not None else os.urandom(10)
+    raw = bytearray(int(at.timestamp() * 1000).to_bytes(6, "big") + random[:10])
+    raw[6] = (raw[6] & 0x0F) | 0x70
+    raw[8] = (raw[8] & 0x3F) | 0x80
+    return UUID(bytes=bytes(raw))
+
+
+def id_time(row_id: UUID) -> datetime | None:
+    """The local time a time-ordered id was made for, None for other ids."""
+    if row_id.version != 7:
+        return None
+    return datetime.fromtimestamp(int.from_bytes(row_id.bytes[:6], "big") / 1000)
+
+
+def new_row_id(now: datetime | None = None) -> tuple[UUID, datetime]:
+    """A fresh id for a partitioned row and the created_at it stands for."""
+    row_id = time_ordered_id(now or datetime.now())
+    return row_id, id_time(row_id)
+
+
+def id_filter(table: Table, ids: Sequence[UUID]) -> ColumnElement[bool]:
+    """`id IN ids`, bounded to the creation times the ids carry so only
+    their partitions are scanned; ids of older rows leave it unbounded."""
+    condition = table.c.id == ids[0] if len(ids) == 1 else table.c.id.in_(ids)
+    times = [id_time(row_id) for row_id in ids]
+    if not times or None in times:
+        return condition
+    return and_(
+        condition,
+        table.c.created_at.between(
+            min(times) - _ID_TIME_MARGIN, max(times) + _ID_TIME_MARGIN
+        ),
+    )
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    match = _PARTITION.search(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+def create_partition_sql(table: PartitionedTable, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table.name, month)} "
+        f"PARTITION OF {table.name} FOR VALUES "
+        f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def is_partitioned(connection: Connection, table: PartitionedTable) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(
+        connection.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+            ),
+            {"name": table.name},
+        ).scalar()
+    )
+
+
+def list_partitions(connection: Connection, table: PartitionedTable) -> list[str]:
+    return list(
+        connection.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class parent ON parent.oid = i.inhparent "
+                "WHERE parent.relname = :name "
+                "AND parent.relnamespace = current_schema()::regnamespace "
+                "ORDER BY c.relname"
+            ),
+            {"name": table.name},
+        ).scalars()
+    )
+
+
+def default_months(connection: Connection, table: PartitionedTable) -> set[date]:
+    """Months with rows in the DEFAULT partition."""
+    return set(
+        connection.execute(
+            text(
+                f"SELECT DISTINCT date_trunc('month', {table.column})::date "
+                f"FROM {table.name}_default"
+            )
+        ).scalars()
+    )
+
+
+def create_partition(
+    connection: Connection, table: PartitionedTable, month: date
+) -> None:
+    """Create the partition of `month`, taking over its rows from DEFAULT.
+
+    PostgreSQL refuses a new partition while DEFAULT holds rows of its
+    range, so those are moved into a standalone table that is then attached.
+    """
+    default = f"{table.name}_default"
+    bounds = {"start": month, "end": add_months(month, 1)}
+    in_range = f"{table.column} >= :start AND {table.column} < :end"
+    # inserts into DEFAULT wait until the month is attached
+    connection.execute(text(f"LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE"))
+    stranded = connection.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), bounds
+    ).scalar()
+    if not stranded:
+        connection.execute(text(create_partition_sql(table, month)))
+        return
+
+    name = partition_name(table.name, month)
+    connection.execute(
+        text(
+            f"CREATE TABLE {name} "
+            f"(LIKE {table.name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    connection.execute(
+        text(
+            f"ALTER TABLE {table.name} ATTACH PARTITION {name} FOR VALUES "
+            f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+    )
+
+
+def ensure_partitions(engine: Engine, now: datetime, months_ahead: int) -> list[str]:
+    """Create the partitions of the current and the next `months_ahead` months.
+
+    Rows only fall into the DEFAULT partition when this has not run for
+    longer than `months_ahead`; their months get a partition as well and
+    the rows are moved into it. Every partition is created in a transaction
+    of its own, so one failing month doesn't hold back the others.
+    """
+    created = []
+    current = month_start(now)
+    for table in PARTITIONED_TABLES:
+        with engine.connect() as connection:
+            if not is_partitioned(connection, table):
+                continue
+            existing = set(list_partitions(connection, table))
+            months = default_months(connection, table)
+        months.update(add_months(current, offset) for offset in range(months_ahead + 1))
+        for month in sorted(months):
+            name = partition_name(table.name, month)
+            if name in existing:
+                continue
+            with engine.begin() as connection:
+                create_partition(connection, table, month)
+            created.append(name)
+    return created
+
+
+def archive_partitions(
+    connection: Connection, now: datetime, keep_months: int, schema: str
+) -> list[str]:
+    """Detach partitions older than `keep_months` and move them to `schema`.
+
+    Archived months drop out of every query on the live tables; they stay
+    queryable as `<schema>.<partition>` until someone dumps or drops them.
+    """
+    archived = []
+    cutoff = add_months(month_start(now), -keep_months)
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(connection, table):
+            continue
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        for name in list_partitions(connection, table):
+            month = partition_month(name)
+            if month is None or month >= cutoff:
+                continue
+            connection.execute(
+                text(f"ALTER TABLE {table.name} DETACH PARTITION {name}")
+            )
+            connection.execute(text(f'ALTER TABLE {name} SET SCHEMA "{schema}"'))
+            archived.append(name)
+    return archived
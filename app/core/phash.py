@@ -0,0 +1,209 @@
+import threading
+from collections.abc import Iterable
+from datetime import datetime
+from functools import lru_cache
+from itertools import combinations
+from typing import IO, Any
+from uuid import UUID
+
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+HASH_SIZE = 8
+IMAGE_SIZE = 32
+
+# (hashed rows, newest created_at) of a station, see PerceptualHashIndex
+Generation = tuple[int, datetime | None]
+
+
+@lru_cache(maxsize=1)
+def _dct_matrix(n: int = IMAGE_SIZE) -> np.ndarray:
+    # orthonormal DCT-II basis, so a 2D DCT is two matrix products
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0, :] = np.sqrt(1 / n)
+    return matrix
+
+
+def compute_phash(image: str | IO[bytes]) -> int:
+    """64-bit DCT perceptual hash of an image path or file object."""
+    with Image.open(image) as img:
+        gray = img.convert("L").resize((IMAGE_SIZE, IMAGE_SIZE), Image.LANCZOS)
+        pixels = np.asarray(gray, dtype=np.float64)
+
+    dct = _dct_matrix()
+    coeffs = (dct @ pixels @ dct.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    # the DC term carries overall brightness only, keep it out of the median
+    bits = coeffs > np.median(coeffs[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash_to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def phash_from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHashTable:
+    """Multi-index hashing over the 64-bit hash split into equal chunks.
+
+    Two hashes within distance r share at least one chunk within distance
+    r // chunks (pigeonhole), so a query only probes the small neighbourhood of
+    each chunk instead of scanning every stored hash.
+    """
+
+    def __init__(self, chunks: int = 4):
+        if HASH_BITS % chunks:
+            raise ValueError("chunks must divide the hash size")
+        self.chunks = chunks
+        self.chunk_bits = HASH_BITS // chunks
+        self._mask = (1 << self.chunk_bits) - 1
+        self._tables: list[dict[int, set[UUID]]] = [{} for _ in range(chunks)]
+        self._hashes: dict[UUID, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _split(self, value: int) -> list[int]:
+        return [
+            (value >> (i * self.chunk_bits)) & self._mask for i in range(self.chunks)
+        ]
+
+    def add(self, key: UUID, value: int) -> None:
+        if key in self._hashes:
+            self.remove(key)
+        self._hashes[key] = value
+        for table, chunk in zip(self._tables, self._split(value), strict=True):
+            table.setdefault(chunk, set()).add(key)
+
+    def remove(self, key: UUID) -> None:
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for table, chunk in zip(self._tables, self._split(value), strict=True):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[chunk]
+
+    def _neighbours(self, chunk: int, radius: int) -> Iterable[int]:
+        yield chunk
+        for r in range(1, radius + 1):
+            for positions in combinations(range(self.chunk_bits), r):
+                flipped = chunk
+                for pos in positions:
+                    flipped ^= 1 << pos
+                yield flipped
+
+    def search(self, value: int, max_distance: int) -> list[tuple[UUID, int]]:
+        radius = max_distance // self.chunks
+        candidates: set[UUID] = set()
+        for table, chunk in zip(self._tables, self._split(value), strict=True):
+            for probe in self._neighbours(chunk, radius):
+                bucket = table.get(probe)
+                if bucket:
+                    candidates.update(bucket)
+
+        matches = []
+        for key in candidates:
+            distance = hamming(value, self._hashes[key])
+            if distance <= max_distance:
+                matches.append((key, distance))
+        matches.sort(key=lambda match: (match[1], str(match[0])))
+        return matches
+
+
+class PerceptualHashIndex:
+    """Per-station near-duplicate indexes, kept in step with the database.
+
+    Other API workers and the job worker write results too, so a station's
+    index is only used while its generation (the number of hashed rows and
+    the newest created_at, read from the database by the caller) matches
+    the one it was built at; see `generation` and `extend`.
+    """
+
+    def __init__(self) -> None:
+        self._stations: dict[UUID, MultiIndexHashTable] = {}
+        self._generations: dict[UUID, Generation] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, station_id: UUID) -> bool:
+        return station_id in self._stations
+
+    def generation(self, station_id: UUID) -> Generation | None:
+        return self._generations.get(station_id)
+
+    def load(
+        self,
+        station_id: UUID,
+        rows: Iterable[tuple[UUID, Any]],
+        generation: Generation | None = None,
+    ) -> None:
+        table = MultiIndexHashTable()
+        for key, value in rows:
+            if value is not None:
+                table.add(key, phash_from_hex(value))
+        with self._lock:
+            self._stations[station_id] = table
+            if generation is None:
+                self._generations.pop(station_id, None)
+            else:
+                self._generations[station_id] = generation
+
+    def extend(
+        self,
+        station_id: UUID,
+        rows: Iterable[tuple[UUID, Any]],
+        generation: Generation,
+    ) -> bool:
+        """Add rows written since the last generation, e.g. by other processes.
+
+        Returns False when the index still doesn't hold `generation`'s row
+        count afterwards, i.e. rows were deleted elsewhere, and the station
+        has to be loaded again.
+        """
+        with self._lock:
+            table = self._stations.get(station_id)
+            if table is None:
+                return False
+            for key, value in rows:
+                if value is not None:
+                    table.add(key, phash_from_hex(value))
+            if len(table) != generation[0]:
+                return False
+            self._generations[station_id] = generation
+            return True
+
+    def add(self, station_id: UUID, key: UUID, value: str) -> None:
+        # only track stations that have been warmed up, the rest load on demand
+        with self._lock:
+            table = self._stations.get(station_id)
+            if table is not None:
+                table.add(key, phash_from_hex(value))
+
+    def remove(self, station_id: UUID, key: UUID) -> None:
+        with self._lock:
+            table = self._stations.get(station_id)
+            if table is not None:
+                table.remove(key)
+
+    def search(
+        self, station_id: UUID, value: str, max_distance: int
+    ) -> list[tuple[UUID, int]]:
+        with self._lock:
+            table = self._stations.get(station_id)
+            if table is None:
+                return []
+            return table.search(phash_from_hex(value), max_distance)
+
+
+phash_index = PerceptualHashIndex()
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any
+
+# leaf functions of a thread that's parked: the event loop in its selector,
+# threadpool workers waiting for work; left out unless idle=True
+_IDLE_FILES = ("selectors.py", "threading.py")
+_IDLE_FUNCTIONS = {"select", "poll", "wait"}
+
+_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process."""
+
+
+def _short_path(filename: str) -> str:
+    # the longest sys.path entry containing the file, so site-packages and
+    # the app both read as module paths
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best) :].lstrip(os.sep) if best else filename
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (
+        code.co_name in _IDLE_FUNCTIONS
+        and os.path.basename(code.co_filename) in _IDLE_FILES
+    )
+
+
+class _Labels(dict[CodeType, str]):
+    """Frame labels, built once per code object."""
+
+    def __missing__(self, code: CodeType) -> str:
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        self[code] = label
+        return label
+
+
+def sample(
+    seconds: float,
+    hz: int = 100,
+    idle: bool = False,
+    thread_names: dict[int, str] | None = None,
+) -> Counter[str]:
+    """Collapsed stacks of every thread, sampled `hz` times a second.
+
+    Each sample reads `sys._current_frames()` from this thread, so the
+    profiled threads run uninstrumented and the cost is the stack walk,
+    about one GIL switch per sample. Stacks are keyed root first as
+    "<thread>;<frame>;...;<leaf>", the folded format flame graph tools
+    read. Parked threads are skipped unless `idle`, so the profile shows
+    where requests spend time rather than how long the pool sat waiting.
+    `thread_names` overrides the thread name in the root frame, e.g. to
+    mark the event loop thread.
+
+    Like any in-process sampler this needs the GIL to take a sample, so it
+    lands where threads release it (I/O, sleeps) or at the switch interval
+    (`sys.getswitchinterval()`, 5 ms) of one that doesn't: CPU bursts
+    shorter than that are under-counted, long ones show up as they should.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        stacks: Counter[str] = Counter()
+        labels = _Labels()
+        own = threading.get_ident()
+        interval = 1.0 / hz
+        deadline = time.perf_counter() + seconds
+        while True:
+            started = time.perf_counter()
+            if started >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            names.update(thread_names or {})
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not idle and _is_idle(frame)):
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(labels[frame.f_code])
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+        return stacks
+    finally:
+        _lock.release()
+
+
+async def profile(seconds: float, hz: int = 100, idle: bool = False) -> Counter[str]:
+    """`sample` from a thread of its own while the event loop keeps serving.
+
+    The sampler doesn't take a threadpool slot, so the pool being profiled
+    is the pool requests actually get; the calling event loop's thread is
+    labelled "event-loop".
+    """
+    if _lock.locked():
+        raise ProfilerBusy()
+    loop = asyncio.get_running_loop()
+    done: asyncio.Future[Counter[str]] = loop.create_future()
+    names = {threading.get_ident(): "event-loop"}
+
+    def resolve(result: Counter[str] | None, error: BaseException | None) -> None:
+        if done.done():  # the request went away meanwhile
+            return
+        if error is not None:
+            done.set_exception(error)
+        else:
+            done.set_result(result)
+
+    def run() -> None:
+        try:
+            result = sample(seconds, hz, idle, names)
+        except BaseException as e:
+            loop.call_soon_threadsafe(resolve, None, e)
+        else:
+            loop.call_soon_threadsafe(resolve, result, None)
+
+    threading.Thread(target=run, name="profiler", daemon=True).start()
+    return await done
+
+
+def collapsed(stacks: Counter[str]) -> str:
+    """One "<stack> <count>" line per stack (flamegraph.pl, speedscope)."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def speedscope(stacks: Counter[str], hz: int, name: str = "profile") -> dict[str, Any]:
+    """The stacks as a speedscope sampled profile, weighted in seconds."""
+    frames: list[dict[str, str]] = []
+    index: dict[str, int] = {}
+    samples = []
+    weights = []
+    for stack, count in stacks.most_common():
+        ids = []
+        for label in stack.split(";"):
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label})
+            ids.append(index[label])
+        samples.append(ids)
+        weights.append(count / hz)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
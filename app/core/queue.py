@@ -0,0 +1,172 @@
+import random
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, and_, case, or_, tuple_, update
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+from app.models import InspectionJob, JobStatus, QueueMetrics
+
+GRADE_JOB = "grade"
+
+
+def _claimable(now: datetime) -> ColumnElement[bool]:
+    return and_(
+        InspectionJob.attempts < InspectionJob.max_attempts,
+        or_(
+            and_(InspectionJob.status == JobStatus.QUEUED, InspectionJob.run_at <= now),
+            and_(
+                InspectionJob.status == JobStatus.RUNNING,
+                InspectionJob.locked_until < now,
+            ),
+        ),
+    )
+
+
+def _held(jobs: Sequence[InspectionJob]) -> ColumnElement[bool]:
+    # every claim bumps attempts, so (id, attempts) of a RUNNING job is the
+    # lease: once the job is handed out again the old holder no longer matches
+    return and_(
+        InspectionJob.status == JobStatus.RUNNING,
+        tuple_(InspectionJob.id, InspectionJob.attempts).in_(
+            [(job.id, job.attempts) for job in jobs]
+        ),
+    )
+
+
+class JobQueue:
+    """Durable job queue stored in the ``inspectionjob`` table.
+
+    Jobs are claimed with ``FOR UPDATE SKIP LOCKED`` so any number of worker
+    processes can poll the same table without handing out a job twice. A
+    claim is a lease until ``locked_until``; ``complete`` and ``fail`` only
+    apply to jobs the caller still holds, and return how many those were.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def enqueue(
+        self, inspection_id: UUID, kind: str = GRADE_JOB, *, commit: bool = True
+    ) -> InspectionJob:
+        job = InspectionJob(
+            inspection_id=inspection_id,
+            kind=kind,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+        self.session.add(job)
+        if commit:
+            self.session.commit()
+        return job
+
+    def claim(
+        self, limit: int, visibility_timeout: float | None = None
+    ) -> list[InspectionJob]:
+        now = datetime.now(timezone.utc)
+        timeout = visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT
+        # the worker died on the last attempt, don't hand the job out again
+        self.session.execute(
+            update(InspectionJob)
+            .where(
+                InspectionJob.status == JobStatus.RUNNING,
+                InspectionJob.locked_until < now,
+                InspectionJob.attempts >= InspectionJob.max_attempts,
+            )
+            .values(
+                status=JobStatus.FAILED,
+                locked_until=None,
+                last_error="Lease expired on the last attempt",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        jobs = self.session.exec(
+            select(InspectionJob)
+            .where(_claimable(now))
+            .order_by(InspectionJob.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for job in jobs:
+            job.status = JobStatus.RUNNING
+            job.attempts += 1
+            job.locked_until = now + timedelta(seconds=timeout)
+            self.session.add(job)
+        self.session.commit()
+        return list(jobs)
+
+    def complete(self, jobs: Sequence[InspectionJob]) -> int:
+        if not jobs:
+            return 0
+        done = self.session.execute(
+            update(InspectionJob)
+            .where(_held(jobs))
+            .values(status=JobStatus.DONE, locked_until=None, last_error=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.session.commit()
+        return done
+
+    def fail(self, jobs: Sequence[InspectionJob], error: str) -> int:
+        now = datetime.now(timezone.utc)
+        failed = 0
+        for job in jobs:
+            values = {"last_error": error[:2000], "locked_until": None}
+            if job.attempts >= job.max_attempts:
+                values["status"] = JobStatus.FAILED
+            else:
+                # exponential backoff with jitter so retries don't arrive in lockstep
+                delay = min(
+                    settings.JOB_BACKOFF_BASE * 2 ** (job.attempts - 1),
+                    settings.JOB_BACKOFF_MAX,
+                )
+                values["status"] = JobStatus.QUEUED
+                values["run_at"] = now + timedelta(
+                    seconds=delay * random.uniform(0.5, 1.0)
+                )
+            failed += self.session.execute(
+                update(InspectionJob)
+                .where(_held([job]))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        self.session.commit()
+        return failed
+
+    def metrics(self) -> QueueMetrics:
+        now = datetime.now(timezone.utc)
+        ready = _claimable(now)
+        row = self.session.exec(
+            select(
+                func.count(case((InspectionJob.status == JobStatus.QUEUED, 1))),
+                func.count(case((InspectionJob.status == JobStatus.RUNNING, 1))),
+                func.count(case((InspectionJob.status == JobStatus.FAILED, 1))),
+                func.count(case((ready, 1))),
+                func.min(case((ready, InspectionJob.run_at))),
+            ).where(InspectionJob.status != JobStatus.DONE)
+        ).one()
+        queued, running, failed, ready_count, oldest = row
+        if oldest is not None and oldest.tzinfo is None:
+            # SQLite hands timestamps back without their zone
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        return QueueMetrics(
+            queued=queued,
+            running=running,
+            failed=failed,
+            ready=ready_count,
+            oldest_ready_age_seconds=(
+                (now - oldest).total_seconds() if oldest is not None else 0.0
+            ),
+        )
+
+    def purge_done(self, older_than: timedelta) -> int:
+        cutoff = datetime.now(timezone.utc) - older_than
+        result = self.session.execute(
+            InspectionJob.__table__.delete().where(
+                InspectionJob.status == JobStatus.DONE,
+                InspectionJob.created_at < cutoff,
+            )
+        )
+        self.session.commit()
+        return result.rowcount
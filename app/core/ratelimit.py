@@ -0,0 +1,230 @@
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from jwt.exceptions import InvalidTokenError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import security
+from app.core.config import settings
+
+UPLOAD = "upload"
+READ = "read"
+WRITE = "write"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take one token, or return how many seconds until one is available."""
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = max(self.updated, now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per (subject, route class), bounded to the busiest keys."""
+
+    def __init__(self, limits: dict[str, tuple[float, float]], max_keys: int = 100_000):
+        self.limits = limits
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, subject: str, route_class: str) -> float:
+        rate, burst = self.limits[route_class]
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get((subject, route_class))
+            if bucket is None:
+                bucket = self._buckets[(subject, route_class)] = TokenBucket(
+                    rate, burst
+                )
+                if len(self._buckets) > self.max_keys:
+                    # idle buckets are full anyway, forgetting them is harmless
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((subject, route_class))
+            return bucket.take(now)
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests of one route class.
+
+    Requests beyond the cap wait in a bounded queue. New requests are shed
+    instead of queued once the queue is full or the recent latency of the
+    class is above its limit, so an overloaded class fails fast rather than
+    piling up work it can't finish in time.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        latency_limit: float,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_limit = latency_limit
+        self.in_flight = 0
+        self.waiting = 0
+        self.latency = 0.0  # exponentially weighted, seconds
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    async def acquire(self) -> None:
+        if self.in_flight >= self.max_concurrent:
+            if self.waiting >= self.max_queue or self.latency > self.latency_limit:
+                raise Overloaded(max(1.0, self.latency))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded(max(1.0, self.latency))
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self, elapsed: float) -> None:
+        self.in_flight -= 1
+        self.latency += 0.1 * (elapsed - self.latency)
+        self._slots.release()
+
+
+@dataclass
+class AdmissionPolicy:
+    upload_paths: tuple[str, ...] = (
+        "/inspections/",
+        "/upload/image/",
+        "/image",
+        "/storage/upload",
+    )
+    # long-lived feed connections would pin a read slot for their whole life
+    exempt_prefixes: tuple[str, ...] = (
+        "/docs",
+        "/redoc",
+        "/static",
+        f"{settings.API_V1_STR}/openapi.json",
+        f"{settings.API_V1_STR}/feed/",
+    )
+
+
+def classify(method: str, path: str, policy: AdmissionPolicy) -> str:
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    if method == "POST" and path.endswith(policy.upload_paths):
+        return UPLOAD
+    return WRITE
+
+
+def token_subject(scope: Scope) -> str:
+    # same subject as deps.get_current_user, without touching the database;
+    # an unauthenticated or invalid caller is limited per client address
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    subject = security.decode_access_token(token).get("sub")
+                except InvalidTokenError:
+                    break
+                if subject:
+                    return f"user:{subject}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app: ASGIApp, policy: AdmissionPolicy | None = None):
+        self.app = app
+        self.policy = policy or AdmissionPolicy()
+        self.rate_limiter = RateLimiter(
+            {
+                UPLOAD: (
+                    settings.RATE_LIMIT_UPLOADS_PER_SECOND,
+                    settings.RATE_LIMIT_UPLOADS_BURST,
+                ),
+                READ: (
+                    settings.RATE_LIMIT_READS_PER_SECOND,
+                    settings.RATE_LIMIT_READS_BURST,
+                ),
+                WRITE: (
+                    settings.RATE_LIMIT_WRITES_PER_SECOND,
+                    settings.RATE_LIMIT_WRITES_BURST,
+                ),
+            }
+        )
+        self.limiters = {
+            route_class: ConcurrencyLimiter(
+                max_concurrent,
+                settings.ADMISSION_MAX_QUEUE,
+                settings.ADMISSION_QUEUE_TIMEOUT,
+                settings.ADMISSION_LATENCY_LIMIT,
+            )
+            for route_class, max_concurrent in (
+                (UPLOAD, settings.ADMISSION_MAX_UPLOADS),
+                (READ, settings.ADMISSION_MAX_READS),
+                (WRITE, settings.ADMISSION_MAX_WRITES),
+            )
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(self.policy.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], path, self.policy)
+        wait = self.rate_limiter.check(token_subject(scope), route_class)
+        if wait:
+            await self._reject(send, 429, "Too many requests", wait)
+            return
+
+        limiter = self.limiters[route_class]
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            await self._reject(send, 503, "Server is overloaded", e.retry_after)
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
+
+    async def _reject(
+        self, send: Send, status: int, detail: str, retry_after: float
+    ) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,155 @@
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Mapping, Sequence
+
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import DBAPIError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# set after a caller's own write, see ReadYourWritesMiddleware
+STICKY_COOKIE = "read_primary_until"
+STICKY_STATE = "read_primary_until"
+
+
+class ReplicaRouter:
+    """Picks the engine for read-only sessions.
+
+    Reads go round-robin to replicas that passed their last health check.
+    A replica that fails to connect, or lags the primary by more than
+    `max_lag` seconds, is skipped until a later check finds it healthy
+    again; with no healthy replica, reads fall back to the primary. Checks
+    run every `health_interval` seconds on a background thread of each
+    process, never on a request.
+
+    After a caller's own write its reads stay on the primary for
+    `sticky_seconds`, so it reads what it just wrote despite replication
+    lag. The deadline travels with the client in a cookie, so it holds on
+    whichever worker serves the next request.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine],
+        health_interval: float = 5.0,
+        max_lag: float | None = None,
+        sticky_seconds: float = 0.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self._healthy = set(range(len(self.replicas)))
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def check(self) -> None:
+        """Probe every replica now."""
+        healthy = {i for i, replica in enumerate(self.replicas) if self._probe(replica)}
+        with self._lock:
+            for i in set(self._healthy) - healthy:
+                logger.warning("Replica %s is unhealthy", self.replicas[i].url)
+            self._healthy = healthy
+
+    def _probe(self, replica: Engine) -> bool:
+        try:
+            with replica.connect() as connection:
+                if self.max_lag is None or connection.dialect.name != "postgresql":
+                    connection.execute(text("SELECT 1"))
+                    return True
+                lag = connection.execute(
+                    text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - "
+                        "pg_last_xact_replay_timestamp()), 0)"
+                    )
+                ).scalar()
+                return float(lag or 0) <= self.max_lag
+        except DBAPIError:
+            return False
+
+    def _start(self) -> None:
+        # threads don't survive a fork, so each worker starts its own
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name="replica-health", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Replica health check failed")
+            time.sleep(self.health_interval)
+
+    def mark_failed(self, replica: Engine) -> None:
+        with self._lock:
+            self._healthy.discard(self.replicas.index(replica))
+
+    def healthy_replicas(self) -> list[Engine]:
+        if self._pid != os.getpid():
+            self._start()
+        with self._lock:
+            return [self.replicas[i] for i in sorted(self._healthy)]
+
+    def read_engines(self, pinned: bool = False) -> list[Engine]:
+        """Engines to try for a read, in order, ending with the primary."""
+        if not self.replicas or pinned:
+            return [self.primary]
+        healthy = self.healthy_replicas()
+        if not healthy:
+            return [self.primary]
+        start = next(self._next) % len(healthy)
+        return healthy[start:] + healthy[:start] + [self.primary]
+
+    def sticky_until(self) -> float | None:
+        """Deadline to hand a caller that just wrote, None when off."""
+        if not self.replicas or not self.sticky_seconds:
+            return None
+        return time.time() + self.sticky_seconds
+
+    def is_pinned(self, cookies: Mapping[str, str]) -> bool:
+        """Whether the caller's reads stay on the primary after a write."""
+        try:
+            until = float(cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            return False
+        now = time.time()
+        # a deadline further out than we ever hand out is not ours
+        return now < until <= now + self.sticky_seconds
+
+
+class ReadYourWritesMiddleware:
+    """Sets the STICKY_COOKIE on responses to requests that committed a
+    write, see ReplicaRouter.sticky_until."""
+
+    def __init__(self, app: ASGIApp, sticky_seconds: float):
+        self.app = app
+        self.max_age = math.ceil(sticky_seconds)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            until = scope.get("state", {}).get(STICKY_STATE)
+            if message["type"] == "http.response.start" and until:
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={self.max_age}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -19,6 +19,14 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict[str, Any]:
+    # raises jwt.InvalidTokenError for bad signatures and expired tokens
+    payload: dict[str, Any] = jwt.decode(
+        token, settings.SECRET_KEY, algorithms=[ALGORITHM]
+    )
+    return payload
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -0,0 +1,71 @@
+import importlib.util
+import os
+import time
+from dataclasses import dataclass
+
+# seconds since this module was imported, early in app/serve.py;
+# workers inherit the master's marks across the fork and add their own
+_origin = time.perf_counter()
+startup_timings: dict[str, float] = {}
+
+
+def mark(stage: str) -> None:
+    startup_timings[stage] = round(time.perf_counter() - _origin, 4)
+
+
+@dataclass(frozen=True)
+class ServerTuning:
+    workers: int
+    pool_size: int
+    max_overflow: int
+
+    @property
+    def connections(self) -> int:
+        """Most database connections the server can hold at once."""
+        return self.workers * (self.pool_size + self.max_overflow)
+
+
+def tune(
+    cpu_count: int,
+    pool_budget: int,
+    workers: int | None = None,
+    min_connections_per_worker: int = 4,
+) -> ServerTuning:
+    """Workers and per-worker pool sizes that fit a connection budget.
+
+    Workers default to the usual 2 x CPU + 1 for async workers waiting on
+    I/O, but never so many that each would get fewer than
+    `min_connections_per_worker` of the `pool_budget` connections the
+    database allows us. Each worker's share is split two thirds steady pool,
+    one third overflow for bursts. Asking for more workers than the budget
+    has connections is a ValueError: every worker needs at least one.
+    """
+    if pool_budget < 1:
+        raise ValueError(f"pool budget must be at least 1, not {pool_budget}")
+    if workers is not None and workers > pool_budget:
+        raise ValueError(
+            f"{workers} workers need at least {workers} connections, "
+            f"the pool budget is {pool_budget}"
+        )
+    if workers is None:
+        workers = max(
+            1, min(2 * cpu_count + 1, pool_budget // min_connections_per_worker)
+        )
+    per_worker = max(1, pool_budget // workers)
+    pool_size = max(1, per_worker * 2 // 3)
+    return ServerTuning(workers, pool_size, per_worker - pool_size)
+
+
+def available_cpus() -> int:
+    # respects CPU affinity and container cpusets where the platform has it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
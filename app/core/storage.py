@@ -0,0 +1,323 @@
+import hashlib
+import hmac
+import io
+import os
+import re
+import shutil
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import IO, Any
+from urllib.parse import urlencode
+
+from app.core.compression import PrecompressedStaticFiles
+from app.core.config import settings
+
+LAYOUTS = ("flat", "hash", "date")
+
+# upload names are <file id>_<YYYYmmdd>_<HHMMSS>.<ext>
+_DATED_NAME = re.compile(r"^[^_/]+_(\d{4})(\d{2})(\d{2})_")
+
+
+class StorageError(Exception):
+    pass
+
+
+def shard_key(filename: str, layout: str) -> str:
+    """Key of an upload under a fan-out layout.
+
+    "hash" spreads files over 256 x 256 directories, "date" buckets them by
+    upload day. Both are derived from the file name alone, so a legacy flat
+    key can always be mapped to wherever the migration moved it.
+    """
+    if layout == "hash":
+        digest = hashlib.blake2b(filename.encode(), digest_size=2).hexdigest()
+        return f"{digest[:2]}/{digest[2:]}/{filename}"
+    if layout == "date" and (match := _DATED_NAME.match(filename)):
+        year, month, day = match.groups()
+        return f"{year}/{month}/{day}/{filename}"
+    return filename
+
+
+def legacy_candidates(key: str, layout: str) -> list[str]:
+    """Keys a flat key may live under, the configured layout first."""
+    if "/" in key:
+        return [key]
+    layouts = dict.fromkeys((layout, *LAYOUTS))
+    return list(dict.fromkeys([key, *(shard_key(key, name) for name in layouts)]))
+
+
+@dataclass
+class PresignedUpload:
+    """Where and how a client posts an object directly to storage.
+
+    The client sends a multipart/form-data POST to `url` with every entry of
+    `fields` followed by the file itself in a part named `file`.
+    """
+
+    key: str
+    url: str
+    fields: dict[str, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+    max_size: int = 0
+
+
+class StorageBackend(ABC):
+    """Where uploaded images live, addressed by a relative key."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL stored on inspections for the object."""
+
+    @abstractmethod
+    def put_file(self, key: str, path: str, content_type: str | None = None) -> None:
+        """Store the local file at `path` under `key`."""
+
+    @abstractmethod
+    def open(self, key: str) -> IO[bytes]: ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def presign_upload(
+        self, key: str, content_type: str, max_size: int, expires_in: int
+    ) -> PresignedUpload: ...
+
+    def local_path(self, key: str) -> str | None:
+        """Filesystem path of the object, if it can be written in place."""
+        return None
+
+    def key_for_url(self, url: str) -> str | None:
+        """Key of an object from its public URL, None for other URLs."""
+        prefix = self.url("")
+        if url.startswith(prefix) and len(url) > len(prefix):
+            return url[len(prefix) :]
+        return None
+
+
+def _sign(secret: str, *parts: str | int) -> str:
+    message = "\n".join(str(p) for p in parts).encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files under one directory, served from `base_url`.
+
+    Presigned uploads point at the API's own storage endpoint with an HMAC
+    signature over the key and limits, which stands in for object storage in
+    development and tests.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        base_url: str,
+        secret: str,
+        upload_url: str,
+        layout: str = "flat",
+    ):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        self.secret = secret
+        self.upload_url = upload_url
+        self.layout = layout
+        os.makedirs(root, exist_ok=True)
+
+    def find(self, key: str) -> str | None:
+        """Path of an existing object; flat keys from before the layout
+        migration are followed to their sharded location."""
+        for candidate in legacy_candidates(key, self.layout):
+            path = self.local_path(candidate)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def local_path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise StorageError(f"Invalid storage key {key!r}")
+        return path
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def put_file(self, key: str, path: str, content_type: str | None = None) -> None:
+        destination = self.local_path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.abspath(path) != destination:
+            shutil.move(path, destination)
+
+    def open(self, key: str) -> IO[bytes]:
+        return open(self.find(key) or self.local_path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return self.find(key) is not None
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def presign_upload(
+        self, key: str, content_type: str, max_size: int, expires_in: int
+    ) -> PresignedUpload:
+        expires = int(time.time()) + expires_in
+        query = {
+            "key": key,
+            "content_type": content_type,
+            "max_size": max_size,
+            "expires": expires,
+            "signature": _sign(self.secret, key, content_type, max_size, expires),
+        }
+        return PresignedUpload(
+            key=key,
+            url=f"{self.upload_url}?{urlencode(query)}",
+            expires_at=expires,
+            max_size=max_size,
+        )
+
+    def verify_upload(
+        self, key: str, content_type: str, max_size: int, expires: int, signature: str
+    ) -> bool:
+        expected = _sign(self.secret, key, content_type, max_size, expires)
+        return expires >= time.time() and hmac.compare_digest(expected, signature)
+
+
+class UploadStaticFiles(PrecompressedStaticFiles):
+    """Static files that keep pre-migration flat upload URLs working.
+
+    A miss on `<uploads>/<name>` is retried under the sharded keys of that
+    name, so both old flat URLs and new sharded ones resolve while the
+    migration is moving files. Without `uploads` the whole directory is
+    the upload root.
+    """
+
+    def __init__(self, *args: Any, layout: str, uploads: str = "", **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.uploads = uploads.strip("/") + "/" if uploads.strip("/") else ""
+        self.layout = layout
+
+    def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
+        full_path, stat = super().lookup_path(path)
+        if stat is not None or not path.startswith(self.uploads):
+            return full_path, stat
+        for key in legacy_candidates(path[len(self.uploads) :], self.layout)[1:]:
+            full_path, stat = super().lookup_path(self.uploads + key)
+            if stat is not None:
+                break
+        return full_path, stat
+
+
+class S3Storage(StorageBackend):
+    """Any S3-compatible object store (AWS, MinIO, Ceph, R2, ...).
+
+    Clients upload with a presigned POST policy that pins the key, the
+    content type and the allowed size, so image bytes never pass through the
+    API workers.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+        public_url: str | None = None,
+        client: Any = None,
+    ):
+        if client is None:
+            import boto3  # optional dependency, only needed for object storage
+
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+            )
+        self.client = client
+        self.bucket = bucket
+        base = public_url or (
+            f"{endpoint_url.rstrip('/')}/{bucket}"
+            if endpoint_url
+            else f"https://{bucket}.s3.amazonaws.com"
+        )
+        self.public_url = base.rstrip("/")
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def put_file(self, key: str, path: str, content_type: str | None = None) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(path, self.bucket, key, ExtraArgs=extra)
+
+    def open(self, key: str) -> IO[bytes]:
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        return io.BytesIO(response["Body"].read())
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise StorageError(f"Can't reach {self.bucket}: {e}") from e
+        except BotoCoreError as e:
+            raise StorageError(f"Can't reach {self.bucket}: {e}") from e
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presign_upload(
+        self, key: str, content_type: str, max_size: int, expires_in: int
+    ) -> PresignedUpload:
+        post = self.client.generate_presigned_post(
+            self.bucket,
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in,
+        )
+        return PresignedUpload(
+            key=key,
+            url=post["url"],
+            fields=post["fields"],
+            expires_at=time.time() + expires_in,
+            max_size=max_size,
+        )
+
+
+def _create_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        if not settings.S3_BUCKET:
+            raise StorageError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(
+            settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+        )
+    return LocalStorage(
+        settings.STORAGE_LOCAL_ROOT,
+        settings.STORAGE_LOCAL_URL,
+        settings.SECRET_KEY,
+        f"{settings.API_V1_STR}/storage/upload",
+        settings.STORAGE_LAYOUT,
+    )
+
+
+storage = _create_storage()
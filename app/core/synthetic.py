@@ -0,0 +1,427 @@
+"""Synthetic users, stations, results and tag inspections for scale testing.
+
+Everything is drawn from one seeded numpy Generator, so a given seed and
+scale always produce the same data. The shapes follow what production
+looks like rather than uniform noise: a few stations produce most of the
+captures, a few produce most of the failures, captures follow shifts and
+weekdays and grow over time, and tag frequencies are Zipfian.
+"""
+
+import io
+import json
+import uuid
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+import numpy as np
+import sqlalchemy as sa
+from PIL import Image
+from sqlalchemy import Connection
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.core import tables
+from app.core.partitions import id_time, time_ordered_id
+from app.core.storage import storage
+
+# relative capture volume per hour of day: three shifts, the night one thin
+HOURLY_PROFILE = np.array(
+    [2, 2, 1, 1, 1, 2, 6, 9, 10, 10, 9, 7, 8, 10, 10, 9, 8, 6, 5, 4, 4, 3, 3, 2],
+    dtype=float,
+)
+# Monday first; weekends run a skeleton crew
+WEEKDAY_PROFILE = np.array([1.0, 1.0, 1.0, 1.0, 0.9, 0.35, 0.2])
+
+DEFECT_TAGS = (
+    "scratch", "dent", "misalignment", "discoloration", "crack", "burr",
+    "contamination", "missing-part", "warp", "bubble", "chip", "label-skew",
+)  # fmt: skip
+INSPECTION_TYPES = (
+    "visual", "dimensional", "surface", "functional", "packaging", "weld",
+    "paint", "label",
+)  # fmt: skip
+NOTES = (
+    "rechecked by operator",
+    "operator override",
+    "lighting issue on line",
+    "sent to rework",
+    "sample kept for audit",
+)
+
+# the columns the app reads, for --create-schema on a scratch database;
+# loading into an existing schema only uses the columns it actually has
+SCHEMA = tables.metadata
+
+
+def zipf_weights(n: int, s: float) -> np.ndarray:
+    """Probabilities of ranks 1..n under a Zipf law with exponent `s`."""
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def tag_vocabulary(size: int) -> list[str]:
+    """`size` tag names, the real defect names first, then numbered variants."""
+    words = list(DEFECT_TAGS)
+    n = 2
+    while len(words) < size:
+        words.extend(f"{tag}-{n}" for tag in DEFECT_TAGS)
+        n += 1
+    return words[:size]
+
+
+def uuids(rng: np.random.Generator, n: int) -> list[uuid.UUID]:
+    # seeded, unlike uuid4, so a rerun with the same seed is identical
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return [uuid.UUID(bytes=row.tobytes()) for row in raw]
+
+
+def time_ordered_uuids(
+    rng: np.random.Generator, times: Sequence[datetime]
+) -> list[uuid.UUID]:
+    """Seeded ids of partitioned rows, carrying their created_at like the
+    API's (see `time_ordered_id`)."""
+    raw = rng.integers(0, 256, size=(len(times), 10), dtype=np.uint8)
+    return [
+        time_ordered_id(at, row.tobytes()) for at, row in zip(times, raw, strict=True)
+    ]
+
+
+def timestamps(
+    rng: np.random.Generator,
+    n: int,
+    start: datetime,
+    end: datetime,
+    growth: float = 2.0,
+) -> list[datetime]:
+    """`n` capture times between `start` and `end`.
+
+    Days are weighted by weekday and by a linear ramp so the last day sees
+    `growth` times the traffic of the first; the time of day follows
+    HOURLY_PROFILE.
+    """
+    first = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    # whole days, the partial ones at either end included; draws outside
+    # start..end are drawn again
+    days = (end - first).days + 1
+    weekday = np.array([(first + timedelta(days=d)).weekday() for d in range(days)])
+    weights = WEEKDAY_PROFILE[weekday] * np.linspace(1.0, growth, days)
+    base = np.datetime64(first, "us")
+    lower, limit = np.datetime64(start, "us"), np.datetime64(end, "us")
+    moments = np.full(n, limit)
+    todo = np.arange(n)
+    for _ in range(10):
+        day = rng.choice(days, size=len(todo), p=weights / weights.sum())
+        hour = rng.choice(24, size=len(todo), p=HOURLY_PROFILE / HOURLY_PROFILE.sum())
+        seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, size=len(todo))
+        moments[todo] = base + (seconds * 1_000_000).astype("timedelta64[us]")
+        todo = todo[(moments[todo] > limit) | (moments[todo] < lower)]
+        if not len(todo):
+            break
+    moments[todo] = limit
+    return moments.astype(datetime).tolist()
+
+
+def users(
+    rng: np.random.Generator, n: int, hashed_password: str
+) -> list[dict[str, Any]]:
+    # one shared hash: bcrypt per row would dominate the whole run
+    return [
+        {
+            "id": user_id,
+            "email": f"user{i:06d}@synthetic.example.com",
+            "is_active": True,
+            "is_superuser": False,
+            "full_name": f"Synthetic User {i}",
+            "hashed_password": hashed_password,
+        }
+        for i, user_id in enumerate(uuids(rng, n))
+    ]
+
+
+def stations(
+    rng: np.random.Generator,
+    owners: Sequence[uuid.UUID],
+    per_user: float,
+    created_at: datetime,
+    image_urls: Sequence[str],
+) -> tuple[list[dict[str, Any]], np.ndarray]:
+    """Stations with criteria, and each station's underlying fail rate.
+
+    Station counts per user are Poisson; fail rates are Beta(1.2, 25), so
+    most stations fail a few percent of captures and a handful are bad.
+    """
+    counts = np.maximum(1, rng.poisson(per_user, size=len(owners)))
+    owner_ids = np.repeat(np.arange(len(owners)), counts)
+    ids = uuids(rng, len(owner_ids))
+    rows = []
+    for i, (station_id, owner) in enumerate(zip(ids, owner_ids, strict=True)):
+        max_diff = round(float(rng.uniform(0.04, 0.12)), 3)
+        criteria = [
+            f"mean_diff < {max_diff}",
+            f"shift between 0 and {rng.integers(2, 9)}",
+        ]
+        if rng.random() < 0.5:
+            criteria.append(f"{round(float(rng.uniform(0.85, 0.95)), 2)} <= ncc <= 1")
+        if rng.random() < 0.3:
+            criteria.append(f"no tag {DEFECT_TAGS[rng.integers(len(DEFECT_TAGS))]}")
+        rows.append(
+            {
+                "id": station_id,
+                "name": f"Line {owner + 1} station {i + 1}",
+                "description": f"Synthetic station {i + 1}",
+                "product_image_url": (
+                    image_urls[i % len(image_urls)]
+                    if image_urls
+                    else storage.url(f"synthetic/reference-{i}.png")
+                ),
+                "criteria": criteria,
+                "owner_id": owners[owner],
+                "created_at": created_at,
+            }
+        )
+    return rows, rng.beta(1.2, 25, size=len(rows))
+
+
+def results(
+    rng: np.random.Generator,
+    station_rows: Sequence[dict[str, Any]],
+    fail_rates: np.ndarray,
+    n: int,
+    start: datetime,
+    end: datetime,
+    image_urls: Sequence[str] = (),
+    batch_size: int = 50_000,
+    pending_hours: float = 2.0,
+) -> Iterator[list[dict[str, Any]]]:
+    """`n` inspection results in batches of `batch_size`.
+
+    Stations are picked by a Zipf law over a shuffled order, so a few lines
+    carry most of the volume. Captures in the last `pending_hours` are
+    mostly still pending, older ones pass or fail by their station's rate,
+    with features that agree with the verdict.
+    """
+    station_weights = zipf_weights(len(station_rows), 1.1)[
+        rng.permutation(len(station_rows))
+    ]
+    tags = tag_vocabulary(len(DEFECT_TAGS))
+    tag_weights = zipf_weights(len(tags), 1.2)
+    pending_after = end - timedelta(hours=pending_hours)
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        picked = rng.choice(len(station_rows), size=size, p=station_weights)
+        ids = time_ordered_uuids(rng, timestamps(rng, size, start, end))
+        created = [id_time(row_id) for row_id in ids]
+        failed = rng.random(size) < fail_rates[picked]
+        pending = rng.random(size) < 0.8
+        phashes = rng.integers(0, 2**63, size=size, dtype=np.int64)
+        mean_diff = np.abs(
+            np.where(failed, rng.normal(0.12, 0.05, size), rng.normal(0.02, 0.01, size))
+        )
+        defect_ratio = np.where(failed, rng.beta(2, 30, size), rng.beta(1, 400, size))
+        ncc = np.clip(
+            np.where(
+                failed, rng.normal(0.8, 0.08, size), rng.normal(0.97, 0.015, size)
+            ),
+            -1,
+            1,
+        )
+        shift = np.where(failed, rng.poisson(6, size), rng.poisson(1, size))
+        notes = rng.random(size) < 0.03
+        batch = []
+        for i in range(size):
+            station = station_rows[picked[i]]
+            if created[i] >= pending_after and pending[i]:
+                outcome, features, row_tags = "PENDING", None, None
+            else:
+                outcome = "FAIL" if failed[i] else "PASS"
+                features = {
+                    "mean_diff": round(float(mean_diff[i]), 4),
+                    "defect_ratio": round(float(defect_ratio[i]), 4),
+                    "ncc": round(float(ncc[i]), 4),
+                    "shift": float(shift[i]),
+                }
+                row_tags = None
+                if failed[i] and rng.random() < 0.4:
+                    count = min(len(tags), 1 + rng.poisson(0.5))
+                    picks = rng.choice(
+                        len(tags), size=count, replace=False, p=tag_weights
+                    )
+                    row_tags = [tags[t] for t in picks]
+            batch.append(
+                {
+                    "id": ids[i],
+                    "station_id": station["id"],
+                    "owner_id": station["owner_id"],
+                    "captured_image_url": (
+                        image_urls[(offset + i) % len(image_urls)]
+                        if image_urls
+                        else storage.url(f"synthetic/{ids[i]}.png")
+                    ),
+                    "inspection_outcome": outcome,
+                    "notes": NOTES[rng.integers(len(NOTES))] if notes[i] else None,
+                    "phash": f"{int(phashes[i]):016x}",
+                    "features": features,
+                    "tags": row_tags,
+                    "created_at": created[i],
+                    "version": 1,
+                    "updated_at": created[i],
+                }
+            )
+        yield batch
+
+
+def tag_inspections(
+    rng: np.random.Generator,
+    owners: Sequence[uuid.UUID],
+    n: int,
+    start: datetime,
+    end: datetime,
+    vocabulary_size: int = 200,
+    zipf_exponent: float = 1.1,
+    batch_size: int = 50_000,
+) -> Iterator[list[dict[str, Any]]]:
+    """`n` tag inspections whose tags follow a Zipf law over the vocabulary."""
+    vocabulary = tag_vocabulary(vocabulary_size)
+    tag_weights = zipf_weights(len(vocabulary), zipf_exponent)
+    user_weights = zipf_weights(len(owners), 0.8)
+    type_weights = zipf_weights(len(INSPECTION_TYPES), 1.0)
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        ids = time_ordered_uuids(rng, timestamps(rng, size, start, end))
+        created = [id_time(row_id) for row_id in ids]
+        user = rng.choice(len(owners), size=size, p=user_weights)
+        kind = rng.choice(len(INSPECTION_TYPES), size=size, p=type_weights)
+        counts = np.minimum(rng.poisson(1.5, size), 6)
+        drawn = rng.choice(len(vocabulary), size=int(counts.sum()), p=tag_weights)
+        batch = []
+        position = 0
+        for i in range(size):
+            picks = drawn[position : position + counts[i]]
+            position += counts[i]
+            batch.append(
+                {
+                    "id": ids[i],
+                    "user_id": owners[user[i]],
+                    "date": created[i],
+                    "inspection_type": INSPECTION_TYPES[kind[i]],
+                    "details": f"Synthetic {INSPECTION_TYPES[kind[i]]} inspection",
+                    "tags": list(dict.fromkeys(vocabulary[t] for t in picks)),
+                    "version": 1,
+                    "created_at": created[i],
+                    "updated_at": created[i],
+                }
+            )
+        yield batch
+
+
+def synthetic_image(rng: np.random.Generator, size: int = 256) -> bytes:
+    """A PNG of a part on a belt: gradient, a bright block, maybe a defect."""
+    y, x = np.mgrid[0:size, 0:size]
+    image = 40 + 30 * x / size + rng.normal(0, 4, (size, size))
+    top, left = rng.integers(size // 8, size // 4, size=2)
+    image[top : size - top, left : size - left] += 120
+    if rng.random() < 0.3:
+        cy, cx = rng.integers(size // 4, 3 * size // 4, size=2)
+        radius = rng.integers(3, size // 16)
+        image[(y - cy) ** 2 + (x - cx) ** 2 < radius**2] -= 90
+    out = io.BytesIO()
+    Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(out, "PNG")
+    return out.getvalue()
+
+
+def _copy_text(value: Any, column: sa.Column) -> str:
+    # PostgreSQL COPY text format for one value of `column`
+    if value is None:
+        return "\\N"
+    if isinstance(column.type, ARRAY):
+        items = (
+            '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+            for item in value
+        )
+        text = "{" + ",".join(items) + "}"
+    elif isinstance(column.type, sa.JSON) or isinstance(value, dict | list):
+        text = json.dumps(value)
+    elif isinstance(value, bool):
+        text = "t" if value else "f"
+    elif isinstance(value, datetime):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return (
+        text.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _outcome_labels(table: sa.Table) -> dict[str, str]:
+    # native enums created from InspectionOutcome store its names; a
+    # column declared with the values needs those instead
+    column = table.c.get("inspection_outcome")
+    enums = getattr(column.type, "enums", None) if column is not None else None
+    if enums and "pass" in enums:
+        return {"PASS": "pass", "FAIL": "fail", "PENDING": "pending"}
+    return {}
+
+
+def bulk_insert(
+    connection: Connection, table: sa.Table, rows: Sequence[dict[str, Any]]
+) -> int:
+    """Insert `rows` into `table` as fast as the database allows.
+
+    PostgreSQL gets one COPY per batch (through psycopg), everything else a
+    multi-row executemany. Keys the table has no column for are dropped, so
+    the generator works against older schemas too.
+    """
+    if not rows:
+        return 0
+    columns = [column for column in table.columns if column.name in rows[0]]
+    labels = _outcome_labels(table)
+    if labels:
+        rows = [
+            {**row, "inspection_outcome": labels[row["inspection_outcome"]]}
+            for row in rows
+        ]
+    driver = connection.connection.driver_connection
+    if connection.dialect.name == "postgresql" and hasattr(driver, "cursor"):
+        cursor = driver.cursor()
+        if hasattr(cursor, "copy"):  # psycopg 3
+            names = ", ".join(f'"{column.name}"' for column in columns)
+            with cursor.copy(f'COPY "{table.name}" ({names}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write(
+                        "\t".join(_copy_text(row[c.name], c) for c in columns) + "\n"
+                    )
+            return len(rows)
+    # bind through our own column types where we have them: reflection
+    # turns UUID columns on SQLite into plain CHAR, which can't bind a UUID
+    typed = SCHEMA.tables.get(table.name, table)
+    target = sa.Table(
+        table.name,
+        sa.MetaData(),
+        *(sa.Column(c.name, typed.c.get(c.name, c).type) for c in columns),
+    )
+    # straight to the driver's executemany with the dialect's own bind
+    # conversions, skipping per-row statement handling in SQLAlchemy
+    dialect = connection.dialect
+    compiled = target.insert().compile(dialect=dialect)
+    order = compiled.positiontup or [c.name for c in target.columns]
+    processors = [
+        (name, target.c[name].type.dialect_impl(dialect).bind_processor(dialect))
+        for name in order
+    ]
+    params = [
+        tuple(
+            # None stays SQL NULL rather than a JSON 'null'
+            process(row[name]) if process and row[name] is not None else row[name]
+            for name, process in processors
+        )
+        for row in rows
+    ]
+    if not compiled.positional:
+        params = [dict(zip(order, values, strict=True)) for values in params]
+    connection.exec_driver_sql(str(compiled), params)
+    return len(rows)
@@ -0,0 +1,83 @@
+"""Core table definitions of the inspection schema.
+
+The API models in app/models.py are plain pydantic models, so queries and
+writes go through these tables and results are validated into the models
+at the edge. They mirror the alembic migrations; tags are stored as a list
+of tag names (a text array on PostgreSQL, JSON elsewhere).
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from app.models import InspectionOutcome
+
+TAG_LIST = sa.JSON(none_as_null=True).with_variant(ARRAY(sa.String), "postgresql")
+JSON_DOCUMENT = sa.JSON().with_variant(JSONB(), "postgresql")
+
+metadata = sa.MetaData()
+
+users = sa.Table(
+    "user",
+    metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("email", sa.String(255), nullable=False, unique=True),
+    sa.Column("is_active", sa.Boolean, nullable=False),
+    sa.Column("is_superuser", sa.Boolean, nullable=False),
+    sa.Column("full_name", sa.String(255)),
+    sa.Column("hashed_password", sa.String, nullable=False),
+)
+
+inspection_stations = sa.Table(
+    "inspectionstation",
+    metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("name", sa.String(255), nullable=False),
+    sa.Column("description", sa.String, nullable=False),
+    sa.Column("product_image_url", sa.String, nullable=False),
+    sa.Column("criteria", TAG_LIST),
+    sa.Column("owner_id", sa.Uuid, nullable=False, index=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+)
+
+inspection_results = sa.Table(
+    "inspectionresult",
+    metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("station_id", sa.Uuid, nullable=False),
+    sa.Column("owner_id", sa.Uuid),
+    sa.Column("captured_image_url", sa.String, nullable=False),
+    sa.Column(
+        "inspection_outcome",
+        sa.Enum(InspectionOutcome, name="inspectionoutcome"),
+        nullable=False,
+    ),
+    sa.Column("notes", sa.String),
+    sa.Column("phash", sa.String(16)),
+    sa.Column("features", JSON_DOCUMENT),
+    sa.Column("tags", TAG_LIST),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+    sa.Column("updated_at", sa.DateTime),
+    sa.Index("ix_inspectionresult_owner_id_created_at", "owner_id", "created_at"),
+    sa.Index("ix_inspectionresult_owner_id_station_id", "owner_id", "station_id"),
+    sa.Index("ix_inspectionresult_station_id_created_at", "station_id", "created_at"),
+)
+
+tag_inspections = sa.Table(
+    "inspectiontagcreate",
+    metadata,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("user_id", sa.Uuid, nullable=False),
+    sa.Column("date", sa.DateTime, nullable=False),
+    sa.Column("inspection_type", sa.String(64), nullable=False),
+    sa.Column("details", sa.String, nullable=False),
+    sa.Column("tags", TAG_LIST),
+    sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("updated_at", sa.DateTime),
+    # one per sort key of InspectionTAGCRUD.get_inspections
+    *(
+        sa.Index(f"ix_inspectiontagcreate_user_id_{key}_id", "user_id", key, "id")
+        for key in ("date", "inspection_type", "created_at")
+    ),
+)
@@ -0,0 +1,343 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    started_at: float  # wall clock, for the exported record
+    spans: list["Span"] = field(default_factory=list)
+
+
+@dataclass
+class Span:
+    name: str
+    trace: Trace
+    span_id: str
+    parent_id: str | None
+    start: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    duration: float | None = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+# the open span of the current request; contextvars follow the request into
+# run_in_threadpool and sync dependencies, so nesting works across threads
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+# set instead of a span when the trace wasn't sampled, so children skip fast
+_UNSAMPLED = Span("unsampled", Trace("", 0.0), "", None, 0.0)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class FileExporter:
+    """Appends finished traces as JSON lines to a local file.
+
+    Writing happens on a daemon thread, started on first use so forked
+    workers each get their own; requests only enqueue. When the queue is
+    full traces are dropped and counted rather than slowing requests down.
+    A `{pid}` in the path gives every worker its own file.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10_000):
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(max_queue)
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def export(self, record: dict[str, Any]) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until everything queued so far is written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="trace-exporter", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        path = self.path.format(pid=os.getpid())
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                try:
+                    f.write(json.dumps(record, default=str) + "\n")
+                    if self._queue.empty():
+                        f.flush()
+                except OSError:
+                    logger.exception("Could not write trace to %s", path)
+                finally:
+                    self._queue.task_done()
+
+
+class Tracer:
+    """Spans for the stages of a request, sampled per trace.
+
+    A span opened with no span around it starts a trace, which is kept with
+    probability `sample_rate`; everything inside an unsampled trace costs a
+    context variable lookup. A sampled trace is exported as one record,
+    with all its spans, when its root span ends.
+    """
+
+    def __init__(self, exporter: FileExporter | None, sample_rate: float = 0.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    def start(self, name: str, **attributes: Any) -> Span | None:
+        """Open a span without making it current (for leaf spans like SQL)."""
+        parent = _current.get()
+        if parent is _UNSAMPLED or parent is None:
+            return None
+        span = Span(
+            name, parent.trace, _new_id(64), parent.span_id, time.perf_counter()
+        )
+        span.attributes.update(attributes)
+        return span
+
+    def end(self, span: Span | None) -> None:
+        if span is None:
+            return
+        span.duration = time.perf_counter() - span.start
+        span.trace.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | None]:
+        parent = _current.get()
+        if parent is _UNSAMPLED:
+            yield None
+            return
+        if parent is None:
+            if not self.enabled or random.random() >= self.sample_rate:
+                token = _current.set(_UNSAMPLED)
+                try:
+                    yield None
+                finally:
+                    _current.reset(token)
+                return
+            trace = Trace(_new_id(128), time.time())
+            span = Span(name, trace, _new_id(64), None, time.perf_counter())
+        else:
+            span = Span(
+                name, parent.trace, _new_id(64), parent.span_id, time.perf_counter()
+            )
+        span.attributes.update(attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self.end(span)
+            if parent is None:
+                self._export(span)
+
+    def _export(self, root: Span) -> None:
+        if self.exporter is None:
+            return
+        self.exporter.export(
+            {
+                "trace_id": root.trace.trace_id,
+                "name": root.name,
+                "started_at": root.trace.started_at,
+                "duration_ms": round(root.duration * 1000, 3),
+                "attributes": root.attributes,
+                "spans": [
+                    {
+                        "name": span.name,
+                        "span_id": span.span_id,
+                        "parent_id": span.parent_id,
+                        "offset_ms": round((span.start - root.start) * 1000, 3),
+                        "duration_ms": round(span.duration * 1000, 3),
+                        "attributes": span.attributes,
+                    }
+                    for span in root.trace.spans
+                    if span is not root
+                ],
+            }
+        )
+
+
+tracer = Tracer(
+    FileExporter(settings.TRACE_FILE, settings.TRACE_MAX_QUEUE)
+    if settings.TRACING_ENABLED
+    else None,
+    settings.TRACE_SAMPLE_RATE,
+)
+span = tracer.span
+
+
+class TracingMiddleware:
+    """Opens the root span of every HTTP request, named after its route."""
+
+    def __init__(self, app: ASGIApp, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.tracer.span(f"{scope['method']} {scope['path']}") as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def traced_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.set(status=message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                # the route template groups /inspections/<id> requests together
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    root.name = f"{scope['method']} {route.path}"
+
+
+def instrument_engine(engine: Engine, tracer: Tracer = tracer) -> None:
+    """A span per SQL statement on `engine`."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        if context is not None:
+            context._trace_span = tracer.start(
+                "sql",
+                statement=statement[:300],
+                executemany=executemany,
+                db=engine.url.database,
+            )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):  # noqa: ARG001
+        if context is not None:
+            span = getattr(context, "_trace_span", None)
+            if span is not None:
+                span.set(rows=cursor.rowcount)
+            tracer.end(span)
+
+
+def instrument_sessions(tracer: Tracer = tracer) -> None:
+    """A span per Session commit: flush plus COMMIT, the write latency."""
+
+    @event.listens_for(Session, "before_commit")
+    def _before(session: Session) -> None:
+        session.info["trace_commit"] = tracer.start("db.commit")
+
+    @event.listens_for(Session, "after_commit")
+    def _after(session: Session) -> None:
+        tracer.end(session.info.pop("trace_commit", None))
+
+    @event.listens_for(Session, "after_rollback")
+    def _rollback(session: Session) -> None:
+        span = session.info.pop("trace_commit", None)
+        if span is not None:
+            span.set(error="rollback")
+            tracer.end(span)
+
+
+def instrument_fastapi(tracer: Tracer = tracer) -> Callable[[], None]:
+    """A span around FastAPI's response_model validation and encoding.
+
+    The request handler looks `serialize_response` up in its module on
+    every call, so wrapping the module attribute covers every route. This
+    is process-wide: instrumenting again swaps the tracer instead of
+    nesting spans, and the returned function puts back what was there
+    before (tests instrument with their own tracer and undo it).
+    """
+    import fastapi.routing
+
+    previous = fastapi.routing.serialize_response
+    serialize = getattr(previous, "__wrapped__", previous)
+
+    async def traced_serialize_response(*args: Any, **kwargs: Any) -> Any:
+        with tracer.span("serialize"):
+            return await serialize(*args, **kwargs)
+
+    traced_serialize_response.__wrapped__ = serialize  # type: ignore[attr-defined]
+    fastapi.routing.serialize_response = traced_serialize_response
+
+    def undo() -> None:
+        if fastapi.routing.serialize_response is traced_serialize_response:
+            fastapi.routing.serialize_response = previous
+
+    return undo
+
+
+def summarize(records: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Per root name: count, mean total ms and mean ms per span name.
+
+    Span times are summed within a trace first (a request issuing ten SQL
+    statements spends the sum of them in "sql"), then averaged. Nested
+    spans overlap their parents, "sql" under "auth" counts in both.
+    """
+    totals: dict[str, dict[str, Any]] = {}
+    for record in records:
+        entry = totals.setdefault(
+            record["name"], {"count": 0, "total_ms": 0.0, "spans": defaultdict(float)}
+        )
+        entry["count"] += 1
+        entry["total_ms"] += record["duration_ms"]
+        for child in record["spans"]:
+            entry["spans"][child["name"]] += child["duration_ms"]
+    return {
+        name: {
+            "count": entry["count"],
+            "mean_ms": entry["total_ms"] / entry["count"],
+            "spans_mean_ms": {
+                span: total / entry["count"]
+                for span, total in sorted(
+                    entry["spans"].items(), key=lambda item: -item[1]
+                )
+            },
+        }
+        for name, entry in totals.items()
+    }
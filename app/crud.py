@@ -1,91 +1,542 @@
-from app.models import InspectionOutcome,InspectionStation,InspectionStationCreate,InspectionResult,InspectionResultCreate,InspectionResultUpdate,ImageUploadResponse,Tag,InspectionTagBase,InspectionTagCreate, User,PaginatedResponse,InspectionTagUpdate
-from fastapi import UploadFile, HTTPException
+from app.models import InspectionOutcome,InspectionStation,InspectionStationCreate,InspectionResult,InspectionResultCreate,InspectionResultUpdate,ImageUploadResponse,Tag,InspectionTagBase,InspectionTagCreate, User,PaginatedResponse,InspectionTagUpdate,DuplicateCapture,GradingSummary,InspectionEvent,InspectionEventType,ImageUploadRequest,PresignedImageUpload,BatchTagRequest,BatchTagResult
+from app.core.cache import inspection_cache
+from app.core.config import settings
+from app.core.criteria import compile_criteria, feature_columns
+from app.core.events import broker
+from app.core.fieldsets import columns, dump_json, list_serializer
+from app.core.grading import GradingThresholds, grader
+from app.core.pagination import CursorError, decode_cursor, encode_cursor
+from app.core.partitions import id_filter, new_row_id
+from app.core.phash import compute_phash, phash_index, phash_to_hex
+from app.core.queue import GRADE_JOB, JobQueue
+from app.core.storage import StorageBackend, StorageError, legacy_candidates, shard_key, storage as default_storage
+from app.core.tables import inspection_results, inspection_stations, tag_inspections
+from app.core.tracing import span
+from app.core.uploads import copy_upload, file_sync, stream_multipart
+from fastapi import UploadFile, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 
 from uuid import UUID
 
-import aiofiles 
+import numpy as np
+import hashlib
+import hmac
 import os
+import re
+import tempfile
 
 from sqlmodel import Session, select,func
+from sqlalchemy import JSON, String, bindparam, delete, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from fastapi import HTTPException
 import uuid
 from typing import Optional,List,Optional
-from datetime import datetime
+from pydantic import TypeAdapter
+from datetime import datetime, timezone
+
+def _cacheable(session: Session) -> bool:
+   # a replica may not have the writes yet whose invalidation already ran,
+   # caching what it returns would pin the old rows until they expire
+   return not session.info.get("replica")
 
    # for 1st problem statement
 class InspectionService:
    def __init__(self, session: Session):
        self.session = session
 
+   def owns_station(self, station_id: UUID, user: User) -> bool:
+       return self.session.execute(
+           select(inspection_stations.c.id).where(
+               inspection_stations.c.id == station_id,
+               inspection_stations.c.owner_id == user.id
+           )
+       ).first() is not None
+
    def create_inspection_result(
        self,
        station_id: UUID,
        inspection: InspectionResultCreate,
        user: User
    ) -> InspectionResult:
-       station = self.session.get(InspectionStation, station_id)
-       if not station or station.owner_id != user.id:
+       if not self.owns_station(station_id, user):
            raise ValueError("Station not found or unauthorized")
 
-       result = InspectionResult(
-           station_id=station_id,
-           captured_image_url=inspection.captured_image_url,  
-           inspection_outcome=InspectionOutcome.PENDING,
-
-           notes=inspection.notes,
-           created_at=datetime.now()
-       )
-       
-       self.session.add(result)
+       # created_at comes from the time-ordered id, see new_row_id
+       result_id, now = new_row_id()
+       row = self.session.execute(
+           inspection_results.insert()
+           .values(
+               id=result_id,
+               station_id=station_id,
+               owner_id=user.id,
+               captured_image_url=str(inspection.captured_image_url),
+               inspection_outcome=InspectionOutcome.PENDING,
+               notes=inspection.notes,
+               phash=inspection.phash,
+               created_at=now,
+               version=1,
+               updated_at=now
+           )
+           .returning(*inspection_results.c)
+       ).mappings().one()
+       result = InspectionResult.model_validate(dict(row))
+       # grading runs in the worker, enqueued in the same transaction as the row
+       JobQueue(self.session).enqueue(result.id, GRADE_JOB, commit=False)
        self.session.commit()
-       self.session.refresh(result)
+       if result.phash:
+           phash_index.add(result.station_id, result.id, result.phash)
+       inspection_cache.invalidate_lists(user.id)
+       self._publish(InspectionEventType.CREATED, result, user.id)
        return result
 
+   def _publish(
+       self,
+       event_type: InspectionEventType,
+       result: InspectionResult,
+       owner_id: UUID
+   ) -> None:
+       broker.publish(InspectionEvent(
+           type=event_type,
+           inspection_id=result.id,
+           station_id=result.station_id,
+           owner_id=owner_id,
+           inspection_outcome=result.inspection_outcome
+       ))
+
+   def get_inspection_result(
+       self,
+       result_id: UUID,
+       user: User
+   ) -> Optional[InspectionResult]:
+       return self.get_inspection_results_by_ids([result_id], user)[0]
+
+   def get_inspection_results_by_ids(  # multi-get, in request order
+       self,
+       result_ids: List[UUID],
+       user: User
+   ) -> List[Optional[InspectionResult]]:
+       found = {}
+       # read before the query: a row is only cached under the generation
+       # it was loaded in, see InspectionCache
+       generation, cached_rows = inspection_cache.get_results(user.id, result_ids)
+       for result_id, cached in zip(result_ids, cached_rows, strict=True):
+           if cached is not None:
+               found[result_id] = InspectionResult.model_validate_json(cached)
+
+       missing = list({result_id for result_id in result_ids if result_id not in found})
+       if missing:
+           # one owner-scoped IN query for every id the cache didn't have;
+           # other users' ids simply don't match and read as not found
+           rows = self.session.execute(
+               select(inspection_results).where(
+                   id_filter(inspection_results, missing),
+                   inspection_results.c.owner_id == user.id
+               )
+           ).mappings().all()
+           for row in rows:
+               result = InspectionResult.model_validate(dict(row))
+               found[result.id] = result
+               if _cacheable(self.session):
+                   inspection_cache.set_result(
+                       user.id, result.id, result.model_dump_json().encode(), generation
+                   )
+       return [found.get(result_id) for result_id in result_ids]
+
+   def get_inspection_result_version(  # cheap check for conditional GETs
+       self,
+       result_id: UUID,
+       user: User
+   ) -> Optional[int]:
+       _, (cached,) = inspection_cache.get_results(user.id, [result_id])
+       if cached is not None:
+           return InspectionResult.model_validate_json(cached).version
+
+       return self.session.execute(
+           select(inspection_results.c.version).where(
+               id_filter(inspection_results, [result_id]),
+               inspection_results.c.owner_id == user.id
+           )
+       ).scalar()
+
+   def _sync_phash_index(self, station_id: UUID) -> None:
+       # other workers write results too: catch up on rows newer than the
+       # index, reload when the count shows rows deleted elsewhere
+       hashed = (
+           inspection_results.c.station_id == station_id,
+           inspection_results.c.phash.is_not(None)
+       )
+       generation = tuple(self.session.execute(
+           select(func.count(), func.max(inspection_results.c.created_at)).where(*hashed)
+       ).one())
+       known = phash_index.generation(station_id)
+       if known == generation:
+           return
+       ids_and_hashes = select(inspection_results.c.id, inspection_results.c.phash).where(*hashed)
+       if known is not None and known[1] is not None:
+           # >= so rows sharing the newest timestamp aren't missed, adds are idempotent
+           newer = self.session.execute(
+               ids_and_hashes.where(inspection_results.c.created_at >= known[1])
+           ).all()
+           if phash_index.extend(station_id, newer, generation):
+               return
+       phash_index.load(station_id, self.session.execute(ids_and_hashes).all(), generation)
+
+   def find_near_duplicates(  # captures of the same station within max_distance bits
+       self,
+       result_id: UUID,
+       user: User,
+       max_distance: int
+   ) -> List[DuplicateCapture]:
+       result = self.get_inspection_result(result_id, user)
+       if not result:
+           raise ValueError("Inspection result not found or unauthorized")
+       if not result.phash:
+           return []
+
+       self._sync_phash_index(result.station_id)
+
+       matches = {
+           key: distance
+           for key, distance in phash_index.search(
+               result.station_id, result.phash, max_distance
+           )
+           if key != result.id
+       }
+       if not matches:
+           return []
+
+       captures = self.session.execute(
+           select(inspection_results.c.id, inspection_results.c.captured_image_url).where(
+               id_filter(inspection_results, list(matches))
+           )
+       ).all()
+       duplicates = [
+           DuplicateCapture(
+               inspection_id=key,
+               captured_image_url=url,
+               distance=matches[key]
+           )
+           for key, url in captures
+       ]
+       duplicates.sort(key=lambda d: (d.distance, str(d.inspection_id)))
+       return duplicates
+
    def get_inspection_results(  # getting results with pagination
        self,
        user: User,
        station_id: Optional[UUID] = None,
        page: int = 1,
-       page_size: int = 20
+       page_size: int = 20,
+       created_from: Optional[datetime] = None,
+       created_to: Optional[datetime] = None,
+       fields: Optional[tuple] = None,
+       name: Optional[str] = None,
+       description: Optional[str] = None
    ) ->  PaginatedResponse:
-       query = select(InspectionResult).join(InspectionStation)
-       query = query.where(InspectionStation.owner_id == user.id)
-       
-       if station_id:
-           query = query.where(InspectionResult.station_id == station_id)
-           
-       total = self.session.exec(query).count()
+       filters = (user, station_id, created_from, created_to, name, description)
+       # a field set selects only its columns and returns plain dicts
+       projection = columns(inspection_results, fields) if fields else [inspection_results]
+       query = self._results_query(select(*projection), *filters)
+
+       total = self.session.execute(
+           self._results_query(select(func.count()), *filters)
+       ).scalar_one()
        offset = (page - 1) * page_size
-       results = self.session.exec(query.offset(offset).limit(page_size)).all()
-       
+       rows = self.session.execute(query.offset(offset).limit(page_size)).mappings().all()
+       if fields:
+           results = [dict(row) for row in rows]
+       else:
+           results = [InspectionResult.model_validate(dict(row)) for row in rows]
+
        return results, total
 
+   def get_inspection_results_version(  # (row count, latest write) of the filtered set
+       self,
+       user: User,
+       station_id: Optional[UUID] = None,
+       created_from: Optional[datetime] = None,
+       created_to: Optional[datetime] = None,
+       name: Optional[str] = None,
+       description: Optional[str] = None
+   ) -> tuple:
+       return tuple(self.session.execute(
+           self._results_query(
+               select(func.count(), func.max(inspection_results.c.updated_at)),
+               user,
+               station_id,
+               created_from,
+               created_to,
+               name,
+               description
+           )
+       ).one())
+
+   def _results_query(
+       self,
+       query,
+       user: User,
+       station_id: Optional[UUID],
+       created_from: Optional[datetime] = None,
+       created_to: Optional[datetime] = None,
+       name: Optional[str] = None,
+       description: Optional[str] = None
+   ):
+       # owner_id is denormalized onto the result, so owner scoping is a
+       # single-table (owner_id, created_at) / (owner_id, station_id) index scan
+       query = query.select_from(inspection_results)
+       query = query.where(inspection_results.c.owner_id == user.id)
+       if station_id:
+           query = query.where(inspection_results.c.station_id == station_id)
+       if name or description:
+           # station name/description: the caller's matching stations first,
+           # then their results through the (owner_id, station_id) index
+           stations = select(inspection_stations.c.id).where(
+               inspection_stations.c.owner_id == user.id
+           )
+           if name:
+               stations = stations.where(inspection_stations.c.name.icontains(name, autoescape=True))
+           if description:
+               stations = stations.where(
+                   inspection_stations.c.description.icontains(description, autoescape=True)
+               )
+           query = query.where(inspection_results.c.station_id.in_(stations))
+       # plain half-open comparisons on the partition key, so the planner
+       # only touches the months in range
+       if created_from:
+           query = query.where(inspection_results.c.created_at >= created_from)
+       if created_to:
+           query = query.where(inspection_results.c.created_at < created_to)
+       return query
+
+   def grade_pending(  # compare PENDING captures with the station reference image
+       self,
+       station_id: UUID,
+       user: User,
+       limit: int = 1000
+   ) -> GradingSummary:
+       station = self._station(station_id)
+       if not station or station.owner_id != user.id:
+           raise ValueError("Station not found or unauthorized")
+
+       pending = self.session.execute(
+           select(
+               inspection_results.c.id,
+               inspection_results.c.captured_image_url,
+               inspection_results.c.tags
+           )
+           .where(
+               inspection_results.c.station_id == station_id,
+               inspection_results.c.inspection_outcome == InspectionOutcome.PENDING
+           )
+           .order_by(inspection_results.c.created_at)
+           .limit(limit)
+       ).all()
+
+       return self._grade(station, pending)
+
+   def grade_results(  # used by the background worker, callers are not owner scoped
+       self,
+       result_ids: List[UUID]
+   ) -> GradingSummary:
+       pending = self.session.execute(
+           select(
+               inspection_results.c.id,
+               inspection_results.c.captured_image_url,
+               inspection_results.c.tags,
+               inspection_results.c.station_id
+           ).where(
+               id_filter(inspection_results, result_ids),
+               inspection_results.c.inspection_outcome == InspectionOutcome.PENDING
+           )
+       ).all()
+       by_station: dict[UUID, list] = {}
+       for result_id, url, tags, station_id in pending:
+           by_station.setdefault(station_id, []).append((result_id, url, tags))
+
+       stations = self.session.execute(
+           select(inspection_stations).where(inspection_stations.c.id.in_(list(by_station)))
+       ).all()
+       summary = GradingSummary(graded=0, passed=0, failed=0, skipped=0)
+       for station in stations:
+           graded = self._grade(station, by_station.pop(station.id))
+           summary.graded += graded.graded
+           summary.passed += graded.passed
+           summary.failed += graded.failed
+           summary.skipped += graded.skipped
+       # results whose station has gone away
+       summary.skipped += sum(len(rows) for rows in by_station.values())
+       return summary
+
+   def _station(self, station_id: UUID):
+       return self.session.execute(
+           select(inspection_stations).where(inspection_stations.c.id == station_id)
+       ).first()
+
+   def _grade(
+       self,
+       station: InspectionStation,
+       pending: List[tuple]
+   ) -> GradingSummary:
+       graded = grader.grade(
+           str(station.product_image_url), [str(url) for _, url, _ in pending]
+       )
+       rows = []
+       for (result_id, _, tags), verdict in zip(pending, graded, strict=True):
+           if verdict is None:
+               continue
+           passed, features = verdict
+           rows.append({
+               "id": result_id,
+               "inspection_outcome": InspectionOutcome.PASS if passed else InspectionOutcome.FAIL,
+               "features": features,
+               "tags": tags
+           })
+       if rows and station.criteria:
+           # station criteria replace the default thresholds
+           criteria = compile_criteria(station.criteria)
+           verdicts = criteria.evaluate(
+               feature_columns([row["features"] for row in rows], criteria.features),
+               tags=[row["tags"] for row in rows],
+               size=len(rows)
+           )
+           for row, passed in zip(rows, verdicts, strict=True):
+               row["inspection_outcome"] = InspectionOutcome.PASS if passed else InspectionOutcome.FAIL
+       if rows:
+           # executemany by primary key, one round trip per batch
+           self.session.connection().execute(
+               update(inspection_results)
+               .where(inspection_results.c.id == bindparam("b_id"))
+               .values(
+                   inspection_outcome=bindparam("b_outcome"),
+                   features=bindparam("b_features"),
+                   version=inspection_results.c.version + 1,
+                   updated_at=datetime.now()
+               ),
+               [
+                   {"b_id": row["id"], "b_outcome": row["inspection_outcome"], "b_features": row["features"]}
+                   for row in rows
+               ]
+           )
+           self.session.commit()
+           inspection_cache.invalidate_results(station.owner_id, [row["id"] for row in rows])
+           for row in rows:
+               broker.publish(InspectionEvent(
+                   type=InspectionEventType.UPDATED,
+                   inspection_id=row["id"],
+                   station_id=station.id,
+                   owner_id=station.owner_id,
+                   inspection_outcome=row["inspection_outcome"]
+               ))
+
+       passed = sum(row["inspection_outcome"] == InspectionOutcome.PASS for row in rows)
+       return GradingSummary(
+           graded=len(rows),
+           passed=passed,
+           failed=len(rows) - passed,
+           skipped=len(pending) - len(rows)
+       )
+
+   def regrade_station(  # re-apply the station criteria to every graded result
+       self,
+       station_id: UUID,
+       user: User,
+       chunk_size: int = 10000
+   ) -> GradingSummary:
+       station = self._station(station_id)
+       if not station or station.owner_id != user.id:
+           raise ValueError("Station not found or unauthorized")
+       criteria = compile_criteria(station.criteria)
+       if not (criteria.feature_rules or criteria.tag_rules):
+           # same verdicts as _grade gives a station without criteria
+           criteria = compile_criteria(GradingThresholds.from_settings().as_criteria())
+
+       # pull only the measured features the rules need, straight out of the
+       # JSON column, so each chunk arrives as ready-made columns
+       columns = [inspection_results.c.features[name].as_float() for name in criteria.features]
+       if criteria.tag_rules:
+           columns.append(inspection_results.c.tags)
+       query = (
+           select(inspection_results.c.id, *columns)
+           .where(
+               inspection_results.c.station_id == station_id,
+               inspection_results.c.features.is_not(None)
+           )
+           .execution_options(yield_per=chunk_size)
+       )
+
+       passed_ids: List[UUID] = []
+       failed_ids: List[UUID] = []
+       for chunk in self.session.execute(query).partitions():
+           ids, *values = zip(*chunk, strict=True)
+           feature_values = values[:len(criteria.features)]
+           mask = criteria.evaluate(
+               {
+                   name: np.array(column, dtype=np.float64)
+                   for name, column in zip(criteria.features, feature_values, strict=True)
+               },
+               tags=values[-1] if criteria.tag_rules else None,
+               size=len(ids)
+           )
+           ids_array = np.array(ids, dtype=object)
+           passed_ids.extend(ids_array[mask])
+           failed_ids.extend(ids_array[~mask])
+
+       for outcome, ids in (
+           (InspectionOutcome.PASS, passed_ids),
+           (InspectionOutcome.FAIL, failed_ids)
+       ):
+           for start in range(0, len(ids), chunk_size):
+               self.session.execute(
+                   update(inspection_results)
+                   .where(id_filter(inspection_results, ids[start:start + chunk_size]))
+                   .values(
+                       inspection_outcome=outcome,
+                       version=inspection_results.c.version + 1,
+                       updated_at=datetime.now()
+                   )
+               )
+       # no per-row feed events here: a history regrade can touch millions of
+       # rows, live monitors only follow new captures
+       self.session.commit()
+       inspection_cache.invalidate_results(station.owner_id, passed_ids + failed_ids)
+
+       return GradingSummary(
+           graded=len(passed_ids) + len(failed_ids),
+           passed=len(passed_ids),
+           failed=len(failed_ids),
+           skipped=0
+       )
+
    def update_inspection_result(
        self,
        result_id: UUID,
        update_data: InspectionResultUpdate,
        user: User
    ) -> InspectionResult:
-       query = (
-           select(InspectionResult)
-           .join(InspectionStation)
+       # one owner-scoped UPDATE ... RETURNING instead of select, write and refresh
+       row = self.session.execute(
+           update(inspection_results)
            .where(
-               InspectionResult.id == result_id,
-               InspectionStation.owner_id == user.id
+               id_filter(inspection_results, [result_id]),
+               inspection_results.c.owner_id == user.id
            )
-       )
-       result = self.session.exec(query).first()
-       
-       if not result:
+           .values(
+               **update_data.model_dump(exclude_unset=True),
+               version=inspection_results.c.version + 1,
+               updated_at=datetime.now()
+           )
+           .returning(*inspection_results.c)
+       ).mappings().first()
+
+       if not row:
+           self.session.rollback()
            raise ValueError("Inspection result not found or unauthorized")
-       
-       update_dict = update_data.dict(exclude_unset=True)
-       for key, value in update_dict.items():
-           setattr(result, key, value)
-           
-       self.session.add(result)
+
+       # built from the returned row, so the commit needs no reload
+       result = InspectionResult.model_validate(dict(row))
        self.session.commit()
-       self.session.refresh(result)
+       inspection_cache.invalidate_results(user.id, [result.id])
+       self._publish(InspectionEventType.UPDATED, result, user.id)
        return result
 
    def delete_inspection_result(
@@ -93,60 +544,242 @@ class InspectionService:
        result_id: UUID,
        user: User
    ) -> bool:
-       query = (
-           select(InspectionResult)
-           .join(InspectionStation) 
+       result = self.session.execute(
+           delete(inspection_results)
            .where(
-               InspectionResult.id == result_id,
-               InspectionStation.owner_id == user.id
+               id_filter(inspection_results, [result_id]),
+               inspection_results.c.owner_id == user.id
            )
-       )
-       result = self.session.exec(query).first()
-       
+           .returning(
+               inspection_results.c.id,
+               inspection_results.c.station_id,
+               inspection_results.c.inspection_outcome
+           )
+       ).first()
+
        if not result:
            return False
-           
-       self.session.delete(result)
+
        self.session.commit()
+       phash_index.remove(result.station_id, result.id)
+       inspection_cache.invalidate_results(user.id, [result.id])
+       self._publish(InspectionEventType.DELETED, result, user.id)
        return True
+# <file id>.<owner tag>_<timestamp>.<ext>, see ImageUploadService._destination
+_PRESIGNED_NAME = re.compile(r"^(?P<file_id>[0-9a-f-]{36})\.(?P<owner_tag>[0-9a-f]{16})_")
+
 # for the image uploading service in the 1st problem
 class ImageUploadService:
-    def __init__(self):
-        self.UPLOAD_DIR = "static/uploads"
+    def __init__(self, storage: Optional[StorageBackend] = None):
+        self.storage = storage or default_storage
+        # uploads for remote backends are staged here before they are stored
+        self.UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "inspection-uploads")
         self.ALLOWED_TYPES = {"image/jpeg", "image/png"}
         self.MAX_SIZE = 5 * 1024 * 1024  # 5MB
+        self.BUFFER_SIZE = settings.UPLOAD_BUFFER_SIZE
+        self.file_sync = file_sync
         os.makedirs(self.UPLOAD_DIR, exist_ok=True)
 
+    def _destination(
+        self, filename: Optional[str], owner_id: Optional[UUID] = None
+    ) -> tuple[uuid.UUID, str]:
+        file_id = uuid.uuid4()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_ext = os.path.splitext(filename or "")[1]
+        # presigned keys carry a tag of their owner, checked on completion
+        stem = f"{file_id}.{self._owner_tag(file_id, owner_id)}" if owner_id else str(file_id)
+        return file_id, shard_key(f"{stem}_{timestamp}{file_ext}", settings.STORAGE_LAYOUT)
+
+    def _owner_tag(self, file_id: UUID, owner_id: UUID) -> str:
+        message = f"upload\n{file_id}\n{owner_id}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:16]
+
+    def _path(self, key: str) -> str:
+        # write straight into place when the backend is a local directory
+        local_path = self.storage.local_path(key)
+        if local_path is not None:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            return local_path
+        return os.path.join(self.UPLOAD_DIR, os.path.basename(key))
+
+    async def _store(
+        self, file_id: uuid.UUID, key: str, path: str, content_type: Optional[str]
+    ) -> ImageUploadResponse:
+        phash = await self.compute_phash(path)
+        if self.storage.local_path(key) is None:
+            try:
+                with span("storage.put", key=key):
+                    await run_in_threadpool(self.storage.put_file, key, path, content_type)
+            except StorageError as e:
+                raise HTTPException(502, f"Storage unavailable: {e}")
+            finally:
+                if os.path.exists(path):
+                    os.unlink(path)
+        return ImageUploadResponse(
+            file_id=file_id,
+            file_name=os.path.basename(key),
+            file_url=self.storage.url(key),
+            uploaded_at=datetime.now(),
+            phash=phash
+        )
+
     async def save_upload_file(self, upload_file: UploadFile) -> ImageUploadResponse:
         if upload_file.content_type not in self.ALLOWED_TYPES:
             raise HTTPException(400, "Invalid file type")
+        if upload_file.size is not None and upload_file.size > self.MAX_SIZE:
+            raise HTTPException(413, "File too large")
 
-        file_size = 0
-        file_id = uuid.uuid4()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_ext = os.path.splitext(upload_file.filename)[1]
-        new_filename = f"{file_id}_{timestamp}{file_ext}"
-        file_path = os.path.join(self.UPLOAD_DIR, new_filename)
+        file_id, key = self._destination(upload_file.filename)
+        file_path = self._path(key)
+        part_path = file_path + ".part"
 
         try:
-            async with aiofiles.open(file_path, 'wb') as f:
-                while chunk := await upload_file.read(8192):
-                    file_size += len(chunk)
-                    if file_size > self.MAX_SIZE:
-                        os.unlink(file_path)
-                        raise HTTPException(400, "File too large")
-                    await f.write(chunk)
-
-            return ImageUploadResponse(
-                file_id=file_id,
-                file_name=new_filename,
-                file_url=f"/static/uploads/{new_filename}",
-                uploaded_at=datetime.now()
-            )
+            # the whole copy is one thread hop, zero-copy when the upload
+            # was spooled to disk; readers only see the file once renamed
+            with span("upload.copy"):
+                await run_in_threadpool(
+                    copy_upload, upload_file.file, part_path, self.MAX_SIZE, self.BUFFER_SIZE
+                )
+            await self.file_sync.commit(part_path, file_path)
+            return await self._store(file_id, key, file_path, upload_file.content_type)
         except Exception as e:
-            if os.path.exists(file_path):
-                os.unlink(file_path)
+            for path in (part_path, file_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+            if isinstance(e, HTTPException):
+                raise
             raise HTTPException(500, str(e))
+
+    async def save_upload_stream(self, request: Request, field_name: str = "file") -> ImageUploadResponse:
+        """Stream the `field_name` part of a multipart request into storage
+        without spooling it first. Oversized bodies are refused from
+        Content-Length or mid-stream with 413."""
+        targets: dict[str, tuple[uuid.UUID, str, str, Optional[str]]] = {}
+
+        def destination(name: str, filename: str, content_type: Optional[str]) -> str:
+            if name != field_name or targets:
+                raise HTTPException(400, f"Expected a single '{field_name}' file")
+            if content_type not in self.ALLOWED_TYPES:
+                raise HTTPException(400, "Invalid file type")
+            file_id, key = self._destination(filename)
+            targets[name] = (file_id, key, self._path(key), content_type)
+            return targets[name][2]
+
+        # multipart parsing and the part writes, including upload.fsync
+        with span("upload.stream", content_length=request.headers.get("content-length")):
+            await stream_multipart(
+                request.headers,
+                request.stream(),
+                destination,
+                self.MAX_SIZE,
+                buffer_size=self.BUFFER_SIZE,
+                sync=self.file_sync
+            )
+        if field_name not in targets:
+            raise HTTPException(400, f"Missing '{field_name}' file")
+        return await self._store(*targets[field_name])
+
+    async def discard(self, upload: ImageUploadResponse) -> None:
+        """Delete a stored upload that no inspection ended up referencing."""
+        key = self.storage.key_for_url(upload.file_url)
+        if key is not None:
+            with span("storage.delete", key=key):
+                await run_in_threadpool(self.storage.delete, key)
+
+    def presign_upload(self, upload: ImageUploadRequest, user: User) -> PresignedImageUpload:
+        """Let the client put the image into storage itself; the API only
+        hands out the signed target and never sees the bytes."""
+        if upload.content_type not in self.ALLOWED_TYPES:
+            raise HTTPException(400, "Invalid file type")
+        file_id, key = self._destination(upload.filename, user.id)
+        try:
+            presigned = self.storage.presign_upload(
+                key, upload.content_type, self.MAX_SIZE, settings.STORAGE_PRESIGN_EXPIRES
+            )
+        except StorageError as e:
+            raise HTTPException(502, f"Storage unavailable: {e}")
+        return PresignedImageUpload(
+            file_id=file_id,
+            key=key,
+            upload_url=presigned.url,
+            fields=presigned.fields,
+            expires_at=datetime.fromtimestamp(presigned.expires_at, timezone.utc),
+            max_size=presigned.max_size,
+            file_url=self.storage.url(key)
+        )
+
+    async def complete_upload(self, key: str, user: User) -> ImageUploadResponse:
+        """Confirm an object uploaded through presign_upload by the same user.
+
+        The image bytes stay in storage: there is no perceptual hash for a
+        direct upload, so it isn't checked for duplicates."""
+        # keys are only ever minted by presign_upload, under one of the layouts
+        name = os.path.basename(key)
+        match = _PRESIGNED_NAME.match(name)
+        if not match or key not in legacy_candidates(name, settings.STORAGE_LAYOUT):
+            raise HTTPException(400, "Invalid upload key")
+        try:
+            file_id = uuid.UUID(match["file_id"])
+        except ValueError:
+            raise HTTPException(400, "Invalid upload key")
+        # someone else's key reads as missing
+        if not hmac.compare_digest(match["owner_tag"], self._owner_tag(file_id, user.id)):
+            raise HTTPException(404, "Upload not found")
+        try:
+            with span("storage.exists", key=key):
+                exists = await run_in_threadpool(self.storage.exists, key)
+        except StorageError as e:
+            raise HTTPException(502, f"Storage unavailable: {e}")
+        if not exists:
+            raise HTTPException(404, "Upload not found")
+        return ImageUploadResponse(
+            file_id=file_id,
+            file_name=name,
+            file_url=self.storage.url(key),
+            uploaded_at=datetime.now()
+        )
+
+    async def compute_phash(self, file_path: str) -> Optional[str]:
+        # decoding is CPU bound, keep it off the event loop
+        try:
+            with span("upload.phash"):
+                value = await run_in_threadpool(compute_phash, file_path)
+        except OSError:
+            # not a decodable image, nothing to deduplicate against
+            return None
+        return phash_to_hex(value)
+_tag_inspection_list = TypeAdapter(List[InspectionTagCreate])
+
+# set-based SQL on the stored list of names (a text array on PostgreSQL, a
+# JSON array on SQLite): append the tags a row doesn't have yet / drop the
+# given ones, keeping order; whether a row lacks any of the added tags / has
+# any of the removed ones; whether it has all of the filtered tags
+_TAG_SQL = {
+    "postgresql": {
+        "contains": "coalesce(tags, '{}') @> :filter_tags",
+        "add": "coalesce(tags, '{}') || ARRAY(SELECT t FROM unnest(:add_tags) AS t "
+               "WHERE t <> ALL(coalesce(tags, '{}')))",
+        "remove": "ARRAY(SELECT t FROM unnest(tags) AS t WHERE t <> ALL(:remove_tags))",
+        "lacks": "NOT coalesce(tags, '{}') @> :add_tags",
+        "has": "tags && :remove_tags",
+    },
+    "sqlite": {
+        "contains": "NOT EXISTS (SELECT 1 FROM json_each(:filter_tags) "
+                    "WHERE value NOT IN (SELECT value FROM json_each(coalesce(tags, '[]'))))",
+        "add": "(SELECT json_group_array(value) FROM ("
+               "SELECT value FROM json_each(coalesce(tags, '[]')) UNION ALL "
+               "SELECT value FROM json_each(:add_tags) "
+               "WHERE value NOT IN (SELECT value FROM json_each(coalesce(tags, '[]')))))",
+        "remove": "(SELECT json_group_array(value) FROM json_each(tags) "
+                  "WHERE value NOT IN (SELECT value FROM json_each(:remove_tags)))",
+        "lacks": "EXISTS (SELECT 1 FROM json_each(:add_tags) "
+                 "WHERE value NOT IN (SELECT value FROM json_each(coalesce(tags, '[]'))))",
+        "has": "EXISTS (SELECT 1 FROM json_each(coalesce(tags, '[]')) "
+               "WHERE value IN (SELECT value FROM json_each(:remove_tags)))",
+    },
+}
+_TAG_PARAM_TYPES = {"postgresql": ARRAY(String), "sqlite": JSON()}
+
 class InspectionTAGCRUD:
    def __init__(self, session: Session):
        self.session = session
@@ -156,26 +789,39 @@ class InspectionTAGCRUD:
        inspection: InspectionTagBase,
        id: UUID
    ) -> InspectionTagCreate:
-       db_inspection = InspectionTagCreate(
-           **inspection.model_copy(),
-           id=id
-       )
-       self.session.add(db_inspection)
+       inspection_id, now = new_row_id()
+       row = self.session.execute(
+           tag_inspections.insert()
+           .values(
+               **inspection.model_dump(exclude={"tags"}),
+               tags=inspection.tags.names() if inspection.tags else None,
+               id=inspection_id,
+               user_id=id,
+               version=1,
+               created_at=now,
+               updated_at=now
+           )
+           .returning(*tag_inspections.c)
+       ).mappings().one()
        self.session.commit()
-       self.session.refresh(db_inspection)
-       return db_inspection
+       inspection_cache.invalidate_lists(id)
+       return InspectionTagCreate.model_validate(dict(row))
 
    def get_inspection(
        self,
        inspection_id:  UUID,
        id: UUID
-   ) -> InspectionTagCreate:
-       return self.session.exec(
-           select(InspectionTagCreate).where(
-               InspectionTagCreate.id == inspection_id,
-
+   ) -> Optional[InspectionTagCreate]:
+       row = self.session.execute(
+           select(tag_inspections).where(
+               id_filter(tag_inspections, [inspection_id]),
+               tag_inspections.c.user_id == id
            )
-       ).first()
+       ).mappings().first()
+       return InspectionTagCreate.model_validate(dict(row)) if row else None
+
+   # whitelisted sort keys, each backed by a (user_id, <key>, id) index
+   SORT_KEYS = ("date", "inspection_type", "created_at")
 
    def get_inspections(
        self,
@@ -185,40 +831,178 @@ class InspectionTAGCRUD:
        inspection_type: Optional[str] = None,
        tags: Optional[List[str]] = None,
        skip: int = 0,
-       limit: int = 50
+       limit: int = 50,
+       sort_by: Optional[str] = None,
+       sort_desc: bool = False,
+       cursor: Optional[str] = None,
+       fields: Optional[tuple] = None
    ) -> List[InspectionTagCreate]:
-       query = select(InspectionTagCreate).where(InspectionTagCreate.user_id == user_id)
+       sort_by, sort_desc, after = self._sort_order(sort_by, sort_desc, cursor)
+       serializer = _tag_inspection_list
+       projection = [tag_inspections]
+       if fields:
+           # narrowed rows come back as dicts; the sort key rides along for
+           # next_cursor and is dropped again when the page is serialized
+           if sort_by not in fields:
+               fields = fields + (sort_by,)
+           serializer = list_serializer(InspectionTagCreate, fields)
+           projection = columns(tag_inspections, fields)
+       key = inspection_cache.list_key(
+           "tag-inspections",
+           user_id,
+           date_from=date_from,
+           date_to=date_to,
+           inspection_type=inspection_type,
+           tags=tags,
+           skip=skip,
+           limit=limit,
+           sort_by=sort_by,
+           sort_desc=sort_desc,
+           cursor=cursor,
+           fields=fields
+       )
+       cached = inspection_cache.backend.get(key)
+       if cached is not None:
+           return serializer.validate_json(cached)
 
+       query = self._filtered_query(
+           select(*projection), user_id, date_from, date_to, inspection_type, tags
+       )
+       column = tag_inspections.c[sort_by]
+       if after is not None:
+           # keyset continuation: a row comparison the (user_id, key, id)
+           # index answers with a range scan, however deep the page
+           position = tuple_(column, tag_inspections.c.id)
+           query = query.where(position < tuple_(*after) if sort_desc else position > tuple_(*after))
+           skip = 0
+       # id breaks ties so rows with equal keys never swap between pages
+       order = (column.desc(), tag_inspections.c.id.desc()) if sort_desc else (column, tag_inspections.c.id)
+
+       rows = self.session.execute(
+           query.order_by(*order).offset(skip).limit(limit)
+       ).mappings().all()
+       if fields:
+           inspections = [dict(row) for row in rows]
+           if "tags" in fields:
+               for row in inspections:
+                   row["tags"] = Tag.from_names(row["tags"]) if row["tags"] is not None else None
+           if _cacheable(self.session):
+               inspection_cache.backend.set(key, dump_json(serializer, inspections))
+       else:
+           inspections = _tag_inspection_list.validate_python([dict(row) for row in rows])
+           if _cacheable(self.session):
+               inspection_cache.backend.set(key, _tag_inspection_list.dump_json(inspections))
+       return inspections
+
+   def next_cursor(
+       self,
+       inspections: List[InspectionTagCreate],
+       limit: int,
+       sort_by: Optional[str] = None,
+       sort_desc: bool = False,
+       cursor: Optional[str] = None
+   ) -> Optional[str]:
+       """Cursor for the page after `inspections`, None on the last page."""
+       if len(inspections) < limit:
+           return None
+       sort_by, sort_desc, _ = self._sort_order(sort_by, sort_desc, cursor)
+       last = inspections[-1]
+       if isinstance(last, dict):  # a narrowed field set
+           return encode_cursor(sort_by, sort_desc, last[sort_by], last["id"])
+       return encode_cursor(sort_by, sort_desc, getattr(last, sort_by), last.id)
+
+   def _sort_order(
+       self,
+       sort_by: Optional[str],
+       sort_desc: bool,
+       cursor: Optional[str]
+   ) -> tuple:
+       after = None
+       if cursor:
+           try:
+               cursor_sort, cursor_desc, value, last_id = decode_cursor(cursor)
+           except CursorError as e:
+               raise HTTPException(status_code=400, detail=str(e))
+           if (sort_by or cursor_sort) != cursor_sort or (sort_by and sort_desc != cursor_desc):
+               raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+           sort_by, sort_desc, after = cursor_sort, cursor_desc, (value, last_id)
+       sort_by = sort_by or "date"
+       if sort_by not in self.SORT_KEYS:
+           raise HTTPException(
+               status_code=400,
+               detail=f"sort_by must be one of {', '.join(self.SORT_KEYS)}"
+           )
+       return sort_by, sort_desc, after
+
+   def get_inspections_version(  # (row count, latest write) of the filtered set
+       self,
+       user_id: UUID,
+       date_from: Optional[datetime] = None,
+       date_to: Optional[datetime] = None,
+       inspection_type: Optional[str] = None,
+       tags: Optional[List[str]] = None
+   ) -> tuple:
+       query = self._filtered_query(
+           select(func.count(), func.max(tag_inspections.c.updated_at)),
+           user_id, date_from, date_to, inspection_type, tags
+       )
+       return tuple(self.session.execute(query).one())
+
+   def _filtered_query(
+       self,
+       query,
+       user_id: UUID,
+       date_from: Optional[datetime],
+       date_to: Optional[datetime],
+       inspection_type: Optional[str],
+       tags: Optional[List[str]]
+   ):
+       query = query.select_from(tag_inspections).where(tag_inspections.c.user_id == user_id)
+
+       # `date` is the inspection date the user entered, not the created_at
+       # partition key, so these don't prune partitions: the
+       # (user_id, date, id) index narrows the scan in each of them instead
        if date_from:
-           query = query.where(InspectionTagCreate.date >= date_from)
+           query = query.where(tag_inspections.c.date >= date_from)
        if date_to:
-           query = query.where(InspectionTagCreate.date <= date_to)
+           query = query.where(tag_inspections.c.date <= date_to)
        if inspection_type:
-           query = query.where(InspectionTagCreate.inspection_type == inspection_type)
+           query = query.where(tag_inspections.c.inspection_type == inspection_type)
        if tags:
-           query = query.where(InspectionTagCreate.tags.contains(tags))
-
-       return self.session.exec(
-           query.offset(skip).limit(limit)
-       ).all()
+           query = query.where(self._tag_sql("contains", filter_tags=tags))
+       return query
 
    def update_inspection(
        self,
        inspection_id: UUID,
        user_id: UUID,
        inspection_update: InspectionTagUpdate
-   ) -> InspectionTagUpdate:
-       inspection = self.get_inspection(inspection_id, user_id)
-       if not inspection:
-           raise HTTPException(status_code=404, detail="Inspection not found")
+   ) -> InspectionTagCreate:
+       update_data = inspection_update.model_dump(exclude_unset=True, exclude={"id"})
+       if "tags" in update_data:
+           tags = inspection_update.tags
+           update_data["tags"] = tags.names() if tags else None
 
-       update_data = inspection_update.dict(exclude_unset=True)
-       for key, value in update_data.items():
-           setattr(inspection, key, value)
+       row = self.session.execute(
+           update(tag_inspections)
+           .where(
+               id_filter(tag_inspections, [inspection_id]),
+               tag_inspections.c.user_id == user_id
+           )
+           .values(
+               **update_data,
+               version=tag_inspections.c.version + 1,
+               updated_at=datetime.now()
+           )
+           .returning(*tag_inspections.c)
+       ).mappings().first()
+       if not row:
+           self.session.rollback()
+           raise HTTPException(status_code=404, detail="Inspection not found")
 
-       self.session.add(inspection)
+       inspection = InspectionTagCreate.model_validate(dict(row))
        self.session.commit()
-       self.session.refresh(inspection)
+       inspection_cache.invalidate_lists(user_id)
        return inspection
 
    def delete_inspection(
@@ -226,32 +1010,93 @@ class InspectionTAGCRUD:
        inspection_id: UUID,
        user_id: UUID
    ) -> bool:
-       inspection = self.get_inspection(inspection_id, user_id)
-       if not inspection:
+       deleted = self.session.execute(
+           delete(tag_inspections)
+           .where(
+               id_filter(tag_inspections, [inspection_id]),
+               tag_inspections.c.user_id == user_id
+           )
+           .returning(tag_inspections.c.id)
+       ).first()
+       if not deleted:
            return False
 
-       self.session.delete(inspection)
        self.session.commit()
+       inspection_cache.invalidate_lists(user_id)
        return True
 
+   def batch_tags(  # add/remove tags on many inspections, one transaction
+       self,
+       user_id: UUID,
+       batch: BatchTagRequest
+   ) -> BatchTagResult:
+       if (batch.ids is None) == (batch.filter is None):
+           raise HTTPException(status_code=400, detail="Give exactly one of ids or filter")
+       if not batch.add and not batch.remove:
+           raise HTTPException(status_code=400, detail="Nothing to add or remove")
+
+       if batch.ids is not None:
+           target = select(tag_inspections.c.id).where(
+               tag_inspections.c.user_id == user_id,
+               id_filter(tag_inspections, batch.ids)
+           )
+       else:
+           f = batch.filter
+           target = self._filtered_query(
+               select(tag_inspections.c.id), user_id, f.date_from, f.date_to, f.inspection_type, f.tags
+           )
+       matched = self.session.execute(select(func.count()).select_from(target.subquery())).scalar_one()
+
+       now = datetime.now()
+       tagged = untagged = 0
+       # set-based array updates; rows that already have (or lack) every tag
+       # are left alone so versions and ETags only move on real changes
+       add = list(dict.fromkeys(batch.add))
+       remove = [tag for tag in dict.fromkeys(batch.remove) if tag not in add]
+       if add:
+           tagged = self.session.execute(
+               update(tag_inspections)
+               .where(tag_inspections.c.id.in_(target), self._tag_sql("lacks", add_tags=add))
+               .values(
+                   tags=self._tag_sql("add", add_tags=add),
+                   version=tag_inspections.c.version + 1,
+                   updated_at=now
+               )
+           ).rowcount
+       if remove:
+           untagged = self.session.execute(
+               update(tag_inspections)
+               .where(tag_inspections.c.id.in_(target), self._tag_sql("has", remove_tags=remove))
+               .values(
+                   tags=self._tag_sql("remove", remove_tags=remove),
+                   version=tag_inspections.c.version + 1,
+                   updated_at=now
+               )
+           ).rowcount
+       self.session.commit()
+       if tagged or untagged:
+           inspection_cache.invalidate_lists(user_id)
+       return BatchTagResult(matched=matched, tagged=tagged, untagged=untagged)
+
+   def _tag_sql(self, name: str, **params: List[str]):
+       dialect = self.session.get_bind().dialect.name
+       if dialect not in _TAG_SQL:
+           raise HTTPException(status_code=501, detail=f"Tags are not supported on {dialect}")
+       return text(_TAG_SQL[dialect][name]).bindparams(
+           *(bindparam(key, value, type_=_TAG_PARAM_TYPES[dialect]) for key, value in params.items())
+       )
+
    def add_tag(
        self,
        inspection_id: UUID,
        user_id: UUID,
        tag: str
    ) -> InspectionTagCreate:
-       inspection = self.get_inspection(inspection_id, user_id)
-       if not inspection:
+       # a batch of one, so single and batch edits store tags the same way
+       result = self.batch_tags(user_id, BatchTagRequest(add=[tag], ids=[inspection_id]))
+       if not result.matched:
            raise HTTPException(status_code=404, detail="Inspection not found")
-
-       if not inspection.tags:
-           inspection.tags = []
-       inspection.tags.append(tag)
-
-       self.session.add(inspection)
-       self.session.commit()
-       self.session.refresh(inspection)
-       return inspection
+       return self.get_inspection(inspection_id, user_id)
 
    def remove_tag(
        self,
@@ -259,14 +1104,7 @@ class InspectionTAGCRUD:
        user_id: UUID,
        tag: str
    ) -> InspectionTagCreate:
-       inspection = self.get_inspection(inspection_id, user_id)
-       if not inspection:
+       result = self.batch_tags(user_id, BatchTagRequest(remove=[tag], ids=[inspection_id]))
+       if not result.matched:
            raise HTTPException(status_code=404, detail="Inspection not found")
-
-       if inspection.tags and tag in inspection.tags:
-           inspection.tags.remove(tag)
-
-       self.session.add(inspection)
-       self.session.commit()
-       self.session.refresh(inspection)
-       return inspection
\ No newline at end of file
+       return self.get_inspection(inspection_id, user_id)
@@ -4,7 +4,13 @@ from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core import tracing
+from app.core.compression import CompressionMiddleware, PrecompressedStaticFiles
 from app.core.config import settings
+from app.core.db import read_router
+from app.core.ratelimit import AdmissionControlMiddleware
+from app.core.replicas import ReadYourWritesMiddleware
+from app.core.storage import UploadStaticFiles
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -19,8 +25,36 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
 )
-from fastapi.staticfiles import StaticFiles
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+if settings.STORAGE_BACKEND == "local" and settings.STORAGE_LOCAL_URL.startswith("/"):
+    # served where LocalStorage.url points; mounted ahead of /static, which
+    # it sits under by default
+    app.mount(
+        settings.STORAGE_LOCAL_URL.rstrip("/"),
+        UploadStaticFiles(directory=settings.STORAGE_LOCAL_ROOT, layout=settings.STORAGE_LAYOUT),
+        name="uploads",
+    )
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+
+# innermost, so admission and CORS responses pass through unencoded
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        levels={
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_QUALITY,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        },
+    )
+
+if read_router.sticky_until() is not None:
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=read_router.sticky_seconds)
+
+# added before CORS so preflights and CORS headers stay on the outside
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
 
 
 if settings.all_cors_origins:
@@ -32,4 +66,12 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+# outermost, so the root span covers admission waits, CORS and compression
+if settings.TRACING_ENABLED:
+    for engine in [read_router.primary, *read_router.replicas]:
+        tracing.instrument_engine(engine)
+    tracing.instrument_sessions()
+    tracing.instrument_fastapi()
+    app.add_middleware(tracing.TracingMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import argparse
+import itertools
+import logging
+import os
+import time
+from collections.abc import Iterator, Sequence
+
+from sqlalchemy import bindparam, select, update
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.storage import LAYOUTS, shard_key
+from app.core.tables import inspection_results
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def iter_flat_files(root: str) -> Iterator[str]:
+    """Names of uploads still sitting directly in `root`."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            # .part files are uploads in progress, they are renamed into
+            # their sharded place by the upload itself
+            if entry.is_file() and not entry.name.endswith(".part"):
+                yield entry.name
+
+
+def migrate_batch(
+    root: str, names: Sequence[str], layout: str
+) -> list[tuple[str, str]]:
+    """Move a batch of flat uploads to their sharded keys.
+
+    Each move is a single rename, so a reader sees the file at either the
+    old or the new key at every moment and the static mount's fallback
+    serves both. Returns the (old key, new key) pairs that were moved.
+    """
+    moved = []
+    for name in names:
+        key = shard_key(name, layout)
+        if key == name:
+            continue
+        target = os.path.join(root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            logger.warning("Skipping %s, %s already exists", name, key)
+            continue
+        try:
+            os.rename(os.path.join(root, name), target)
+        except FileNotFoundError:
+            continue  # deleted or moved by a concurrent run
+        moved.append((name, key))
+    return moved
+
+
+def rewrite_urls(
+    session: Session, base_url: str, moved: Sequence[tuple[str, str]]
+) -> int:
+    """Point stored inspection URLs of the moved files at their new keys.
+
+    Optional, old URLs keep working through the fallback either way. One
+    lookup per batch finds the affected rows, which are then updated by
+    primary key and creation time (their partition). Returns the number of
+    rows rewritten.
+    """
+    base_url = base_url.rstrip("/")
+    new_urls = {f"{base_url}/{old}": f"{base_url}/{new}" for old, new in moved}
+    rows = session.execute(
+        select(
+            inspection_results.c.id,
+            inspection_results.c.created_at,
+            inspection_results.c.captured_image_url,
+        ).where(inspection_results.c.captured_image_url.in_(list(new_urls)))
+    ).all()
+    if rows:
+        session.execute(
+            update(inspection_results)
+            .where(
+                inspection_results.c.id == bindparam("result_id"),
+                inspection_results.c.created_at == bindparam("result_created_at"),
+            )
+            .values(captured_image_url=bindparam("new_url")),
+            [
+                {
+                    "result_id": row.id,
+                    "result_created_at": row.created_at,
+                    "new_url": new_urls[row.captured_image_url],
+                }
+                for row in rows
+            ],
+        )
+    session.commit()
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Move flat uploads into the sharded storage layout"
+    )
+    parser.add_argument("--root", default=settings.STORAGE_LOCAL_ROOT)
+    parser.add_argument(
+        "--layout",
+        choices=[layout for layout in LAYOUTS if layout != "flat"],
+        default=settings.STORAGE_LAYOUT
+        if settings.STORAGE_LAYOUT != "flat"
+        else "hash",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    # time between batches, keeps the disk available for live traffic
+    parser.add_argument("--pause", type=float, default=0.1)
+    parser.add_argument(
+        "--rewrite-urls",
+        action="store_true",
+        help="also point stored inspection URLs at the new keys",
+    )
+    args = parser.parse_args()
+
+    total = 0
+    names = iter_flat_files(args.root)
+    while True:
+        batch = list(itertools.islice(names, args.batch_size))
+        if not batch:
+            break
+        moved = migrate_batch(args.root, batch, args.layout)
+        if args.rewrite_urls and moved:
+            with Session(engine) as session:
+                rewritten = rewrite_urls(session, settings.STORAGE_LOCAL_URL, moved)
+            logger.info("Rewrote %d inspection URLs", rewritten)
+        total += len(moved)
+        logger.info("Moved %d files (%d so far)", len(moved), total)
+        time.sleep(args.pause)
+    logger.info("Done, %d files moved to the %s layout", total, args.layout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import uuid
 from typing import List, Optional
-from datetime import datetime
-from pydantic import EmailStr, HttpUrl, BaseModel, Field
+from datetime import datetime, timezone
+from pydantic import EmailStr, BaseModel, Field, field_validator
 from enum import Enum
+from sqlalchemy import DateTime, Index
 from sqlmodel import Field, Relationship, SQLModel
 
 class InspectionOutcome(str, Enum):
@@ -17,6 +18,9 @@ class UserBase(BaseModel):
    is_superuser: bool = False
    full_name: Optional[str] = None
 
+class UserCreate(UserBase):
+   password: str
+
 class User(UserBase):
    id: uuid.UUID
    hashed_password: str
@@ -27,7 +31,7 @@ class InspectionStation(BaseModel):
    id: uuid.UUID
    name: str
    description: str
-   product_image_url: HttpUrl
+   product_image_url: str
    criteria: List[str]
    owner_id: uuid.UUID
    created_at: datetime
@@ -44,7 +48,7 @@ class InspectionStationCreate(BaseModel):
    name: str
    id: uuid.UUID
    description: str
-   product_image_url: HttpUrl
+   product_image_url: str
 
 
 class Token(BaseModel):
@@ -65,28 +69,72 @@ class Message(SQLModel):
 class InspectionResult(BaseModel):
    id: uuid.UUID
    station_id: uuid.UUID
-   captured_image_url: HttpUrl
+   # copied from the station so owner-scoped queries need no join
+   owner_id: Optional[uuid.UUID] = None
+   # relative /static URL for local storage, absolute for object storage
+   captured_image_url: str
    inspection_outcome: InspectionOutcome
    
    notes: Optional[str] = None
+   phash: Optional[str] = None
+   features: Optional[dict[str, float]] = None
+   tags: Optional[List[str]] = None
    created_at: datetime
+   # bumped on every write, drives the ETags of the read endpoints
+   version: int = 1
+   updated_at: Optional[datetime] = None
    
    # for 1st problem statement
 class InspectionResultCreate(BaseModel):
-   captured_image_url: HttpUrl
+   captured_image_url: str
    notes: Optional[str] = None
+   phash: Optional[str] = None
    
    # for 1st problem statement
 class InspectionResultUpdate(BaseModel):
    inspection_outcome: Optional[InspectionOutcome] = None
   
    notes: Optional[str] = None
+   # what "tag ..." station criteria are checked against
+   tags: Optional[List[str]] = None
    #for the 2nd problem
 class ImageUploadResponse(BaseModel):
     file_id: uuid.UUID
     file_name: str
-    file_url: HttpUrl
+    # relative /static URL for local storage, absolute for object storage
+    file_url: str
     uploaded_at: datetime
+    phash: Optional[str] = None
+
+class ImageUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+
+class PresignedImageUpload(BaseModel):
+    file_id: uuid.UUID
+    key: str
+    upload_url: str
+    # form fields to send, in order, before the `file` part
+    fields: dict[str, str] = {}
+    expires_at: datetime
+    max_size: int
+    file_url: str
+
+class ImageUploadComplete(BaseModel):
+    key: str
+
+   # for 1st problem statement
+class GradingSummary(BaseModel):
+   graded: int
+   passed: int
+   failed: int
+   skipped: int
+
+   # for 1st problem statement
+class DuplicateCapture(BaseModel):
+   inspection_id: uuid.UUID
+   captured_image_url: str
+   distance: int
 
    #for the 2nd problem
 class TagItem(BaseModel):
@@ -95,14 +143,33 @@ class TagItem(BaseModel):
 class Tag(BaseModel):
     tags: List[TagItem]
 
+    # the tables store only the list of names
+    @classmethod
+    def from_names(cls, names: List[str]) -> "Tag":
+        return cls(tags=[TagItem(name=name) for name in names])
+
+    def names(self) -> List[str]:
+        return [tag.name for tag in self.tags]
+
+def _tags_from_names(value):
+   # rows hold a plain list of tag names, the API nests them in Tag
+   if isinstance(value, list):
+       return Tag.from_names(value)
+   return value
+
 #for 2nd problem statement 
 class InspectionTagBase(BaseModel):
    date: datetime
    inspection_type: str
    details: str 
    tags: Tag | None=None
+
+   _tag_names = field_validator("tags", mode="before")(_tags_from_names)
 class InspectionTagCreate(InspectionTagBase):
     id: uuid.UUID
+    version: int = 1
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
    #for the 2nd problem
 class InspectionTagUpdate(BaseModel):
    date: Optional[datetime] = None
@@ -110,6 +177,34 @@ class InspectionTagUpdate(BaseModel):
    details: Optional[str] = None
    tags: Tag | None=None
    id: uuid.UUID
+
+   _tag_names = field_validator("tags", mode="before")(_tags_from_names)
+   #for the 2nd problem
+class InspectionTagFilter(BaseModel):
+   date_from: Optional[datetime] = None
+   date_to: Optional[datetime] = None
+   inspection_type: Optional[str] = None
+   tags: Optional[List[str]] = None
+
+class BatchTagRequest(BaseModel):
+   add: List[str] = []
+   remove: List[str] = []
+   # exactly one of ids or filter selects the inspections
+   ids: Optional[List[uuid.UUID]] = Field(default=None, max_length=10000)
+   filter: Optional[InspectionTagFilter] = None
+
+class BatchTagResult(BaseModel):
+   matched: int
+   tagged: int
+   untagged: int
+   #for the 2nd problem
+class InspectionTagPage(BaseModel):
+   data: List[InspectionTagCreate]
+   # rows in the whole filtered set
+   total: int
+   per_page: int
+   # pass back as `cursor` for the next page, None on the last page
+   next_cursor: Optional[str] = None
    #for the 2nd problem
 class PaginatedResponse(BaseModel):
    data: List[InspectionTagCreate]
@@ -118,6 +213,16 @@ class PaginatedResponse(BaseModel):
    page_size: int
 
 
+# one requested id of a multi-get; result is None when not found
+class InspectionResultLookup(BaseModel):
+   id: uuid.UUID
+   found: bool
+   result: Optional[InspectionResult] = None
+
+class InspectionResultBatch(BaseModel):
+   # in request order, one entry per requested id
+   data: List[InspectionResultLookup]
+
 # for 1st problem statement
 class PaginatedResponse(BaseModel):
    data: List[InspectionResult]
@@ -127,4 +232,55 @@ class PaginatedResponse(BaseModel):
 
 class Token(BaseModel):
    access_token: str
-   token_type: str = "bearer"
\ No newline at end of file
+   token_type: str = "bearer"
+
+   # background work on inspection results, for the 1st problem
+class JobStatus(str, Enum):
+   QUEUED = "queued"
+   RUNNING = "running"
+   DONE = "done"
+   FAILED = "failed"
+
+class InspectionJob(SQLModel, table=True):
+   __table_args__ = (Index("ix_inspectionjob_status_run_at", "status", "run_at"),)
+
+   id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+   inspection_id: uuid.UUID = Field(index=True)
+   kind: str = Field(max_length=32)
+   status: JobStatus = Field(default=JobStatus.QUEUED)
+   attempts: int = 0
+   max_attempts: int = 5
+   # a job is claimable once run_at has passed; a RUNNING job whose
+   # locked_until has passed belongs to a dead worker and is claimable again
+   run_at: datetime = Field(
+       default_factory=lambda: datetime.now(timezone.utc),
+       sa_type=DateTime(timezone=True),
+       index=True
+   )
+   locked_until: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
+   last_error: Optional[str] = None
+   created_at: datetime = Field(
+       default_factory=lambda: datetime.now(timezone.utc),
+       sa_type=DateTime(timezone=True)
+   )
+
+class QueueMetrics(BaseModel):
+   queued: int
+   running: int
+   failed: int
+   ready: int
+   oldest_ready_age_seconds: float
+
+   # pushed to live feed subscribers, for the 1st problem
+class InspectionEventType(str, Enum):
+   CREATED = "created"
+   UPDATED = "updated"
+   DELETED = "deleted"
+
+class InspectionEvent(BaseModel):
+   type: InspectionEventType
+   inspection_id: uuid.UUID
+   station_id: uuid.UUID
+   owner_id: uuid.UUID
+   inspection_outcome: Optional[InspectionOutcome] = None
+   occurred_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,41 @@
+import argparse
+import logging
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.partitions import archive_partitions, ensure_partitions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Create upcoming and archive old inspection partitions"
+    )
+    parser.add_argument(
+        "--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD
+    )
+    parser.add_argument(
+        "--archive-after",
+        type=int,
+        default=settings.PARTITION_ARCHIVE_AFTER_MONTHS,
+        help="archive partitions older than this many months, 0 to skip",
+    )
+    parser.add_argument("--schema", default=settings.PARTITION_ARCHIVE_SCHEMA)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    for name in ensure_partitions(engine, now, args.months_ahead):
+        logger.info("Created partition %s", name)
+    if args.archive_after:
+        with engine.begin() as connection:
+            for name in archive_partitions(
+                connection, now, args.archive_after, args.schema
+            ):
+                logger.info("Archived partition %s to %s", name, args.schema)
+
+
+if __name__ == "__main__":
+    main()
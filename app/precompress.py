@@ -0,0 +1,36 @@
+import argparse
+import logging
+
+from app.core.compression import available_encodings, precompress
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Write .gz/.br/.zst siblings of static assets and exports"
+    )
+    parser.add_argument("directories", nargs="*", default=["static"])
+    parser.add_argument(
+        "--encoding",
+        action="append",
+        choices=available_encodings(),
+        help="repeat for several; defaults to every available encoding",
+    )
+    parser.add_argument("--min-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    original = packed = 0
+    for directory in args.directories:
+        for path, encoding, size, compressed in precompress(
+            directory, args.encoding, args.min_size
+        ):
+            logger.info("%s (%s): %d -> %d bytes", path, encoding, size, compressed)
+            original += size
+            packed += compressed
+    logger.info("Wrote %d bytes of siblings for %d bytes of source", packed, original)
+
+
+if __name__ == "__main__":
+    main()
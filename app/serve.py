@@ -0,0 +1,134 @@
+import argparse
+import logging
+from typing import Any
+
+from gunicorn.app.base import BaseApplication
+
+try:
+    from uvicorn_worker import UvicornWorker
+except ImportError:  # uvicorn < 0.30 ships the worker itself
+    from uvicorn.workers import UvicornWorker
+
+from app.core.config import settings
+from app.core.server import (
+    available_cpus,
+    event_loop,
+    http_protocol,
+    mark,
+    startup_timings,
+    tune,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Worker(UvicornWorker):
+    # uvloop and httptools when installed, the pure-Python fallbacks otherwise
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "proxy_headers": True,
+    }
+
+
+def post_fork(_server: Any, _worker: Any) -> None:
+    # the preloaded app opened pooled connections in the master; a child
+    # must not reuse the parent's sockets, only drop them from its own pool
+    from app.core.db import engine, read_router
+
+    for pooled in (engine, *read_router.replicas):
+        pooled.dispose(close=False)
+    mark("worker_forked")
+
+
+def post_worker_init(worker: Any) -> None:
+    mark("worker_ready")
+    logger.info("Worker %s startup timings: %s", worker.pid, startup_timings)
+
+
+class Server(BaseApplication):  # type: ignore[misc]
+    def __init__(self, options: dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        from app.main import app
+
+        mark("app_loaded")
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API under gunicorn")
+    parser.add_argument("--bind", default=settings.SERVER_BIND)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument(
+        "--pool-budget",
+        type=int,
+        default=settings.DB_POOL_BUDGET,
+        help="database connections shared by all workers",
+    )
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        help="import the app in every worker instead of once in the master",
+    )
+    args = parser.parse_args()
+
+    try:
+        tuning = tune(available_cpus(), args.pool_budget, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    if tuning.workers > 1 and settings.CACHE_BACKEND == "memory":
+        # each worker would keep serving entries another one has written over
+        parser.error(
+            f'CACHE_BACKEND="memory" is per process, it can\'t be used with '
+            f'{tuning.workers} workers; use "redis" or "none", or --workers 1'
+        )
+    # read by app.core.db when the app is imported, in the master with
+    # preloading or in each worker without
+    settings.DB_POOL_SIZE = tuning.pool_size
+    settings.DB_MAX_OVERFLOW = tuning.max_overflow
+    logger.info(
+        "Starting %d workers (%s, %s), %d+%d pooled connections each, %d total",
+        tuning.workers,
+        Worker.CONFIG_KWARGS["loop"],
+        Worker.CONFIG_KWARGS["http"],
+        tuning.pool_size,
+        tuning.max_overflow,
+        tuning.connections,
+    )
+
+    if tuning.workers > 1 and not settings.EVENT_BROKER_URL:
+        logger.warning(
+            "EVENT_BROKER_URL is not set: the inspection feed of each worker "
+            "only carries writes handled by that worker"
+        )
+
+    server = Server(
+        {
+            "bind": args.bind,
+            "workers": tuning.workers,
+            "worker_class": Worker,
+            "preload_app": not args.no_preload,
+            "timeout": settings.SERVER_TIMEOUT,
+            "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+            "keepalive": settings.SERVER_KEEPALIVE,
+            "max_requests": settings.SERVER_MAX_REQUESTS,
+            "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+            "post_fork": post_fork,
+            "post_worker_init": post_worker_init,
+        }
+    )
+    mark("configured")
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import sqlalchemy as sa
+
+from app.core import synthetic
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _months_between(start: datetime, end: datetime) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def _load(connection: sa.Connection, table: sa.Table, batches, label: str) -> int:
+    started = time.perf_counter()
+    total = 0
+    for batch in batches:
+        total += synthetic.bulk_insert(connection, table, batch)
+        connection.commit()
+        elapsed = time.perf_counter() - started
+        logger.info("%s: %d rows, %.0f rows/s", label, total, total / elapsed)
+    return total
+
+
+def _images(rng: np.random.Generator, count: int) -> list[str]:
+    from app.core.storage import shard_key, storage
+
+    urls = []
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "image.png")
+        for i in range(count):
+            with open(path, "wb") as f:
+                f.write(synthetic.synthetic_image(rng))
+            key = shard_key(f"synthetic-{i:06d}.png", settings.STORAGE_LAYOUT)
+            storage.put_file(key, path, "image/png")
+            urls.append(storage.url(key))
+    logger.info("Stored %d synthetic images", count)
+    return urls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk-load synthetic users, stations and inspections"
+    )
+    parser.add_argument(
+        "--database-url",
+        help="defaults to the configured database, e.g. sqlite:///synthetic.db",
+    )
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--stations-per-user", type=float, default=5.0)
+    parser.add_argument("--results", type=int, default=1_000_000)
+    parser.add_argument("--tag-inspections", type=int, default=100_000)
+    parser.add_argument("--tag-vocabulary", type=int, default=200)
+    parser.add_argument("--tag-zipf", type=float, default=1.1)
+    parser.add_argument("--days", type=int, default=180, help="history to spread over")
+    parser.add_argument(
+        "--images", type=int, default=0, help="synthetic images to put in storage"
+    )
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="create missing tables (for a scratch database without migrations)",
+    )
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = sa.create_engine(args.database_url)
+    else:
+        from app.core.db import engine
+
+    rng = np.random.default_rng(args.seed)
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=args.days)
+
+    if args.create_schema:
+        synthetic.SCHEMA.create_all(engine)
+    tables = sa.MetaData()
+    tables.reflect(engine, only=list(synthetic.SCHEMA.tables))
+
+    image_urls = _images(rng, args.images) if args.images else []
+
+    from app.core.security import get_password_hash
+
+    with engine.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # a throwaway load: skip the journal fsyncs
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+            connection.exec_driver_sql("PRAGMA journal_mode = MEMORY")
+        elif connection.dialect.name == "postgresql":
+            from app.core.partitions import ensure_partitions
+
+            # history reaches into months the worker never created
+            months = _months_between(start, end) + settings.PARTITION_MONTHS_AHEAD
+            for name in ensure_partitions(engine, start, months):
+                logger.info("Created partition %s", name)
+
+        user_rows = synthetic.users(rng, args.users, get_password_hash("synthetic"))
+        _load(connection, tables.tables["user"], [user_rows], "users")
+        owners = [row["id"] for row in user_rows]
+
+        station_rows, fail_rates = synthetic.stations(
+            rng, owners, args.stations_per_user, start, image_urls
+        )
+        _load(
+            connection, tables.tables["inspectionstation"], [station_rows], "stations"
+        )
+
+        _load(
+            connection,
+            tables.tables["inspectionresult"],
+            synthetic.results(
+                rng,
+                station_rows,
+                fail_rates,
+                args.results,
+                start,
+                end,
+                image_urls,
+                args.batch_size,
+            ),
+            "results",
+        )
+        _load(
+            connection,
+            tables.tables["inspectiontagcreate"],
+            synthetic.tag_inspections(
+                rng,
+                owners,
+                args.tag_inspections,
+                start,
+                end,
+                args.tag_vocabulary,
+                args.tag_zipf,
+                args.batch_size,
+            ),
+            "tag inspections",
+        )
+
+
+if __name__ == "__main__":
+    main()
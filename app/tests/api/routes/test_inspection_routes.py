@@ -0,0 +1,125 @@
+import io
+import uuid
+from collections.abc import Iterator
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel
+
+from app.api import deps
+from app.api.routes import items
+from app.core.config import settings
+from app.core.storage import LocalStorage
+from app.core.tables import inspection_stations, metadata
+from app.main import app
+from app.models import InspectionJob, User
+
+API = settings.API_V1_STR
+USER = User(
+    id=uuid.uuid4(),
+    email="inspector@example.com",
+    is_active=True,
+    is_superuser=False,
+    hashed_password="x",
+)
+
+
+@pytest.fixture
+def engine() -> sa.Engine:
+    engine = sa.create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    metadata.create_all(engine)
+    SQLModel.metadata.create_all(engine, tables=[InspectionJob.__table__])
+    return engine
+
+
+@pytest.fixture
+def client(engine, tmp_path, monkeypatch) -> Iterator[TestClient]:
+    def session() -> Iterator[Session]:
+        with Session(engine) as session:
+            yield session
+
+    # the default local backend, whose URLs are relative /static paths
+    storage = LocalStorage(
+        str(tmp_path), settings.STORAGE_LOCAL_URL, settings.SECRET_KEY, "/upload"
+    )
+    monkeypatch.setattr(items.image_service, "storage", storage)
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides.update(
+        {
+            deps.get_db: session,
+            deps.get_read_db: session,
+            deps.get_current_user: lambda: USER,
+        }
+    )
+    yield TestClient(app)
+    app.dependency_overrides = overrides
+
+
+def _station(engine: sa.Engine, **values) -> uuid.UUID:
+    station_id = uuid.uuid4()
+    row = {
+        "id": station_id,
+        "name": "line 1",
+        "description": "paint shop",
+        "product_image_url": f"{settings.STORAGE_LOCAL_URL}/golden.png",
+        "criteria": [],
+        "owner_id": USER.id,
+        "created_at": datetime(2026, 3, 1, 8, 0),
+        **values,
+    }
+    with engine.begin() as connection:
+        connection.execute(inspection_stations.insert(), [row])
+    return station_id
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_upload_then_create_with_a_relative_storage_url(client, engine) -> None:
+    station_id = _station(engine)
+
+    response = client.post(
+        f"{API}/inspections/",
+        params={"station_id": str(station_id), "name": "n", "description": "d"},
+        files={"file": ("capture.png", _png(), "image/png")},
+    )
+
+    assert response.status_code == 201, response.text
+    created = response.json()
+    assert created["captured_image_url"].startswith(settings.STORAGE_LOCAL_URL + "/")
+    key = created["captured_image_url"][len(settings.STORAGE_LOCAL_URL) + 1 :]
+    assert items.image_service.storage.exists(key)
+
+    fetched = client.get(f"{API}/inspections/{created['id']}")
+    assert fetched.status_code == 200
+    assert fetched.json()["captured_image_url"] == created["captured_image_url"]
+
+
+def test_list_stations_whole_and_narrowed(client, engine) -> None:
+    paint = _station(engine)
+    weld = _station(engine, name="Weld 2", description="frame seams")
+
+    response = client.get(f"{API}/inspections", params={"name": "line"})
+    assert response.status_code == 200, response.text
+    [station] = response.json()
+    assert station["id"] == str(paint)
+    assert station["product_image_url"] == f"{settings.STORAGE_LOCAL_URL}/golden.png"
+    assert station["criteria"] == []
+
+    response = client.get(f"{API}/inspections", params={"fields": "id,name"})
+    assert response.status_code == 200, response.text
+    assert sorted(response.json(), key=lambda s: s["name"]) == [
+        {"id": str(weld), "name": "Weld 2"},
+        {"id": str(paint), "name": "line 1"},
+    ]
@@ -0,0 +1,105 @@
+from datetime import datetime
+from uuid import uuid4
+
+from app.core.cache import InspectionCache, MemoryCache, RedisCache, filter_key
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ex: int | None = None) -> None:  # noqa: ARG002
+        self.data[key] = value
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+def test_memory_cache_is_bounded() -> None:
+    cache = MemoryCache(max_entries=2, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+
+    cache.set("d", b"12345678")
+    assert len(cache) == 1
+    cache.set("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+def test_get_many_keeps_key_order() -> None:
+    for backend in (MemoryCache(100, 1024), RedisCache(FakeRedis())):
+        backend.set("a", b"1")
+        backend.set("c", b"3")
+
+        assert backend.get_many(["c", "b", "a", "c"]) == [b"3", None, b"1", b"3"]
+        assert backend.get_many([]) == []
+
+
+def test_filter_key_is_normalised() -> None:
+    when = datetime(2024, 1, 1)
+    assert filter_key(tags=["b", "a"], date_from=when, inspection_type=None) == (
+        filter_key(date_from=when, tags=["a", "b"])
+    )
+    assert filter_key(tags=["a"]) != filter_key(tags=["a", "b"])
+    assert filter_key(tags=[]) == filter_key()
+
+
+def test_writes_invalidate_only_the_owner() -> None:
+    for backend in (MemoryCache(100, 1024), RedisCache(FakeRedis())):
+        cache = InspectionCache(backend)
+        owner, other, result_id = uuid4(), uuid4(), uuid4()
+
+        own_list = cache.list_key("results", owner, page=1)
+        other_list = cache.list_key("results", other, page=1)
+        backend.set(cache.result_key(owner, result_id), b"{}")
+
+        cache.invalidate_results(owner, [result_id])
+
+        assert backend.get(cache.result_key(owner, result_id)) is None
+        assert cache.list_key("results", owner, page=1) != own_list
+        assert cache.list_key("results", other, page=1) == other_list
+
+
+def test_rows_are_only_cached_in_a_shared_backend() -> None:
+    owner, result_id = uuid4(), uuid4()
+    local = InspectionCache(MemoryCache(100, 1024))
+    local.set_result(owner, result_id, b"{}", 0)
+    assert len(local.backend) == 0
+    assert local.get_results(owner, [result_id]) == (0, [None])
+
+    shared = InspectionCache(RedisCache(FakeRedis()))
+    shared.set_result(owner, result_id, b"{}", 0)
+    assert shared.get_results(owner, [uuid4(), result_id]) == (0, [None, b"{}"])
+
+
+def test_a_row_loaded_before_a_write_is_not_served_after_it() -> None:
+    cache = InspectionCache(RedisCache(FakeRedis()))
+    owner, result_id = uuid4(), uuid4()
+
+    # the reader misses and loads the row; meanwhile a writer commits and
+    # invalidates; the reader's store lands after that
+    generation, [cached] = cache.get_results(owner, [result_id])
+    assert cached is None
+    cache.invalidate_results(owner, [result_id])
+    cache.set_result(owner, result_id, b'{"version": 1}', generation)
+
+    generation, [cached] = cache.get_results(owner, [result_id])
+    assert cached is None
+    cache.set_result(owner, result_id, b'{"version": 2}', generation)
+    assert cache.get_results(owner, [result_id]) == (generation, [b'{"version": 2}'])
@@ -0,0 +1,149 @@
+import asyncio
+import gzip
+import zlib
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from app.core.compression import (
+    CompressionMiddleware,
+    PrecompressedStaticFiles,
+    negotiate,
+    precompress,
+)
+
+PAGE = {"data": [{"id": i, "notes": "rechecked"} for i in range(200)]}
+
+
+def _client() -> TestClient:
+    async def page(_request):
+        return JSONResponse(PAGE)
+
+    async def small(_request):
+        return PlainTextResponse("ok")
+
+    async def stream(_request):
+        async def chunks():
+            for i in range(50):
+                yield f"row {i}\n".encode() * 20
+
+        return StreamingResponse(chunks(), media_type="text/csv")
+
+    async def events(_request):
+        return StreamingResponse(
+            iter([b"data: x\n\n" * 200]), media_type="text/event-stream"
+        )
+
+    app = Starlette(
+        routes=[
+            Route("/page", page),
+            Route("/small", small),
+            Route("/stream", stream),
+            Route("/events", events),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+
+def test_negotiate() -> None:
+    available = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, br", available) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert negotiate("br;q=0, *", available) == "zstd"
+    assert negotiate("identity", available) is None
+    assert negotiate("x-gzip", ["gzip"]) == "gzip"
+    assert negotiate(None, available) is None
+
+
+def test_compresses_large_json() -> None:
+    response = _client().get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == PAGE
+
+
+def test_small_and_unaccepted_bodies_pass_through() -> None:
+    client = _client()
+
+    assert (
+        "content-encoding"
+        not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    )
+    assert (
+        "content-encoding"
+        not in client.get("/page", headers={"Accept-Encoding": "identity"}).headers
+    )
+    assert (
+        "content-encoding"
+        not in client.get("/events", headers={"Accept-Encoding": "gzip"}).headers
+    )
+
+
+def test_streams_compressed_chunks() -> None:
+    response = _client().get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"row {i}\n" * 20 for i in range(50))
+
+
+def test_each_streamed_chunk_decodes_on_arrival() -> None:
+    lines = [f"row {i}\n".encode() for i in range(5)]
+
+    async def app(_scope, _receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/csv")],
+            }
+        )
+        for line in lines:
+            await send({"type": "http.response.body", "body": line, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    asyncio.run(CompressionMiddleware(app, minimum_size=0)(scope, None, send))
+
+    decoder = zlib.decompressobj(31)
+    chunks = [m["body"] for m in sent if m["type"] == "http.response.body"]
+    assert [decoder.decompress(chunk) for chunk in chunks] == [*lines, b""]
+    assert decoder.eof
+
+
+def test_precompressed_static_files(tmp_path: Path) -> None:
+    (tmp_path / "app.js").write_text("console.log('inspection');\n" * 200)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 1000)
+
+    written = list(precompress(str(tmp_path), ["gzip"]))
+
+    assert [(Path(p).name, e) for p, e, _, _ in written] == [("app.js", "gzip")]
+    assert list(precompress(str(tmp_path), ["gzip"])) == []
+
+    app = Starlette(
+        routes=[Mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)))]
+    )
+    client = TestClient(app)
+    response = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "javascript" in response.headers["content-type"]
+    assert response.text.startswith("console.log")
+
+    raw = client.get("/static/app.js", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in raw
+    assert gzip.decompress((tmp_path / "app.js.gz").read_bytes()).startswith(b"console")
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.core.criteria import CriteriaError, compile_criteria, feature_columns
+
+
+def test_compile_is_cached_per_criteria_list() -> None:
+    criteria = ["mean_diff < 0.05", "tag approved"]
+    assert compile_criteria(criteria) is compile_criteria(list(criteria))
+    assert compile_criteria(criteria) is not compile_criteria(["mean_diff < 0.1"])
+
+
+def test_evaluate_thresholds_ranges_and_tags() -> None:
+    criteria = compile_criteria(
+        [
+            "mean_diff <= 0.05",
+            "0.9 <= ncc < 1.01",
+            "shift between 0 and 4",
+            "has tag approved",
+            "no tag rework",
+        ]
+    )
+    rows = [
+        {"mean_diff": 0.01, "ncc": 0.95, "shift": 2},
+        {"mean_diff": 0.10, "ncc": 0.95, "shift": 2},
+        {"mean_diff": 0.01, "ncc": 0.50, "shift": 2},
+        {"mean_diff": 0.01, "ncc": 0.95, "shift": 9},
+        {"mean_diff": 0.01, "ncc": 0.95, "shift": 2},
+        {"mean_diff": 0.01, "ncc": 0.95},
+        None,
+    ]
+    tags = [
+        ["approved"],
+        ["approved"],
+        ["approved"],
+        ["approved"],
+        ["approved", "rework"],
+        ["approved"],
+        ["approved"],
+    ]
+
+    mask = criteria.evaluate(feature_columns(rows, criteria.features), tags)
+
+    assert mask.tolist() == [True, False, False, False, False, False, False]
+
+
+def test_empty_criteria_pass_everything() -> None:
+    mask = compile_criteria([]).evaluate({}, size=3)
+    assert mask.tolist() == [True, True, True]
+    assert isinstance(mask, np.ndarray)
+
+
+@pytest.mark.parametrize("criterion", ["mean_diff <", "ncc ~ 3", "between 1 and 2"])
+def test_invalid_criterion(criterion: str) -> None:
+    with pytest.raises(CriteriaError):
+        compile_criteria([criterion])
@@ -0,0 +1,19 @@
+from app.core.etag import etag_matches, weak_etag
+
+
+def test_weak_etag_changes_with_version() -> None:
+    assert weak_etag("a", 1) == weak_etag("a", 1)
+    assert weak_etag("a", 1) != weak_etag("a", 2)
+    assert weak_etag("a", 1).startswith('W/"')
+
+
+def test_if_none_match_uses_weak_comparison() -> None:
+    etag = weak_etag("a", 1)
+    strong = etag.removeprefix("W/")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(strong, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(weak_etag("a", 2), etag)
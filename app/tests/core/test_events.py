@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.core.events import EventBroker, InMemoryBroker, RedisBroker, inspection_filter
+from app.models import InspectionEvent, InspectionEventType, InspectionOutcome
+
+
+def _event(owner_id, station_id, outcome=InspectionOutcome.PENDING) -> InspectionEvent:
+    return InspectionEvent(
+        type=InspectionEventType.CREATED,
+        inspection_id=uuid4(),
+        station_id=station_id,
+        owner_id=owner_id,
+        inspection_outcome=outcome,
+    )
+
+
+def test_events_are_filtered_and_delivered_across_threads() -> None:
+    owner, station = uuid4(), uuid4()
+
+    async def scenario() -> list[InspectionEvent]:
+        broker = InMemoryBroker()
+        subscription = await broker.subscribe(
+            inspection_filter(owner, station, InspectionOutcome.FAIL)
+        )
+        wanted = _event(owner, station, InspectionOutcome.FAIL)
+        publisher = threading.Thread(
+            target=lambda: [
+                broker.publish(_event(uuid4(), station, InspectionOutcome.FAIL)),
+                broker.publish(_event(owner, uuid4(), InspectionOutcome.FAIL)),
+                broker.publish(_event(owner, station, InspectionOutcome.PASS)),
+                broker.publish(wanted),
+            ]
+        )
+        publisher.start()
+        publisher.join()
+        received = [await subscription.get(1.0), await subscription.get(0.05)]
+        broker.unsubscribe(subscription)
+        assert received[0] == wanted
+        return received
+
+    assert asyncio.run(scenario())[1] is None
+
+
+def test_slow_consumer_drops_oldest_events() -> None:
+    owner, station = uuid4(), uuid4()
+
+    async def scenario() -> None:
+        broker = InMemoryBroker()
+        subscription = await broker.subscribe(inspection_filter(owner), maxsize=2)
+        events = [_event(owner, station) for _ in range(5)]
+        for event in events:
+            broker.publish(event)
+        await asyncio.sleep(0)
+
+        assert subscription.dropped == 3
+        assert [await subscription.get(0.1), await subscription.get(0.1)] == events[3:]
+
+    asyncio.run(scenario())
+
+
+class _FlakyRedisBroker(RedisBroker):
+    """RedisBroker with the connection replaced: the first one drops."""
+
+    reconnect_delay = 0.01
+
+    def __init__(self, events: list[InspectionEvent]):
+        EventBroker.__init__(self)
+        self.events = events
+        self.connections = 0
+        self.published: list[tuple[str, str]] = []
+        self._client = SimpleNamespace(
+            publish=lambda channel, payload: self.published.append(
+                (threading.current_thread().name, payload)
+            )
+        )
+        self._publisher = ThreadPoolExecutor(max_workers=1)
+        self._listener = None
+
+    async def _receive(self):
+        self.connections += 1
+        if self.connections == 1:
+            raise ConnectionError("connection reset")
+        for event in self.events:
+            yield event
+        await asyncio.Event().wait()
+
+
+def test_redis_listener_reconnects_and_publishing_leaves_the_caller() -> None:
+    owner, station = uuid4(), uuid4()
+    events = [_event(owner, station), _event(owner, station)]
+
+    async def scenario() -> None:
+        broker = _FlakyRedisBroker(events)
+        subscription = await broker.subscribe(inspection_filter(owner))
+        assert [await subscription.get(1.0), await subscription.get(1.0)] == events
+        assert broker.connections == 2
+        broker._listener.cancel()
+
+        broker.publish(events[0])
+        broker._publisher.shutdown(wait=True)
+        ((thread, payload),) = broker.published
+        assert thread != threading.current_thread().name
+        assert payload == events[0].model_dump_json()
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.core.fieldsets import (
+    FieldsetError,
+    dump_json,
+    list_serializer,
+    page_serializer,
+    parse_fields,
+)
+from app.models import InspectionResult, PaginatedResponse
+
+
+def test_parse_fields_orders_and_requires_id() -> None:
+    assert parse_fields(None, InspectionResult) is None
+    assert parse_fields("created_at, inspection_outcome", InspectionResult) == (
+        "id",
+        "inspection_outcome",
+        "created_at",
+    )
+
+
+def test_parse_fields_rejects_unknown_names() -> None:
+    with pytest.raises(FieldsetError, match="nope"):
+        parse_fields("id,nope", InspectionResult)
+
+
+def test_serializers_are_cached_per_field_set() -> None:
+    fields = parse_fields("inspection_outcome", InspectionResult)
+
+    assert list_serializer(InspectionResult, fields) is list_serializer(
+        InspectionResult, fields
+    )
+
+
+def test_page_serializer_narrows_items() -> None:
+    fields = parse_fields("inspection_outcome,created_at", InspectionResult)
+    row = {
+        "id": uuid.uuid4(),
+        "inspection_outcome": "pass",
+        "created_at": datetime(2026, 1, 2, 3, 4, 5),
+        # projected for a cursor but not asked for
+        "notes": "long text",
+    }
+
+    body = json.loads(
+        dump_json(
+            page_serializer(PaginatedResponse, InspectionResult, fields),
+            {"data": [row], "total": 1, "page": 1, "page_size": 10},
+        )
+    )
+
+    assert body == {
+        "data": [
+            {
+                "id": str(row["id"]),
+                "inspection_outcome": "pass",
+                "created_at": "2026-01-02T03:04:05",
+            }
+        ],
+        "total": 1,
+        "page": 1,
+        "page_size": 10,
+    }
@@ -0,0 +1,83 @@
+import io
+
+import httpx
+import numpy as np
+import pytest
+
+from app.core import grading
+from app.core.grading import (
+    GradingThresholds,
+    ImageSourceError,
+    compare_batch,
+    passes,
+    resolve_image_source,
+)
+from app.core.storage import LocalStorage
+
+THRESHOLDS = GradingThresholds(
+    pixel_threshold=0.15, max_mean_diff=0.08, max_defect_ratio=0.02, max_shift=16
+)
+
+
+def _reference() -> np.ndarray:
+    y, x = np.mgrid[0:64, 0:64]
+    return (0.5 + 0.3 * np.sin(x / 5.0) * np.cos(y / 7.0)).astype(np.float32)
+
+
+def test_compare_batch_aligns_shifted_captures() -> None:
+    reference = _reference()
+    shifted = np.roll(reference, shift=(3, -5), axis=(0, 1))
+    defective = reference.copy()
+    defective[10:22, 10:22] = 1.0
+
+    features = compare_batch(
+        reference, np.stack([reference, shifted, defective]), THRESHOLDS.pixel_threshold
+    )
+
+    assert features["shift"].tolist() == [0, 5, 0]
+    assert (features["mean_diff"][:2] < 1e-5).all()
+    assert features["ncc"][1] > 0.99
+    assert passes(features, THRESHOLDS).tolist() == [True, True, False]
+
+
+def test_large_misalignment_fails() -> None:
+    reference = _reference()
+    shifted = np.roll(reference, shift=20, axis=1)
+
+    features = compare_batch(reference, shifted[None], THRESHOLDS.pixel_threshold)
+
+    assert not passes(features, THRESHOLDS)[0]
+
+
+def test_image_sources_are_limited_to_storage_static_and_allowed_hosts(
+    tmp_path, monkeypatch
+) -> None:
+    storage = LocalStorage(str(tmp_path), "/static/uploads", "secret", "/upload")
+    (tmp_path / "a.png").write_bytes(b"png")
+    monkeypatch.setattr(grading, "storage", storage)
+    monkeypatch.setattr(grading.settings, "GRADING_ALLOWED_HOSTS", ["images.example"])
+    fetched = []
+
+    def get(url, **kwargs):
+        fetched.append((str(url), kwargs["follow_redirects"]))
+        return httpx.Response(200, content=b"png", request=httpx.Request("GET", url))
+
+    monkeypatch.setattr(grading.httpx, "get", get)
+
+    assert resolve_image_source("/static/uploads/a.png") == str(tmp_path / "a.png")
+    assert resolve_image_source("/static/reference.png") == "static/reference.png"
+    source = resolve_image_source("https://images.example/golden.png")
+    assert isinstance(source, io.BytesIO)
+    assert fetched == [("https://images.example/golden.png", False)]
+
+    for url in (
+        "http://169.254.169.254/latest/meta-data/",
+        "http://localhost:5432/",
+        "file:///etc/passwd",
+        "/etc/passwd",
+        "/static/../app/core/config.py",
+        "/static/uploads/../../secrets.png",
+    ):
+        with pytest.raises(ImageSourceError):
+            resolve_image_source(url)
+    assert len(fetched) == 1
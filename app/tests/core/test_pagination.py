@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.core.pagination import CursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_datetimes_and_strings() -> None:
+    last_id = uuid4()
+    when = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+    assert decode_cursor(encode_cursor("date", True, when, last_id)) == (
+        "date",
+        True,
+        when,
+        last_id,
+    )
+    assert decode_cursor(encode_cursor("inspection_type", False, "weld", last_id)) == (
+        "inspection_type",
+        False,
+        "weld",
+        last_id,
+    )
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "WyJkYXRlIl0"])
+def test_malformed_cursors_are_rejected(cursor: str) -> None:
+    with pytest.raises(CursorError):
+        decode_cursor(cursor)
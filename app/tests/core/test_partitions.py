@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+import sqlalchemy as sa
+from sqlalchemy import create_engine
+
+from app.core.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    create_partition_sql,
+    ensure_partitions,
+    id_filter,
+    id_time,
+    partition_month,
+    partition_name,
+    time_ordered_id,
+)
+
+
+def test_month_arithmetic_crosses_years() -> None:
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_partition_names_round_trip() -> None:
+    name = partition_name("inspectionresult", date(2024, 3, 1))
+    assert name == "inspectionresult_p2024_03"
+    assert partition_month(name) == date(2024, 3, 1)
+    assert partition_month("inspectionresult_default") is None
+
+
+def test_partition_bounds_are_half_open_months() -> None:
+    sql = create_partition_sql(PARTITIONED_TABLES[0], date(2024, 12, 1))
+    assert "inspectionresult_p2024_12 PARTITION OF inspectionresult" in sql
+    assert "FROM ('2024-12-01') TO ('2025-01-01')" in sql
+
+
+def test_maintenance_is_a_no_op_without_partitioned_tables() -> None:
+    engine = create_engine("sqlite://")
+    assert ensure_partitions(engine, datetime.now(timezone.utc), 3) == []
+
+
+def test_time_ordered_ids_carry_their_creation_time() -> None:
+    at = datetime(2026, 3, 1, 8, 30, 15, 123456)
+    row_id = time_ordered_id(at)
+
+    assert row_id.version == 7
+    assert id_time(row_id) == at.replace(microsecond=123000)
+    assert time_ordered_id(at) != row_id
+    assert time_ordered_id(at - timedelta(days=40)) < row_id
+    assert id_time(uuid4()) is None
+
+
+def test_id_lookups_are_bounded_by_the_id_time() -> None:
+    table = sa.Table(
+        "row",
+        sa.MetaData(),
+        sa.Column("id", sa.Uuid, primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+    )
+    engine = create_engine("sqlite://")
+    table.metadata.create_all(engine)
+    new, old = time_ordered_id(datetime(2026, 3, 1, 8, 0)), uuid4()
+    with engine.begin() as connection:
+        connection.execute(
+            table.insert(),
+            [
+                {"id": new, "created_at": id_time(new)},
+                {"id": old, "created_at": datetime(2020, 1, 1)},
+            ],
+        )
+
+        for ids in ([new], [old], [new, old], []):
+            found = connection.execute(
+                sa.select(table.c.id).where(id_filter(table, ids))
+            ).scalars()
+            assert set(found) == set(ids)
+
+    assert "created_at BETWEEN" in str(id_filter(table, [new]))
+    assert "created_at" not in str(id_filter(table, [new, old]))
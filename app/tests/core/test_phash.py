@@ -0,0 +1,139 @@
+import io
+import random
+from datetime import datetime
+from uuid import uuid4
+
+import numpy as np
+import sqlalchemy as sa
+from PIL import Image
+from sqlmodel import Session
+
+from app import crud
+from app.core.phash import (
+    MultiIndexHashTable,
+    PerceptualHashIndex,
+    compute_phash,
+    hamming,
+    phash_to_hex,
+)
+from app.core.tables import inspection_results, metadata
+from app.models import InspectionOutcome
+
+
+def _png(pixels: np.ndarray) -> io.BytesIO:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def test_phash_tolerates_noise_but_not_new_content() -> None:
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:128, 0:128]
+    base = 120 + 60 * np.sin(x / 9.0) * np.cos(y / 13.0)
+    base[32:96, 20:60] += 60
+    noisy = np.clip(base + rng.normal(0, 4, base.shape), 0, 255)
+    other = 120 + 60 * np.cos(x / 5.0 + y / 7.0)
+
+    original = compute_phash(_png(base))
+    assert hamming(original, compute_phash(_png(noisy))) <= 4
+    assert hamming(original, compute_phash(_png(other))) > 10
+
+
+def test_multi_index_matches_brute_force() -> None:
+    rnd = random.Random(42)
+    table = MultiIndexHashTable()
+    hashes = {}
+    anchor = rnd.getrandbits(64)
+    for i in range(2000):
+        value = rnd.getrandbits(64)
+        if i % 10 == 0:
+            # plant near duplicates of the anchor
+            for bit in rnd.sample(range(64), rnd.randint(0, 12)):
+                value = anchor ^ (1 << bit)
+                anchor = value
+        key = uuid4()
+        hashes[key] = value
+        table.add(key, value)
+
+    for max_distance in (0, 3, 7, 12):
+        expected = sorted(
+            (key, hamming(anchor, value))
+            for key, value in hashes.items()
+            if hamming(anchor, value) <= max_distance
+        )
+        assert sorted(table.search(anchor, max_distance)) == expected
+
+
+def test_index_tracks_only_loaded_stations() -> None:
+    index = PerceptualHashIndex()
+    station_id, key = uuid4(), uuid4()
+    value = phash_to_hex(0xFF00FF00FF00FF00)
+
+    index.add(station_id, key, value)
+    assert not index.is_loaded(station_id)
+
+    index.load(station_id, [(key, value), (uuid4(), None)])
+    assert index.search(station_id, value, 0) == [(key, 0)]
+
+    index.remove(station_id, key)
+    assert index.search(station_id, value, 0) == []
+
+
+def test_index_catches_up_with_rows_written_elsewhere() -> None:
+    index = PerceptualHashIndex()
+    station_id, first, second = uuid4(), uuid4(), uuid4()
+    value = phash_to_hex(0xFF00FF00FF00FF00)
+    t0, t1 = datetime(2026, 3, 1, 8), datetime(2026, 3, 1, 9)
+
+    index.load(station_id, [(first, value)], (1, t0))
+    assert index.generation(station_id) == (1, t0)
+
+    # another worker added a row: only the newer rows are needed
+    assert index.extend(station_id, [(first, value), (second, value)], (2, t1))
+    assert index.generation(station_id) == (2, t1)
+    assert {key for key, _ in index.search(station_id, value, 0)} == {first, second}
+
+    # and deleted one: the count can't be reached by adding, reload instead
+    assert not index.extend(station_id, [], (1, t1))
+    assert index.generation(station_id) == (2, t1)
+
+
+def test_station_index_follows_other_writers(monkeypatch) -> None:
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    index = PerceptualHashIndex()
+    monkeypatch.setattr(crud, "phash_index", index)
+    station_id, value = uuid4(), phash_to_hex(0xFF00FF00FF00FF00)
+
+    def insert(session, created_at):
+        row = {
+            "id": uuid4(),
+            "station_id": station_id,
+            "captured_image_url": "https://example.com/a.png",
+            "inspection_outcome": InspectionOutcome.PENDING,
+            "phash": value,
+            "created_at": created_at,
+        }
+        session.execute(inspection_results.insert(), [row])
+        session.commit()
+
+    with Session(engine) as session:
+        service = crud.InspectionService(session)
+        insert(session, datetime(2026, 3, 1))
+        service._sync_phash_index(station_id)
+        assert len(index.search(station_id, value, 0)) == 1
+
+        # written by another process, this one's index never saw it
+        insert(session, datetime(2026, 3, 2))
+        service._sync_phash_index(station_id)
+        assert len(index.search(station_id, value, 0)) == 2
+
+        session.execute(
+            sa.delete(inspection_results).where(
+                inspection_results.c.created_at == datetime(2026, 3, 1)
+            )
+        )
+        session.commit()
+        service._sync_phash_index(station_id)
+        assert len(index.search(station_id, value, 0)) == 1
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from app.core import profiler
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_sees_busy_threads_and_the_event_loop() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name="busy-worker")
+    worker.start()
+
+    async def main():
+        task = asyncio.create_task(profiler.profile(0.3, hz=200))
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            # longer than the GIL switch interval, see profiler.sample
+            sum(range(1_000_000))
+            await asyncio.sleep(0)
+        return await task
+
+    try:
+        stacks = asyncio.run(main())
+    finally:
+        stop.set()
+        worker.join()
+
+    assert any(
+        stack.startswith("busy-worker;") and "_spin" in stack for stack in stacks
+    )
+    assert any(stack.startswith("event-loop;") and "main" in stack for stack in stacks)
+    assert not any(stack.startswith("profiler;") for stack in stacks)
+
+
+def test_only_one_profile_at_a_time() -> None:
+    async def main():
+        first = asyncio.create_task(profiler.profile(0.2))
+        await asyncio.sleep(0.05)
+        with pytest.raises(profiler.ProfilerBusy):
+            await profiler.profile(0.1)
+        await first
+
+    asyncio.run(main())
+
+
+def test_output_formats() -> None:
+    stacks = Counter({"t;a;b": 3, "t;a": 1})
+
+    assert profiler.collapsed(stacks) == "t;a;b 3\nt;a 1\n"
+    result = profiler.speedscope(stacks, hz=100)
+    frames = [frame["name"] for frame in result["shared"]["frames"]]
+    assert frames == ["t", "a", "b"]
+    assert result["profiles"][0]["samples"] == [[0, 1, 2], [0, 1]]
+    assert result["profiles"][0]["weights"] == [0.03, 0.01]
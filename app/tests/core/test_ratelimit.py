@@ -0,0 +1,92 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import security
+from app.core.config import settings
+from app.core.ratelimit import (
+    READ,
+    UPLOAD,
+    WRITE,
+    AdmissionControlMiddleware,
+    AdmissionPolicy,
+    ConcurrencyLimiter,
+    Overloaded,
+    RateLimiter,
+    TokenBucket,
+    classify,
+)
+
+
+def test_token_bucket_refills_at_rate() -> None:
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    now = bucket.updated
+    assert bucket.take(now) == 0
+    assert bucket.take(now) == 0
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0
+
+
+def test_rate_limiter_is_per_subject_and_class() -> None:
+    limiter = RateLimiter({READ: (1.0, 1), UPLOAD: (1.0, 1)})
+    assert limiter.check("user:a", READ) == 0
+    assert limiter.check("user:a", READ) > 0
+    assert limiter.check("user:a", UPLOAD) == 0
+    assert limiter.check("user:b", READ) == 0
+
+
+def test_classify() -> None:
+    policy = AdmissionPolicy()
+    assert classify("GET", "/api/v1/inspections/", policy) == READ
+    assert classify("POST", "/api/v1/inspections/", policy) == UPLOAD
+    assert classify("POST", "/api/v1/upload/image/", policy) == UPLOAD
+    assert classify("PUT", "/api/v1/inspections/1", policy) == WRITE
+
+
+def test_concurrency_limiter_sheds_when_queue_is_full() -> None:
+    async def scenario() -> None:
+        limiter = ConcurrencyLimiter(
+            max_concurrent=1, max_queue=0, queue_timeout=1, latency_limit=10
+        )
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        limiter.release(0.01)
+        await limiter.acquire()
+
+    asyncio.run(scenario())
+
+
+def _client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr(settings, "RATE_LIMIT_READS_PER_SECOND", 0.001)
+    monkeypatch.setattr(settings, "RATE_LIMIT_READS_BURST", 2)
+    app = Starlette(routes=[Route("/items", lambda _: PlainTextResponse("ok"))])
+    return TestClient(AdmissionControlMiddleware(app))
+
+
+def test_middleware_returns_429_with_retry_after(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client = _client(monkeypatch)
+    assert client.get("/items").status_code == 200
+    assert client.get("/items").status_code == 200
+    response = client.get("/items")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.json() == {"detail": "Too many requests"}
+
+
+def test_middleware_limits_by_token_subject(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _client(monkeypatch)
+    for _ in range(2):
+        client.get("/items")
+    assert client.get("/items").status_code == 429
+
+    token = security.create_access_token("someone", timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/items", headers=headers).status_code == 200
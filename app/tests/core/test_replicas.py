@@ -0,0 +1,122 @@
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.replicas import (
+    STICKY_COOKIE,
+    STICKY_STATE,
+    ReadYourWritesMiddleware,
+    ReplicaRouter,
+)
+
+
+def _engine(path: Path, name: str):
+    engine = create_engine(f"sqlite:///{path}")
+    if path.parent.exists():
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE IF NOT EXISTS db (name TEXT)"))
+            connection.execute(text("INSERT INTO db VALUES (:name)"), {"name": name})
+    return engine
+
+
+def _name(engine) -> str:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT name FROM db")).scalar_one()
+
+
+def test_reads_go_to_healthy_replicas(tmp_path: Path) -> None:
+    primary = _engine(tmp_path / "primary.db", "primary")
+    replica = _engine(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [replica])
+
+    engines = router.read_engines()
+
+    assert [_name(e) for e in engines] == ["replica", "primary"]
+
+
+def test_unreachable_replica_fails_over_to_primary(tmp_path: Path) -> None:
+    primary = _engine(tmp_path / "primary.db", "primary")
+    broken = _engine(tmp_path / "missing" / "replica.db", "replica")
+    router = ReplicaRouter(primary, [broken])
+
+    router.check()
+
+    assert router.read_engines() == [primary]
+
+
+def test_health_checks_stay_off_the_request_path(tmp_path: Path) -> None:
+    primary = _engine(tmp_path / "primary.db", "primary")
+    replica = _engine(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [replica], health_interval=60)
+    release, probed = threading.Event(), threading.Event()
+    callers = []
+
+    def probe(_engine) -> bool:
+        callers.append(threading.current_thread())
+        release.wait(5)
+        return False
+
+    def check() -> None:
+        ReplicaRouter.check(router)
+        probed.set()
+
+    router._probe, router.check = probe, check
+    # assumed healthy until a check says otherwise, which doesn't block
+    assert router.read_engines()[0] is replica
+    release.set()
+    assert probed.wait(5)
+    assert threading.current_thread() not in callers
+    assert router.read_engines() == [primary]
+
+
+def test_failed_replica_is_skipped_until_next_check(tmp_path: Path) -> None:
+    primary = _engine(tmp_path / "primary.db", "primary")
+    replicas = [_engine(tmp_path / f"r{i}.db", f"r{i}") for i in range(2)]
+    router = ReplicaRouter(primary, replicas, health_interval=60)
+    router.healthy_replicas()
+
+    router.mark_failed(replicas[0])
+
+    for _ in range(3):
+        assert router.read_engines()[0] is replicas[1]
+    router.check()
+    assert {router.read_engines()[0] for _ in range(4)} == set(replicas)
+
+
+def test_reads_stick_to_primary_after_own_writes(tmp_path: Path) -> None:
+    primary = _engine(tmp_path / "primary.db", "primary")
+    replica = _engine(tmp_path / "replica.db", "replica")
+    router = ReplicaRouter(primary, [replica], sticky_seconds=30)
+    until = router.sticky_until()
+
+    assert router.is_pinned({STICKY_COOKIE: str(until)})
+    assert router.read_engines(pinned=True) == [primary]
+    assert router.read_engines()[0] is replica
+    for stale in (time.time() - 1, time.time() + 3600, "soon"):
+        assert not router.is_pinned({STICKY_COOKIE: str(stale)})
+    assert not router.is_pinned({})
+
+
+def test_writes_hand_out_the_sticky_cookie() -> None:
+    def write(request: Request) -> PlainTextResponse:
+        setattr(request.state, STICKY_STATE, time.time() + 30)
+        return PlainTextResponse("ok")
+
+    app = Starlette(
+        routes=[
+            Route("/write", write, methods=["POST"]),
+            Route("/read", lambda request: PlainTextResponse("ok")),
+        ]
+    )
+    client = TestClient(ReadYourWritesMiddleware(app, sticky_seconds=30))
+
+    cookie = client.post("/write").headers["set-cookie"]
+    assert cookie.startswith(f"{STICKY_COOKIE}=") and "Max-Age=30" in cookie
+    assert "set-cookie" not in client.get("/read").headers
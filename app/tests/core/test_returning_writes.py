@@ -0,0 +1,201 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlmodel import Session, SQLModel
+
+from app import crud
+from app.core.partitions import id_time
+from app.core.tables import (
+    inspection_results,
+    inspection_stations,
+    metadata,
+    tag_inspections,
+)
+from app.models import (
+    InspectionEventType,
+    InspectionJob,
+    InspectionOutcome,
+    InspectionResultCreate,
+    InspectionResultUpdate,
+    InspectionTagUpdate,
+    Tag,
+)
+
+NOW = datetime(2026, 3, 1, 8, 0)
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.events = []
+
+    def publish(self, event) -> None:
+        self.events.append(event)
+
+
+@pytest.fixture
+def session():
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    SQLModel.metadata.create_all(engine, tables=[InspectionJob.__table__])
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def events(monkeypatch) -> _Recorder:
+    recorder = _Recorder()
+    monkeypatch.setattr(crud, "broker", recorder)
+    return recorder
+
+
+def _result(session: Session, owner_id: uuid.UUID) -> dict:
+    row = {
+        "id": uuid.uuid4(),
+        "station_id": uuid.uuid4(),
+        "owner_id": owner_id,
+        "captured_image_url": "https://example.com/a.png",
+        "inspection_outcome": InspectionOutcome.PENDING,
+        "notes": None,
+        "created_at": NOW,
+        "version": 1,
+    }
+    session.execute(inspection_results.insert(), [row])
+    session.commit()
+    return row
+
+
+def _tag_inspection(session: Session, user_id: uuid.UUID) -> dict:
+    row = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "date": NOW,
+        "inspection_type": "weld",
+        "details": "seam",
+        "tags": ["rework"],
+        "version": 1,
+        "created_at": NOW,
+    }
+    session.execute(tag_inspections.insert(), [row])
+    session.commit()
+    return row
+
+
+def _stored(session: Session, table: sa.Table, row_id: uuid.UUID):
+    return session.execute(sa.select(table).where(table.c.id == row_id)).first()
+
+
+def test_create_result_checks_the_station_and_enqueues_grading(session, events) -> None:
+    owner = SimpleNamespace(id=uuid.uuid4())
+    station_id = uuid.uuid4()
+    session.execute(
+        inspection_stations.insert(),
+        [
+            {
+                "id": station_id,
+                "name": "line 1",
+                "description": "",
+                "product_image_url": "https://example.com/golden.png",
+                "owner_id": owner.id,
+                "created_at": NOW,
+            }
+        ],
+    )
+    service = crud.InspectionService(session)
+    capture = InspectionResultCreate(captured_image_url="https://example.com/a.png")
+
+    assert service.owns_station(station_id, owner)
+    intruder = SimpleNamespace(id=uuid.uuid4())
+    assert not service.owns_station(station_id, intruder)
+    with pytest.raises(ValueError):
+        service.create_inspection_result(station_id, capture, intruder)
+
+    created = service.create_inspection_result(station_id, capture, owner)
+
+    assert created.owner_id == owner.id and created.version == 1
+    assert id_time(created.id) == created.created_at
+    assert service.get_inspection_result(created.id, owner) == created
+    assert created.inspection_outcome == InspectionOutcome.PENDING
+    assert _stored(session, inspection_results, created.id) is not None
+    (job,) = session.execute(sa.select(InspectionJob)).scalars()
+    assert job.inspection_id == created.id
+    assert [(e.type, e.inspection_id) for e in events.events] == [
+        (InspectionEventType.CREATED, created.id)
+    ]
+
+
+def test_update_result_returns_the_written_row(session, events) -> None:
+    owner = SimpleNamespace(id=uuid.uuid4())
+    row = _result(session, owner.id)
+
+    updated = crud.InspectionService(session).update_inspection_result(
+        row["id"],
+        InspectionResultUpdate(inspection_outcome=InspectionOutcome.FAIL),
+        owner,
+    )
+
+    assert updated.inspection_outcome == InspectionOutcome.FAIL
+    assert updated.version == 2 and updated.updated_at is not None
+    assert updated.notes is None  # unset fields are left alone
+    assert _stored(session, inspection_results, row["id"]).version == 2
+    assert [(e.type, e.inspection_id) for e in events.events] == [
+        (InspectionEventType.UPDATED, row["id"])
+    ]
+
+
+def test_result_writes_are_owner_scoped(session, events) -> None:
+    row = _result(session, uuid.uuid4())
+    intruder = SimpleNamespace(id=uuid.uuid4())
+    service = crud.InspectionService(session)
+
+    with pytest.raises(ValueError):
+        service.update_inspection_result(
+            row["id"], InspectionResultUpdate(notes="mine now"), intruder
+        )
+    assert not service.delete_inspection_result(row["id"], intruder)
+
+    stored = _stored(session, inspection_results, row["id"])
+    assert stored.notes is None and stored.version == 1
+    assert events.events == []
+
+
+def test_delete_result_publishes_the_returned_row(session, events) -> None:
+    owner = SimpleNamespace(id=uuid.uuid4())
+    row = _result(session, owner.id)
+
+    assert crud.InspectionService(session).delete_inspection_result(row["id"], owner)
+
+    assert _stored(session, inspection_results, row["id"]) is None
+    (event,) = events.events
+    assert event.type == InspectionEventType.DELETED
+    assert (event.inspection_id, event.station_id) == (row["id"], row["station_id"])
+    assert event.inspection_outcome == InspectionOutcome.PENDING
+
+
+def test_tag_inspection_update_and_delete(session) -> None:
+    user_id = uuid.uuid4()
+    row = _tag_inspection(session, user_id)
+    tags = crud.InspectionTAGCRUD(session)
+
+    with pytest.raises(HTTPException) as e:
+        tags.update_inspection(
+            row["id"], uuid.uuid4(), InspectionTagUpdate(id=row["id"], details="x")
+        )
+    assert e.value.status_code == 404
+    assert not tags.delete_inspection(row["id"], uuid.uuid4())
+    assert _stored(session, tag_inspections, row["id"]).details == "seam"
+
+    updated = tags.update_inspection(
+        row["id"],
+        user_id,
+        InspectionTagUpdate(id=row["id"], tags=Tag.from_names(["ok"])),
+    )
+    assert updated.tags.names() == ["ok"] and updated.details == "seam"
+    assert updated.version == 2
+    assert _stored(session, tag_inspections, row["id"]).tags == ["ok"]
+
+    assert tags.delete_inspection(row["id"], user_id)
+    assert _stored(session, tag_inspections, row["id"]) is None
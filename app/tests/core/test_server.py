@@ -0,0 +1,33 @@
+import pytest
+
+from app.core.server import tune
+
+
+def test_workers_follow_cpu_count() -> None:
+    tuning = tune(cpu_count=4, pool_budget=200)
+    assert tuning.workers == 9
+    assert tuning.connections <= 200
+
+
+def test_workers_are_capped_by_pool_budget() -> None:
+    tuning = tune(cpu_count=32, pool_budget=40)
+    assert tuning.workers == 10
+    assert tuning.pool_size + tuning.max_overflow == 4
+    assert tuning.connections <= 40
+
+
+def test_explicit_workers_share_the_budget() -> None:
+    tuning = tune(cpu_count=8, pool_budget=30, workers=2)
+    assert (tuning.workers, tuning.pool_size, tuning.max_overflow) == (2, 10, 5)
+
+
+def test_budget_never_exceeded() -> None:
+    for budget in (1, 3, 7, 40):
+        for workers in (None, *range(1, budget + 1)):
+            assert (
+                tune(cpu_count=16, pool_budget=budget, workers=workers).connections
+                <= budget
+            )
+    for budget, workers in ((3, 4), (0, None)):
+        with pytest.raises(ValueError):
+            tune(cpu_count=16, pool_budget=budget, workers=workers)
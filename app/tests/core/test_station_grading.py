@@ -0,0 +1,150 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app import crud
+from app.core.tables import inspection_results, inspection_stations, metadata
+from app.models import InspectionOutcome
+
+NOW = datetime(2026, 3, 1, 8, 0)
+GOOD = {"mean_diff": 0.01, "defect_ratio": 0.0, "ncc": 0.99, "shift": 1.0}
+BAD = {"mean_diff": 0.5, "defect_ratio": 0.4, "ncc": 0.2, "shift": 1.0}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(crud, "broker", SimpleNamespace(publish=lambda event: None))
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _station(session: Session, owner_id: uuid.UUID, criteria: list[str]) -> uuid.UUID:
+    station_id = uuid.uuid4()
+    session.execute(
+        inspection_stations.insert(),
+        [
+            {
+                "id": station_id,
+                "name": "line 1",
+                "description": "",
+                "product_image_url": "/static/uploads/golden.png",
+                "criteria": criteria,
+                "owner_id": owner_id,
+                "created_at": NOW,
+            }
+        ],
+    )
+    return station_id
+
+
+def _results(session: Session, station_id, owner_id, rows) -> list[uuid.UUID]:
+    ids = [uuid.uuid4() for _ in rows]
+    session.execute(
+        inspection_results.insert(),
+        [
+            {
+                "id": result_id,
+                "station_id": station_id,
+                "owner_id": owner_id,
+                "captured_image_url": f"https://images.example/{result_id}.png",
+                "inspection_outcome": outcome,
+                "features": features,
+                "tags": tags,
+                "created_at": NOW,
+            }
+            for result_id, (outcome, features, tags) in zip(ids, rows, strict=True)
+        ],
+    )
+    session.commit()
+    return ids
+
+
+def _outcomes(session: Session, ids) -> list[InspectionOutcome]:
+    outcome = {
+        row.id: row.inspection_outcome
+        for row in session.execute(
+            sa.select(inspection_results.c.id, inspection_results.c.inspection_outcome)
+        )
+    }
+    return [outcome[result_id] for result_id in ids]
+
+
+def test_regrade_without_criteria_falls_back_to_the_thresholds(session) -> None:
+    owner = SimpleNamespace(id=uuid.uuid4())
+    station_id = _station(session, owner.id, [])
+    ids = _results(
+        session,
+        station_id,
+        owner.id,
+        [(InspectionOutcome.PASS, BAD, None), (InspectionOutcome.FAIL, GOOD, None)],
+    )
+
+    summary = crud.InspectionService(session).regrade_station(station_id, owner)
+
+    assert (summary.passed, summary.failed) == (1, 1)
+    assert _outcomes(session, ids) == [InspectionOutcome.FAIL, InspectionOutcome.PASS]
+
+
+def test_grading_checks_tag_criteria_against_the_stored_tags(
+    session, monkeypatch
+) -> None:
+    owner = SimpleNamespace(id=uuid.uuid4())
+    station_id = _station(session, owner.id, ["mean_diff < 0.1", "no tag rework"])
+    pending = InspectionOutcome.PENDING
+    ids = _results(
+        session,
+        station_id,
+        owner.id,
+        [
+            (pending, None, ["rework"]),
+            (pending, None, ["checked"]),
+            (pending, None, None),
+        ],
+    )
+    monkeypatch.setattr(
+        crud.grader, "grade", lambda reference, urls: [(True, GOOD)] * len(urls)
+    )
+
+    summary = crud.InspectionService(session).grade_pending(station_id, owner)
+
+    assert (summary.graded, summary.passed, summary.failed) == (3, 2, 1)
+    assert _outcomes(session, ids) == [
+        InspectionOutcome.FAIL,
+        InspectionOutcome.PASS,
+        InspectionOutcome.PASS,
+    ]
+
+
+def test_results_filter_by_station_name_and_description(session) -> None:
+    owner = SimpleNamespace(id=uuid.uuid4())
+    paint = _station(session, owner.id, [])
+    weld = _station(session, owner.id, [])
+    session.execute(
+        sa.update(inspection_stations)
+        .where(inspection_stations.c.id == weld)
+        .values(name="Weld 100%", description="Seams of the frame")
+    )
+    pending = (InspectionOutcome.PENDING, None, None)
+    _results(session, paint, owner.id, [pending])
+    weld_ids = _results(session, weld, owner.id, [pending, pending])
+    service = crud.InspectionService(session)
+
+    for filters in ({"name": "weld"}, {"description": "FRAME"}, {"name": "100%"}):
+        results, total = service.get_inspection_results(owner, **filters)
+        assert total == 2
+        assert {result.id for result in results} == set(weld_ids)
+        count, _ = service.get_inspection_results_version(owner, **filters)
+        assert count == 2
+
+    _, total = service.get_inspection_results(owner, name="1%")
+    assert total == 0
+    _, total = service.get_inspection_results(
+        SimpleNamespace(id=uuid.uuid4()), name="weld"
+    )
+    assert total == 0
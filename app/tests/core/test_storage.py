@@ -0,0 +1,177 @@
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.core.storage import (
+    LocalStorage,
+    S3Storage,
+    StorageError,
+    UploadStaticFiles,
+    shard_key,
+)
+
+
+@pytest.fixture
+def local(tmp_path: Path) -> LocalStorage:
+    return LocalStorage(str(tmp_path / "uploads"), "/static/uploads", "secret", "/up")
+
+
+def test_local_put_open_delete(local: LocalStorage, tmp_path: Path) -> None:
+    source = tmp_path / "image.png"
+    source.write_bytes(b"png")
+
+    local.put_file("ab/image.png", str(source))
+
+    assert local.exists("ab/image.png")
+    assert local.url("ab/image.png") == "/static/uploads/ab/image.png"
+    with local.open("ab/image.png") as f:
+        assert f.read() == b"png"
+    local.delete("ab/image.png")
+    assert not local.exists("ab/image.png")
+
+
+def test_local_keys_cannot_escape_root(local: LocalStorage) -> None:
+    with pytest.raises(StorageError):
+        local.local_path("../outside.png")
+
+
+def test_local_presigned_upload_is_verified(local: LocalStorage) -> None:
+    upload = local.presign_upload("a.png", "image/png", 1024, 60)
+    assert upload.url.startswith("/up?")
+    expires = int(upload.expires_at)
+    signature = upload.url.rsplit("signature=", 1)[1]
+
+    assert local.verify_upload("a.png", "image/png", 1024, expires, signature)
+    assert not local.verify_upload("b.png", "image/png", 1024, expires, signature)
+    assert not local.verify_upload("a.png", "image/png", 10**9, expires, signature)
+    assert not local.verify_upload(
+        "a.png", "image/png", 1024, int(time.time()) - 1, signature
+    )
+
+
+def test_s3_round_trip_against_moto(tmp_path: Path) -> None:
+    boto3 = pytest.importorskip("boto3")
+    moto = pytest.importorskip("moto")
+
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="inspections")
+        s3 = S3Storage("inspections", client=client)
+        source = tmp_path / "image.png"
+        source.write_bytes(b"png")
+
+        s3.put_file("ab/image.png", str(source), "image/png")
+
+        assert s3.exists("ab/image.png")
+        assert not s3.exists("missing.png")
+        assert s3.open("ab/image.png").read() == b"png"
+        upload = s3.presign_upload("cd/new.png", "image/png", 1024, 60)
+        assert upload.fields["key"] == "cd/new.png"
+        assert s3.url("ab/image.png").endswith("/ab/image.png")
+
+
+def test_shard_keys() -> None:
+    name = "6f1c2e9a-0000-4000-8000-000000000000_20240131_120000.png"
+    hashed = shard_key(name, "hash")
+    assert hashed.endswith("/" + name)
+    assert len(hashed.split("/")) == 3
+    assert shard_key(name, "hash") == hashed
+    assert shard_key(name, "date") == f"2024/01/31/{name}"
+    assert shard_key(name, "flat") == name
+    # names that don't carry a date stay flat under the date layout
+    assert shard_key("reference.png", "date") == "reference.png"
+
+
+def test_flat_keys_follow_migrated_files(tmp_path: Path) -> None:
+    name = "6f1c2e9a-0000-4000-8000-000000000000_20240131_120000.png"
+    local = LocalStorage(str(tmp_path), "/static/uploads", "secret", "/up", "hash")
+    moved = tmp_path / shard_key(name, "hash")
+    moved.parent.mkdir(parents=True)
+    moved.write_bytes(b"png")
+
+    assert local.find(name) == str(moved)
+    assert local.exists(name)
+    with local.open(name) as f:
+        assert f.read() == b"png"
+
+
+def test_static_mount_serves_flat_and_sharded_urls(tmp_path: Path) -> None:
+    flat = "6f1c2e9a-0000-4000-8000-000000000000_20240131_120000.png"
+    moved = tmp_path / "uploads" / shard_key(flat, "date")
+    moved.parent.mkdir(parents=True)
+    moved.write_bytes(b"png")
+    app = Starlette(
+        routes=[
+            Mount(
+                "/static",
+                UploadStaticFiles(
+                    directory=str(tmp_path), uploads="uploads", layout="hash"
+                ),
+            )
+        ]
+    )
+    client = TestClient(app)
+
+    assert client.get(f"/static/uploads/{flat}").content == b"png"
+    assert client.get(f"/static/uploads/{shard_key(flat, 'date')}").status_code == 200
+    assert client.get("/static/uploads/missing.png").status_code == 404
+
+
+def test_upload_root_mounted_at_its_own_url(tmp_path: Path) -> None:
+    flat = "6f1c2e9a-0000-4000-8000-000000000000_20240131_120000.png"
+    moved = tmp_path / shard_key(flat, "hash")
+    moved.parent.mkdir(parents=True)
+    moved.write_bytes(b"png")
+    app = Starlette(
+        routes=[
+            Mount("/media", UploadStaticFiles(directory=str(tmp_path), layout="hash"))
+        ]
+    )
+    client = TestClient(app)
+
+    assert client.get(f"/media/{flat}").content == b"png"
+    assert client.get(f"/media/{shard_key(flat, 'hash')}").status_code == 200
+
+
+class _UnreachableStorage(LocalStorage):
+    def exists(self, key: str) -> bool:
+        raise StorageError("connection refused")
+
+
+def test_completing_a_presigned_upload_checks_the_owner(tmp_path: Path) -> None:
+    from fastapi import HTTPException
+
+    from app.crud import ImageUploadService
+    from app.models import ImageUploadRequest
+
+    owner, other = SimpleNamespace(id=uuid4()), SimpleNamespace(id=uuid4())
+    local = LocalStorage(str(tmp_path), "/static/uploads", "secret", "/up")
+    service = ImageUploadService(local)
+    request = ImageUploadRequest(filename="a.png", content_type="image/png")
+    key = service.presign_upload(request, owner).key
+
+    def complete(key: str, user) -> int:
+        try:
+            asyncio.run(service.complete_upload(key, user))
+        except HTTPException as e:
+            return e.status_code
+        return 200
+
+    assert complete(key, owner) == 404  # not uploaded yet
+    (tmp_path / key).parent.mkdir(parents=True, exist_ok=True)
+    (tmp_path / key).write_bytes(b"png")
+
+    assert complete(key, owner) == 200
+    assert complete(key, other) == 404
+    assert complete(f"../{key}", owner) == 400
+    assert complete(f"{uuid4()}_20240131_120000.png", owner) == 400
+
+    service.storage = _UnreachableStorage(str(tmp_path), "/s", "secret", "/up")
+    assert complete(key, owner) == 502
@@ -0,0 +1,96 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app import crud
+from app.core import synthetic
+from app.core.storage import storage
+from app.models import InspectionStation
+
+END = datetime(2026, 3, 1, 12, 0)
+START = END - timedelta(days=30)
+
+
+def _dataset(seed: int) -> tuple[list[dict], list[dict]]:
+    rng = np.random.default_rng(seed)
+    users = synthetic.users(rng, 3, "hash")
+    stations, fail_rates = synthetic.stations(
+        rng, [u["id"] for u in users], 4, START, []
+    )
+    results = next(synthetic.results(rng, stations, fail_rates, 2000, START, END))
+    return stations, results
+
+
+def test_same_seed_same_data() -> None:
+    assert _dataset(7) == _dataset(7)
+    assert _dataset(7)[1][0]["id"] != _dataset(8)[1][0]["id"]
+
+
+def test_results_are_skewed_and_in_range() -> None:
+    stations, results = _dataset(0)
+    per_station = Counter(row["station_id"] for row in results).most_common()
+
+    assert per_station[0][1] > 3 * per_station[-1][1]
+    assert all(START <= row["created_at"] <= END for row in results)
+    owners = {s["id"]: s["owner_id"] for s in stations}
+    assert all(row["owner_id"] == owners[row["station_id"]] for row in results)
+    assert {row["inspection_outcome"] for row in results} <= {"PASS", "FAIL", "PENDING"}
+
+
+def test_tag_frequencies_follow_zipf() -> None:
+    rng = np.random.default_rng(0)
+    rows = next(synthetic.tag_inspections(rng, [1, 2], 5000, START, END, 50))
+    counts = Counter(tag for row in rows for tag in row["tags"])
+    vocabulary = synthetic.tag_vocabulary(50)
+
+    assert counts[vocabulary[0]] > 5 * counts[vocabulary[20]]
+
+
+def test_bulk_insert_into_sqlite() -> None:
+    engine = sa.create_engine("sqlite://")
+    synthetic.SCHEMA.create_all(engine)
+    stations, results = _dataset(0)
+
+    with engine.begin() as connection:
+        table = synthetic.SCHEMA.tables["inspectionresult"]
+        assert synthetic.bulk_insert(connection, table, results) == len(results)
+        assert connection.execute(
+            sa.select(sa.func.count()).select_from(table)
+        ).scalar() == len(results)
+        assert connection.execute(
+            sa.select(sa.func.count())
+            .select_from(table)
+            .where(table.c.features.is_(None))
+        ).scalar() == sum(row["features"] is None for row in results)
+
+
+def test_generated_rows_read_back_through_the_service() -> None:
+    engine = sa.create_engine("sqlite://")
+    synthetic.SCHEMA.create_all(engine)
+    stations, results = _dataset(0)
+    with engine.begin() as connection:
+        for name, rows in (
+            ("inspectionstation", stations),
+            ("inspectionresult", results),
+        ):
+            synthetic.bulk_insert(connection, synthetic.SCHEMA.tables[name], rows)
+
+    row = results[0]
+    owner = SimpleNamespace(id=row["owner_id"])
+    with Session(engine) as session:
+        service = crud.InspectionService(session)
+        result = service.get_inspection_result(row["id"], owner)
+        page, total = service.get_inspection_results(
+            owner, station_id=row["station_id"]
+        )
+
+    assert result.captured_image_url == row["captured_image_url"]
+    assert result.captured_image_url.startswith(storage.url(""))
+    assert total == sum(r["station_id"] == row["station_id"] for r in results)
+    assert all(r.station_id == row["station_id"] for r in page)
+    # stations are served through the same model as user-created ones
+    assert InspectionStation.model_validate(stations[0]).product_image_url
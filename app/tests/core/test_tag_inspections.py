@@ -0,0 +1,186 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app.core.tables import metadata, tag_inspections
+from app.crud import InspectionTAGCRUD
+from app.models import BatchTagRequest, InspectionTagFilter
+
+START = datetime(2026, 3, 1, 8, 0)
+
+
+@pytest.fixture
+def session():
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _insert(session: Session, user_id: uuid.UUID, count: int) -> list[dict]:
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            # pairs of equal dates, so the id tie-breaker matters
+            "date": START + timedelta(days=i // 2),
+            "inspection_type": ("visual", "weld", "paint")[i % 3],
+            "details": f"inspection {i}",
+            "tags": None,
+            "version": 1,
+            "created_at": START + timedelta(minutes=i),
+            "updated_at": START + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+    session.execute(tag_inspections.insert(), rows)
+    session.commit()
+    return rows
+
+
+@pytest.mark.parametrize("sort_by", InspectionTAGCRUD.SORT_KEYS)
+@pytest.mark.parametrize("sort_desc", [False, True])
+def test_cursor_pages_cover_the_sorted_set_once(session, sort_by, sort_desc) -> None:
+    user_id = uuid.uuid4()
+    rows = _insert(session, user_id, 11)
+    _insert(session, uuid.uuid4(), 3)  # someone else's
+    crud = InspectionTAGCRUD(session)
+
+    seen, cursor = [], None
+    while True:
+        page = crud.get_inspections(
+            user_id, limit=4, sort_by=sort_by, sort_desc=sort_desc, cursor=cursor
+        )
+        seen.extend(page)
+        cursor = crud.next_cursor(page, 4, sort_by, sort_desc, cursor)
+        if cursor is None:
+            break
+
+    expected = sorted(
+        rows, key=lambda row: (row[sort_by], str(row["id"])), reverse=sort_desc
+    )
+    assert [item.id for item in seen] == [row["id"] for row in expected]
+
+
+def test_unknown_sort_key_and_mismatched_cursor_are_rejected(session) -> None:
+    user_id = uuid.uuid4()
+    _insert(session, user_id, 3)
+    crud = InspectionTAGCRUD(session)
+
+    with pytest.raises(HTTPException) as e:
+        crud.get_inspections(user_id, sort_by="details")
+    assert e.value.status_code == 400
+
+    page = crud.get_inspections(user_id, limit=2, sort_by="date")
+    cursor = crud.next_cursor(page, 2, "date", False, None)
+    with pytest.raises(HTTPException) as e:
+        crud.get_inspections(user_id, limit=2, sort_by="created_at", cursor=cursor)
+    assert e.value.status_code == 400
+
+
+def _tags(session: Session) -> dict:
+    rows = session.execute(
+        sa.select(
+            tag_inspections.c.id, tag_inspections.c.tags, tag_inspections.c.version
+        )
+    )
+    return {row.id: (row.tags, row.version) for row in rows}
+
+
+def test_batch_tags_by_id_only_touches_the_callers_rows(session) -> None:
+    user_id = uuid.uuid4()
+    rows = _insert(session, user_id, 4)
+    other = _insert(session, uuid.uuid4(), 1)
+    crud = InspectionTAGCRUD(session)
+
+    ids = [rows[0]["id"], rows[1]["id"], other[0]["id"]]
+    result = crud.batch_tags(
+        user_id, BatchTagRequest(ids=ids, add=["rework", "urgent"])
+    )
+
+    assert (result.matched, result.tagged, result.untagged) == (2, 2, 0)
+    stored = _tags(session)
+    assert stored[rows[0]["id"]] == (["rework", "urgent"], 2)
+    assert stored[rows[1]["id"]] == (["rework", "urgent"], 2)
+    assert stored[rows[2]["id"]] == (None, 1)
+    assert stored[other[0]["id"]] == (None, 1)
+
+
+def test_batch_tags_by_filter_counts_and_bumps_only_changed_rows(session) -> None:
+    user_id = uuid.uuid4()
+    rows = _insert(session, user_id, 6)  # types: visual, weld, paint, visual, ...
+    crud = InspectionTAGCRUD(session)
+    visual = [row["id"] for row in rows if row["inspection_type"] == "visual"]
+    crud.batch_tags(user_id, BatchTagRequest(ids=visual[:1], add=["rework"]))
+
+    result = crud.batch_tags(
+        user_id,
+        BatchTagRequest(
+            filter=InspectionTagFilter(inspection_type="visual"),
+            add=["rework", "checked"],
+        ),
+    )
+    assert (result.matched, result.tagged, result.untagged) == (2, 2, 0)
+    stored = _tags(session)
+    # order is kept, existing tags aren't repeated
+    assert stored[visual[0]] == (["rework", "checked"], 3)
+    assert stored[visual[1]] == (["rework", "checked"], 2)
+
+    # already tagged everywhere: matched, but nothing changes
+    result = crud.batch_tags(
+        user_id,
+        BatchTagRequest(
+            filter=InspectionTagFilter(inspection_type="visual"), add=["checked"]
+        ),
+    )
+    assert (result.matched, result.tagged, result.untagged) == (2, 0, 0)
+
+    result = crud.batch_tags(
+        user_id,
+        BatchTagRequest(
+            filter=InspectionTagFilter(tags=["checked"]), remove=["rework", "missing"]
+        ),
+    )
+    assert (result.matched, result.tagged, result.untagged) == (2, 0, 2)
+    stored = _tags(session)
+    assert stored[visual[0]] == (["checked"], 4)
+    assert stored[visual[1]] == (["checked"], 3)
+    assert all(
+        stored[row["id"]] == (None, 1) for row in rows if row["id"] not in visual
+    )
+
+
+def test_batch_tags_rejects_ambiguous_or_empty_requests(session) -> None:
+    crud = InspectionTAGCRUD(session)
+    for batch in (
+        BatchTagRequest(add=["x"]),
+        BatchTagRequest(ids=[uuid.uuid4()], filter=InspectionTagFilter(), add=["x"]),
+        BatchTagRequest(ids=[uuid.uuid4()]),
+    ):
+        with pytest.raises(HTTPException) as e:
+            crud.batch_tags(uuid.uuid4(), batch)
+        assert e.value.status_code == 400
+
+
+def test_tags_written_in_batch_read_back_as_tag_documents(session) -> None:
+    user_id = uuid.uuid4()
+    rows = _insert(session, user_id, 2)
+    crud = InspectionTAGCRUD(session)
+    crud.add_tag(rows[0]["id"], user_id, "rework")
+
+    page = crud.get_inspections(user_id, tags=["rework"])
+    assert [item.id for item in page] == [rows[0]["id"]]
+    assert page[0].tags.names() == ["rework"]
+
+    partial = crud.get_inspections(user_id, tags=["rework"], fields=("id", "tags"))
+    assert partial[0]["tags"].names() == ["rework"]
+
+    removed = crud.remove_tag(rows[0]["id"], user_id, "rework")
+    assert removed.tags.names() == [] and removed.version == 3
+    with pytest.raises(HTTPException) as e:
+        crud.add_tag(rows[1]["id"], uuid.uuid4(), "rework")
+    assert e.value.status_code == 404
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from collections.abc import Callable, Iterator
+
+import fastapi.routing
+import pytest
+import sqlalchemy as sa
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.concurrency import run_in_threadpool
+
+from app.core.tracing import (
+    FileExporter,
+    Tracer,
+    TracingMiddleware,
+    instrument_engine,
+    instrument_fastapi,
+    summarize,
+)
+
+
+def _records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.fixture
+def instrument() -> Iterator[Callable[[Tracer], None]]:
+    # instrument_fastapi patches fastapi.routing for the whole process
+    undo = []
+    yield lambda tracer: undo.append(instrument_fastapi(tracer))
+    for restore in reversed(undo):
+        restore()
+
+
+def test_unsampled_traces_are_not_exported(tmp_path) -> None:
+    exporter = FileExporter(str(tmp_path / "traces.jsonl"))
+    tracer = Tracer(exporter, sample_rate=0.0)
+
+    with tracer.span("request") as root:
+        with tracer.span("child") as child:
+            assert root is None and child is None
+    assert tracer.start("sql") is None
+    assert not (tmp_path / "traces.jsonl").exists()
+
+
+def test_spans_nest_across_threads_and_export_once(tmp_path) -> None:
+    path = tmp_path / "traces.jsonl"
+    exporter = FileExporter(str(path))
+    tracer = Tracer(exporter, sample_rate=1.0)
+    engine = sa.create_engine("sqlite://")
+    instrument_engine(engine, tracer)
+
+    def query() -> None:
+        with tracer.span("auth"), engine.connect() as connection:
+            connection.execute(sa.text("select 1"))
+
+    async def request() -> None:
+        with tracer.span("GET /things", user="u"):
+            await run_in_threadpool(query)
+
+    asyncio.run(request())
+    exporter.flush()
+
+    [record] = _records(path)
+    assert record["name"] == "GET /things"
+    assert record["attributes"] == {"user": "u"}
+    spans = {span["name"]: span for span in record["spans"]}
+    assert spans["sql"]["parent_id"] == spans["auth"]["span_id"]
+    assert spans["sql"]["attributes"]["statement"] == "select 1"
+    assert spans["auth"]["duration_ms"] >= spans["sql"]["duration_ms"]
+
+
+def test_middleware_names_root_after_route(tmp_path, instrument) -> None:
+    path = tmp_path / "traces.jsonl"
+    exporter = FileExporter(str(path))
+    tracer = Tracer(exporter, sample_rate=1.0)
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    instrument(tracer)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int) -> dict:
+        with tracer.span("work"):
+            return {"id": item_id}
+
+    with TestClient(app) as client:
+        assert client.get("/items/1").status_code == 200
+        assert client.get("/items/2").status_code == 200
+    exporter.flush()
+
+    records = _records(path)
+    assert [r["name"] for r in records] == ["GET /items/{item_id}"] * 2
+    assert records[0]["attributes"]["status"] == 200
+    summary = summarize(records)
+    assert summary["GET /items/{item_id}"]["count"] == 2
+    assert {"work", "serialize"} <= set(
+        summary["GET /items/{item_id}"]["spans_mean_ms"]
+    )
+
+
+def test_instrument_fastapi_swaps_tracers_and_undoes(tmp_path) -> None:
+    original = fastapi.routing.serialize_response
+    first = Tracer(FileExporter(str(tmp_path / "a.jsonl")), sample_rate=0.0)
+    second = Tracer(FileExporter(str(tmp_path / "b.jsonl")), sample_rate=0.0)
+
+    undo_first = instrument_fastapi(first)
+    undo_second = instrument_fastapi(second)
+    assert fastapi.routing.serialize_response.__wrapped__ is original
+
+    undo_second()
+    undo_first()
+    assert fastapi.routing.serialize_response is original
@@ -0,0 +1,156 @@
+import asyncio
+import io
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.uploads import FileSync, copy_upload, stream_multipart
+
+BOUNDARY = "xYzBoundary"
+
+
+def _body(payload: bytes, filename: str = "part.png") -> bytes:
+    return (
+        (
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="note"\r\n\r\n'
+            "hello\r\n"
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode()
+        + payload
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+async def _chunks(body: bytes, size: int = 7) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+def _headers(body: bytes, **extra: str) -> dict[str, str]:
+    return {
+        "content-type": f"multipart/form-data; boundary={BOUNDARY}",
+        "content-length": str(len(body)),
+        **extra,
+    }
+
+
+def test_file_part_is_streamed_to_destination(tmp_path: Path) -> None:
+    payload = os.urandom(5000)
+    body = _body(payload)
+    target = tmp_path / "out.png"
+    seen = []
+
+    def destination(name: str, filename: str, content_type: str | None) -> str:
+        seen.append((name, filename, content_type))
+        return str(target)
+
+    form = asyncio.run(
+        stream_multipart(_headers(body), _chunks(body), destination, 10_000)
+    )
+
+    assert seen == [("file", "part.png", "image/png")]
+    assert form.fields == {"note": "hello"}
+    assert form.files[0].size == len(payload)
+    assert target.read_bytes() == payload
+    assert os.listdir(tmp_path) == ["out.png"]
+
+
+def test_oversized_file_is_rejected_mid_stream(tmp_path: Path) -> None:
+    body = _body(os.urandom(5000))
+    # no Content-Length, as with a chunked request
+    headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(
+            stream_multipart(
+                headers, _chunks(body), lambda *_: str(tmp_path / "big.png"), 1000
+            )
+        )
+
+    assert exc.value.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_length_is_rejected_before_reading(tmp_path: Path) -> None:
+    body = _body(b"x")
+
+    async def never_read() -> AsyncIterator[bytes]:
+        raise AssertionError("body should not be read")
+        yield b""
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(
+            stream_multipart(
+                _headers(body, **{"content-length": str(10**9)}),
+                never_read(),
+                lambda *_: str(tmp_path / "big.png"),
+                1000,
+            )
+        )
+    assert exc.value.status_code == 413
+
+
+@pytest.mark.parametrize("spool_size", [1 << 20, 10])
+def test_copy_upload_from_memory_and_disk(tmp_path: Path, spool_size: int) -> None:
+    payload = os.urandom(50_000)
+    source = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    source.write(payload)
+    source.seek(0)
+    target = tmp_path / "copy.png"
+
+    assert copy_upload(source, str(target), len(payload), 4096) == len(payload)
+    assert target.read_bytes() == payload
+
+
+def test_copy_upload_refuses_oversized_source(tmp_path: Path) -> None:
+    with pytest.raises(HTTPException) as e:
+        copy_upload(io.BytesIO(b"x" * 100), str(tmp_path / "big.png"), 10, 4)
+    assert e.value.status_code == 413
+
+
+@pytest.mark.parametrize("policy", ["none", "file", "batch"])
+def test_file_sync_renames_into_place(tmp_path: Path, policy: str) -> None:
+    sync = FileSync(policy, batch_interval=0.001, batch_size=3)
+    parts = []
+    for i in range(5):
+        part = tmp_path / f"{i}.png.part"
+        part.write_bytes(b"png")
+        parts.append(part)
+
+    async def commit_all() -> None:
+        await asyncio.gather(
+            *(sync.commit(str(part), str(part)[: -len(".part")]) for part in parts)
+        )
+
+    asyncio.run(commit_all())
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i}.png" for i in range(5)]
+
+
+def test_batch_sync_does_not_wait_for_the_timer(tmp_path: Path) -> None:
+    # an interval no test would sit through: a lone commit is flushed at
+    # once, and commits racing a flush ride the next hop when it finishes
+    sync = FileSync("batch", batch_interval=60, batch_size=64)
+    parts = []
+    for i in range(4):
+        part = tmp_path / f"{i}.png.part"
+        part.write_bytes(b"png")
+        parts.append(part)
+
+    async def commit(part: Path) -> None:
+        await sync.commit(str(part), str(part)[: -len(".part")])
+
+    async def run() -> None:
+        await asyncio.wait_for(commit(parts[0]), 5)
+        await asyncio.wait_for(asyncio.gather(*map(commit, parts[1:])), 5)
+
+    asyncio.run(run())
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i}.png" for i in range(4)]
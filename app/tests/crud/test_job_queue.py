@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.queue import GRADE_JOB, JobQueue
+from app.models import InspectionJob, JobStatus
+
+
+@pytest.fixture
+def queue():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[InspectionJob.__table__])
+    with Session(engine) as session:
+        yield JobQueue(session)
+
+
+def test_claim_hides_jobs_until_visibility_timeout(queue):
+    queue.enqueue(uuid4(), GRADE_JOB)
+    queue.enqueue(uuid4(), GRADE_JOB)
+
+    claimed = queue.claim(limit=10, visibility_timeout=60)
+    assert len(claimed) == 2
+    assert all(job.status == JobStatus.RUNNING and job.attempts == 1 for job in claimed)
+    assert queue.claim(limit=10) == []
+
+    # a worker died mid-batch: its lease runs out and the job is handed out again
+    claimed[0].locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    queue.session.add(claimed[0])
+    queue.session.commit()
+    reclaimed = queue.claim(limit=10)
+    assert [job.id for job in reclaimed] == [claimed[0].id]
+    assert reclaimed[0].attempts == 2
+
+
+def test_fail_backs_off_then_gives_up(queue):
+    job = queue.enqueue(uuid4(), GRADE_JOB)
+    job.max_attempts = 2
+    queue.session.add(job)
+    queue.session.commit()
+
+    queue.fail(queue.claim(limit=1), "boom")
+    assert job.status == JobStatus.QUEUED
+    assert job.run_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+    assert queue.claim(limit=1) == []
+
+    job.run_at = datetime.now(timezone.utc)
+    queue.session.add(job)
+    queue.session.commit()
+    queue.fail(queue.claim(limit=1), "boom again")
+    assert job.status == JobStatus.FAILED
+    assert job.last_error == "boom again"
+
+
+def test_metrics_and_complete(queue):
+    for _ in range(3):
+        queue.enqueue(uuid4(), GRADE_JOB)
+    metrics = queue.metrics()
+    assert (metrics.queued, metrics.ready, metrics.running) == (3, 3, 0)
+
+    queue.complete(queue.claim(limit=2))
+    metrics = queue.metrics()
+    assert (metrics.queued, metrics.running, metrics.failed) == (1, 0, 0)
+
+
+def test_exhausted_jobs_of_dead_workers_are_failed_not_reclaimed(queue):
+    job = queue.enqueue(uuid4(), GRADE_JOB)
+    job.max_attempts = 1
+    queue.session.add(job)
+    queue.session.commit()
+
+    (claimed,) = queue.claim(limit=1)
+    claimed.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    queue.session.add(claimed)
+    queue.session.commit()
+
+    assert queue.claim(limit=1) == []
+    assert job.status == JobStatus.FAILED
+    assert job.last_error == "Lease expired on the last attempt"
+    assert queue.metrics().failed == 1
+
+
+def test_complete_and_fail_need_the_lease(queue):
+    queue.enqueue(uuid4(), GRADE_JOB)
+    (stale,) = queue.claim(limit=1)
+    stale_attempt = stale.attempts
+    stale.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    queue.session.add(stale)
+    queue.session.commit()
+
+    # the first worker stalled past its lease and another one took the job
+    (current,) = queue.claim(limit=1)
+    assert current.attempts == stale_attempt + 1
+    lost = InspectionJob(
+        id=current.id,
+        inspection_id=current.inspection_id,
+        kind=GRADE_JOB,
+        attempts=stale_attempt,
+    )
+    assert queue.complete([lost]) == 0
+    assert queue.fail([lost], "late") == 0
+    assert current.status == JobStatus.RUNNING and current.last_error is None
+
+    assert queue.complete([current]) == 1
+    assert current.status == JobStatus.DONE
@@ -0,0 +1,56 @@
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import sqlalchemy as sa
+from sqlmodel import Session
+
+from app.core.storage import shard_key
+from app.core.tables import inspection_results, metadata
+from app.migrate_uploads import iter_flat_files, migrate_batch, rewrite_urls
+from app.models import InspectionOutcome
+
+BASE_URL = "/static/uploads"
+
+
+def test_migration_moves_files_and_rewrites_their_urls(tmp_path: Path) -> None:
+    names = [f"{uuid.uuid4()}_20260301_080000.png" for _ in range(3)]
+    for name in names:
+        (tmp_path / name).write_bytes(b"png")
+    (tmp_path / "uploading.png.part").write_bytes(b"pn")
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "station_id": uuid.uuid4(),
+            "captured_image_url": url,
+            "inspection_outcome": InspectionOutcome.PENDING,
+            "created_at": datetime(2026, 3, 1, 8, 0),
+        }
+        for url in [f"{BASE_URL}/{name}" for name in names[:2]]
+        + ["https://images.example/elsewhere.png"]
+    ]
+    with engine.begin() as connection:
+        connection.execute(inspection_results.insert(), rows)
+
+    moved = migrate_batch(str(tmp_path), list(iter_flat_files(str(tmp_path))), "hash")
+    with Session(engine) as session:
+        assert rewrite_urls(session, BASE_URL + "/", moved) == 2
+
+    assert sorted(moved) == sorted((name, shard_key(name, "hash")) for name in names)
+    assert all((tmp_path / key).exists() for _, key in moved)
+    assert list(iter_flat_files(str(tmp_path))) == []
+    with engine.connect() as connection:
+        stored = dict(
+            connection.execute(
+                sa.select(
+                    inspection_results.c.id, inspection_results.c.captured_image_url
+                )
+            ).all()
+        )
+    assert stored == {
+        rows[0]["id"]: f"{BASE_URL}/{shard_key(names[0], 'hash')}",
+        rows[1]["id"]: f"{BASE_URL}/{shard_key(names[1], 'hash')}",
+        rows[2]["id"]: "https://images.example/elsewhere.png",
+    }
@@ -0,0 +1,43 @@
+import argparse
+import glob
+import json
+
+from app.core.tracing import summarize
+
+
+def _records(patterns: list[str]):
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Break sampled request traces down by stage"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=["traces*.jsonl"],
+        help="trace files written with TRACING_ENABLED (globs are expanded)",
+    )
+    parser.add_argument("--route", help="only routes containing this text")
+    args = parser.parse_args()
+
+    summary = summarize(
+        record
+        for record in _records(args.files)
+        if args.route is None or args.route in record["name"]
+    )
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]["mean_ms"]):
+        print(f"{name}  n={entry['count']}  mean {entry['mean_ms']:.2f} ms")
+        for span, mean_ms in entry["spans_mean_ms"].items():
+            share = mean_ms / entry["mean_ms"] if entry["mean_ms"] else 0.0
+            print(f"    {span:<16} {mean_ms:9.2f} ms  {share:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import logging
+import signal
+import threading
+import time
+from collections.abc import Callable, Sequence
+from datetime import datetime, timezone
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.partitions import ensure_partitions
+from app.core.queue import GRADE_JOB, JobQueue
+from app.crud import InspectionService
+from app.models import InspectionJob
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+metrics_interval = 30  # seconds
+partition_interval = 3600  # seconds
+
+
+def grade_inspections(session: Session, jobs: Sequence[InspectionJob]) -> None:
+    summary = InspectionService(session).grade_results(
+        [job.inspection_id for job in jobs]
+    )
+    logger.info(
+        "Graded %d inspections: %d passed, %d failed, %d skipped",
+        summary.graded,
+        summary.passed,
+        summary.failed,
+        summary.skipped,
+    )
+
+
+handlers: dict[str, Callable[[Session, Sequence[InspectionJob]], None]] = {
+    GRADE_JOB: grade_inspections,
+}
+
+
+def run_once(batch_size: int) -> int:
+    with Session(engine) as session:
+        queue = JobQueue(session)
+        jobs = queue.claim(batch_size)
+        by_kind: dict[str, list[InspectionJob]] = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+
+        for kind, batch in by_kind.items():
+            handler = handlers.get(kind)
+            if handler is None:
+                queue.fail(batch, f"No handler for job kind {kind!r}")
+                continue
+            try:
+                handler(session, batch)
+            except Exception as e:
+                logger.exception("Job batch %s failed", kind)
+                session.rollback()
+                queue.fail(batch, repr(e))
+            else:
+                done = queue.complete(batch)
+                if done < len(batch):
+                    # the lease ran out and another worker has the jobs now
+                    logger.warning(
+                        "Lost the lease on %d %s jobs before completing them",
+                        len(batch) - done,
+                        kind,
+                    )
+        return len(jobs)
+
+
+def work(stop: threading.Event, batch_size: int, poll_interval: float) -> None:
+    while not stop.is_set():
+        try:
+            claimed = run_once(batch_size)
+        except Exception as e:
+            logger.error(e)
+            claimed = 0
+        if not claimed:
+            stop.wait(poll_interval)
+
+
+def log_metrics(stop: threading.Event) -> None:
+    while not stop.wait(metrics_interval):
+        try:
+            with Session(engine) as session:
+                metrics = JobQueue(session).metrics()
+        except Exception as e:
+            logger.error(e)
+            continue
+        logger.info("Queue depth: %s", metrics.model_dump())
+
+
+def maintain_partitions(stop: threading.Event) -> None:
+    # new months must exist before the first row of that month is written
+    while True:
+        try:
+            created = ensure_partitions(
+                engine, datetime.now(timezone.utc), settings.PARTITION_MONTHS_AHEAD
+            )
+            for name in created:
+                logger.info("Created partition %s", name)
+        except Exception as e:
+            logger.error(e)
+        if stop.wait(partition_interval):
+            return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process queued inspection jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=settings.WORKER_BATCH_SIZE)
+    parser.add_argument(
+        "--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL
+    )
+    args = parser.parse_args()
+    if not settings.JOB_WORKER_ENABLED:
+        parser.error("JOB_WORKER_ENABLED is off in this environment")
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    if not settings.EVENT_BROKER_URL:
+        logger.warning(
+            "EVENT_BROKER_URL is not set: graded results are not pushed to "
+            "the inspection feed of the API"
+        )
+    logger.info("Starting %d worker threads", args.concurrency)
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(stop, args.batch_size, args.poll_interval),
+            name=f"worker-{i}",
+        )
+        for i in range(args.concurrency)
+    ]
+    threads.append(threading.Thread(target=log_metrics, args=(stop,), daemon=True))
+    threads.append(
+        threading.Thread(target=maintain_partitions, args=(stop,), daemon=True)
+    )
+    for thread in threads:
+        thread.start()
+    while not stop.is_set():
+        time.sleep(0.5)
+    logger.info("Shutting down, waiting for running batches")
+    for thread in threads:
+        if not thread.daemon:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()